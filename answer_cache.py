@@ -0,0 +1,177 @@
+"""
+Answer cache for repeated citizen questions.
+
+Keys are the language id plus the normalized, order-independent content
+tokens of the caller's SpeechResult, so "PM-KISAN ki kist kab aayegi?" and
+"pm kisaan kisht kab aaegi" share one entry. The in-memory tier is an LRU
+with TTL eviction; an optional SQL tier (the ``answer_cache`` table) keeps
+answers across restarts and shares them between workers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from text_normalize import normalize_tokens
+
+
+class SQLAnswerCacheBackend:
+    """Persistent tier stored in the ``answer_cache`` table."""
+
+    def __init__(self, get_connection, placeholder="?"):
+        self.get_connection = get_connection
+        self.p = placeholder
+
+    def load(self, key, min_created_at):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT answer FROM answer_cache WHERE cache_key = {self.p} AND created_at >= {self.p}",
+                      (key, min_created_at))
+            row = c.fetchone()
+        return row[0] if row else None
+
+    def store(self, key, lang_id, answer, created_at):
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                INSERT INTO answer_cache (cache_key, lang_id, answer, created_at)
+                VALUES ({p}, {p}, {p}, {p})
+                ON CONFLICT (cache_key) DO UPDATE SET answer = excluded.answer, created_at = excluded.created_at
+            """, (key, lang_id, answer, created_at))
+            conn.commit()
+
+    def delete(self, key=None, question_key=None, lang_id=None):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            if key is not None:
+                c.execute(f"DELETE FROM answer_cache WHERE cache_key = {self.p}", (key,))
+            elif question_key is not None:
+                c.execute(f"DELETE FROM answer_cache WHERE cache_key LIKE {self.p}", (f"%:{question_key}",))
+            elif lang_id is not None:
+                c.execute(f"DELETE FROM answer_cache WHERE lang_id = {self.p}", (lang_id,))
+            else:
+                c.execute("DELETE FROM answer_cache")
+            removed = c.rowcount
+            conn.commit()
+        return max(0, removed)
+
+
+class AnswerCache:
+    """LRU + TTL cache of model answers keyed by (lang_id, normalized question)."""
+
+    def __init__(self, max_entries=2000, ttl=21600, backend=None, min_tokens=2, enabled=True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self.min_tokens = min_tokens
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (answer, created_at)
+        self.counters = {"hits": 0, "misses": 0, "backend_hits": 0, "stores": 0,
+                         "evictions": 0, "invalidations": 0}
+
+    def question_key(self, speech):
+        """Normalized, order-independent form of a question, or None if it is too short
+        to be answered out of context."""
+        tokens = sorted(set(normalize_tokens(speech)))
+        if len(tokens) < self.min_tokens:
+            return None
+        return ' '.join(tokens)
+
+    def key_for(self, lang_id, speech):
+        question_key = self.question_key(speech)
+        return f"{lang_id}:{question_key}" if question_key else None
+
+    def get(self, key):
+        if not self.enabled or key is None:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return entry[0]
+                del self._entries[key]
+                self.counters["evictions"] += 1
+        if self.backend is not None:
+            try:
+                answer = self.backend.load(key, now - self.ttl)
+            except Exception as e:
+                print(f"Answer cache load failed: {e}")
+                answer = None
+            if answer is not None:
+                self._remember(key, answer, now)
+                with self._lock:
+                    self.counters["hits"] += 1
+                    self.counters["backend_hits"] += 1
+                return answer
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key, answer):
+        if not self.enabled or key is None or not answer:
+            return
+        now = time.time()
+        self._remember(key, answer, now)
+        with self._lock:
+            self.counters["stores"] += 1
+        if self.backend is not None:
+            try:
+                self.backend.store(key, key.split(':', 1)[0], answer, now)
+            except Exception as e:
+                print(f"Answer cache store failed: {e}")
+
+    def invalidate(self, lang_id=None, question=None):
+        """Drop a question (in one or all languages), a whole language, or everything.
+
+        Returns the number of entries removed.
+        """
+        key = question_key = None
+        if question:
+            question_key = self.question_key(question)
+            if question_key is None:
+                return 0
+            if lang_id is not None:
+                key = f"{lang_id}:{question_key}"
+                question_key = None
+        with self._lock:
+            if key is not None:
+                doomed = [key] if key in self._entries else []
+            elif question_key is not None:
+                doomed = [k for k in self._entries if k.split(':', 1)[1] == question_key]
+            elif lang_id is not None:
+                doomed = [k for k in self._entries if k.startswith(f"{lang_id}:")]
+            else:
+                doomed = list(self._entries)
+            for k in doomed:
+                del self._entries[k]
+            self.counters["invalidations"] += len(doomed)
+        removed = len(doomed)
+        if self.backend is not None:
+            try:
+                removed = max(removed, self.backend.delete(key=key, question_key=question_key, lang_id=lang_id))
+            except Exception as e:
+                print(f"Answer cache invalidation failed: {e}")
+        return removed
+
+    def _remember(self, key, answer, created_at):
+        with self._lock:
+            self._entries[key] = (answer, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+            data["entries"] = len(self._entries)
+        lookups = data["hits"] + data["misses"]
+        data["hit_rate"] = round(data["hits"] / lookups, 4) if lookups else 0.0
+        data["enabled"] = self.enabled
+        data["persistent"] = self.backend is not None
+        return data
@@ -1,20 +1,52 @@
 import os
+import sys
 import csv
 import sqlite3
 import io
 import json
-from datetime import datetime
-from flask import Flask, request, session, render_template, jsonify, Response
+import time
+import uuid
+import atexit
+import base64
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote
+from zoneinfo import ZoneInfo
+from flask import Flask, request, session, render_template, jsonify, Response, stream_with_context, send_from_directory
 from flask_cors import CORS
 from twilio.twiml.voice_response import VoiceResponse, Gather
 from twilio.rest import Client
 from groq import Groq
 from dotenv import load_dotenv
+from db_pool import PostgresPool, SQLitePool
+import migrations
+from write_behind import WriteBehindLogger
+from conversation_store import ConversationStore, SQLConversationBackend
+from streaming_reply import StreamingReply, ReplyBuffer
+from latency_stats import LatencyRecorder, PhaseTimer, percentile
+from answer_cache import AnswerCache, SQLAnswerCacheBackend
+from context_window import ContextWindow, RollingSummarizer
+from outbound_dispatcher import OutboundDispatcher
+from campaigns import SQLCampaignBackend, CampaignScheduler, iter_numbers
+from live_events import EventHub, SQLLiveEventBackend, event_rows, LIVE_EVENTS_LOCK_ID
+from metrics import MetricsRegistry, Counter, Gauge, Histogram, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from health import DependencyProbe
+from llm_budget import LatencyBudget, LLMUnavailable
+from model_router import ModelRouter
+from twiml_cache import TwimlCache
+from audio_cache import AudioCache, AUDIO_MAX_AGE
+from knowledge_base import KnowledgeBase
+from fraud_screen import FraudScreen
+from caller_guard import CallerGuard, SQLCallerGuardBackend
+from sheets_outbox import (SheetsClient, SheetsOutbox, SQLSheetsOutboxBackend, service_account_session,
+                           DEFAULT_API_URL as SHEETS_API_URL)
 
 # PostgreSQL imports (with fallback to SQLite for compatibility)
 try:
     import psycopg2
     from psycopg2 import sql
+    from psycopg2.extras import execute_values
     USING_POSTGRES = True
 except ImportError:
     USING_POSTGRES = False
@@ -46,114 +78,138 @@ CORS(app,
 # Initialize Clients
 groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
 twilio_client = Client(os.environ.get("TWILIO_ACCOUNT_SID"), os.environ.get("TWILIO_AUTH_TOKEN"))
+if os.environ.get("TWILIO_API_BASE_URL"):
+    # Point the REST client at a local stand-in (see scripts/fake_twilio.py)
+    twilio_client.api.base_url = os.environ["TWILIO_API_BASE_URL"].rstrip('/')
+
+# Prometheus metrics for GET /metrics. Each worker counts its own traffic; with
+# METRICS_DIR set, workers also write snapshots there and any worker reports the totals.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+metrics_registry = MetricsRegistry(
+    snapshot_dir=os.environ.get("METRICS_DIR") or None,
+    snapshot_interval=float(os.environ.get("METRICS_SNAPSHOT_INTERVAL", 5)),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to build the response, by route.",
+    ["route"], registry=metrics_registry)
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Responses by route and status code.",
+    ["route", "status"], registry=metrics_registry)
+GROQ_REQUEST_SECONDS = Histogram(
+    "groq_request_duration_seconds", "Groq chat completion latency (to the first chunk when streaming).",
+    ["model", "stream"], registry=metrics_registry)
+GROQ_ERRORS = Counter(
+    "groq_errors_total", "Failed Groq chat completions by model and error type.",
+    ["model", "error"], registry=metrics_registry)
+LLM_TURNS = Counter(
+    "llm_turns_total", "/handle-input turns by the path that produced the reply (see llm_budget.py).",
+    ["path"], registry=metrics_registry)
+LLM_TURN_SECONDS = Histogram(
+    "llm_turn_duration_seconds", "Time a turn waited for its reply (the groq phase), by path.",
+    ["path"], registry=metrics_registry)
+LLM_ROUTES = Counter(
+    "llm_route_decisions_total", "Model chosen for each turn by the query router, and why.",
+    ["model", "reason"], registry=metrics_registry)
+VOICE_REJECTED = Counter(
+    "voice_calls_rejected_total", "Calls turned away at /voice by the caller guard, by reason.",
+    ["reason"], registry=metrics_registry)
+FRAUD_SCREEN_MATCHES = Counter(
+    "fraud_screen_matches_total", "Turns refused by the local fraud screen without calling Groq, by rule.",
+    ["rule"], registry=metrics_registry)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported by Groq for /handle-input completions, by model and kind (prompt / completion).",
+    ["model", "kind"], registry=metrics_registry)
+TWILIO_CREATE_SECONDS = Histogram(
+    "twilio_calls_create_duration_seconds", "twilio_client.calls.create latency by outcome (ok / error).",
+    ["outcome"], registry=metrics_registry)
+DB_OPERATION_SECONDS = Histogram(
+    "db_operation_duration_seconds", "Time in execute, fetch and commit, by the helper that borrowed the connection.",
+    ["helper", "operation"], registry=metrics_registry,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+DB_ERRORS = Counter(
+    "db_errors_total", "Failed execute, fetch and commit calls by helper.",
+    ["helper", "operation"], registry=metrics_registry)
+
+def caller_label():
+    """Qualified name of the function that called get_db_connection (plain name before Python 3.11)."""
+    code = sys._getframe(2).f_code
+    return getattr(code, 'co_qualname', code.co_name)
+
+def observe_db_operation(helper, operation, seconds, failed):
+    DB_OPERATION_SECONDS.labels(helper, operation).observe(seconds)
+    if failed:
+        DB_ERRORS.labels(helper, operation).inc()
 
 # Database Setup - PostgreSQL or SQLite
 DB_TYPE = os.environ.get("DB_TYPE", "sqlite").lower()
 
+# Connection pool settings (per worker process)
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5))
+DB_POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", 1800))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL", 30))
+
 if DB_TYPE == "postgres" and USING_POSTGRES:
     DB_HOST = os.environ.get("DB_HOST", "localhost")
     DB_PORT = int(os.environ.get("DB_PORT", 5432))
     DB_USER = os.environ.get("DB_USER", "hack4delhi_user")
     DB_PASSWORD = os.environ.get("DB_PASSWORD", "")
     DB_NAME = os.environ.get("DB_NAME", "hack4delhi_db")
+
+    db_pool = PostgresPool(
+        dict(host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, database=DB_NAME),
+        minconn=DB_POOL_MIN,
+        maxconn=DB_POOL_MAX,
+        acquire_timeout=DB_POOL_TIMEOUT,
+        max_lifetime=DB_POOL_MAX_LIFETIME,
+        health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+        observer=observe_db_operation if METRICS_ENABLED else None,
+    )
     
     def get_db_connection():
-        """Create a new PostgreSQL database connection."""
+        """Borrow a PostgreSQL connection from the pool. close() returns it."""
         try:
-            conn = psycopg2.connect(
-                host=DB_HOST,
-                port=DB_PORT,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                database=DB_NAME
-            )
-            conn.autocommit = False
-            return conn
+            # Timings are labelled with the calling helper (see db_operation_duration_seconds)
+            return db_pool.acquire(label=caller_label() if METRICS_ENABLED else None)
         except psycopg2.OperationalError as e:
             print(f"PostgreSQL connection error: {e}")
             raise
 else:
     # Fallback to SQLite
     DB_NAME = "voice_agent.db"
+
+    db_pool = SQLitePool(
+        DB_NAME,
+        max_lifetime=DB_POOL_MAX_LIFETIME,
+        health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+        pragmas=migrations.SQLITE_CONNECTION_PRAGMAS,
+        observer=observe_db_operation if METRICS_ENABLED else None,
+    )
     
     def get_db_connection():
-        """Create a new SQLite database connection."""
-        return sqlite3.connect(DB_NAME)
+        """Borrow this thread's persistent SQLite connection. close() returns it."""
+        return db_pool.acquire(label=caller_label() if METRICS_ENABLED else None)
+
+atexit.register(db_pool.close_all)
+
+DB_AUTO_MIGRATE = os.environ.get("DB_AUTO_MIGRATE", "true").lower() == "true"
 
 def init_db():
-    """Initialize database tables."""
+    """Check the schema version; migrate only if it is behind (see migrations.py)."""
+    backend = "postgres" if DB_TYPE == "postgres" and USING_POSTGRES else "sqlite"
     try:
-        if DB_TYPE == "postgres" and USING_POSTGRES:
-            conn = get_db_connection()
-            c = conn.cursor()
-            
-            # Create calls table
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS calls (
-                    call_sid TEXT PRIMARY KEY,
-                    from_number TEXT NOT NULL,
-                    to_number TEXT NOT NULL,
-                    direction TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT NOW(),
-                    summary TEXT,
-                    recording_url TEXT
-                )
-            ''')
-            
-            # Create transcripts table
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS transcripts (
-                    id SERIAL PRIMARY KEY,
-                    call_sid TEXT NOT NULL REFERENCES calls(call_sid) ON DELETE CASCADE,
-                    role TEXT NOT NULL,
-                    message TEXT,
-                    timestamp TIMESTAMP DEFAULT NOW()
-                )
-            ''')
-            
-            # Create queries table
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS queries (
-                    id SERIAL PRIMARY KEY,
-                    timestamp TIMESTAMP DEFAULT NOW(),
-                    user_name TEXT,
-                    query TEXT,
-                    status TEXT DEFAULT 'pending'
-                )
-            ''')
-
-            # Create suspicious_activity table
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS suspicious_activity (
-                    id SERIAL PRIMARY KEY,
-                    call_sid TEXT,
-                    phone_number TEXT,
-                    reason TEXT,
-                    timestamp TIMESTAMP DEFAULT NOW()
-                )
-            ''')
-            
-            # Create indexes for better performance
-            c.execute('''CREATE INDEX IF NOT EXISTS idx_calls_timestamp ON calls(timestamp DESC)''')
-            c.execute('''CREATE INDEX IF NOT EXISTS idx_transcripts_call_sid ON transcripts(call_sid)''')
-            
-            conn.commit()
-            conn.close()
+        with get_db_connection() as conn:
+            version = migrations.current_version(conn, backend)
+        if version < migrations.LATEST_VERSION:
+            if not DB_AUTO_MIGRATE:
+                raise RuntimeError(f"Database schema is at version {version}, expected "
+                                   f"{migrations.LATEST_VERSION}. Run: python migrations.py upgrade")
+            migrations.upgrade(get_db_connection, backend)
+        if backend == "postgres":
+            db_pool.prefill()
             print("PostgreSQL database initialized successfully!")
         else:
-            # SQLite initialization
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-            c.execute('''CREATE TABLE IF NOT EXISTS calls 
-                         (call_sid TEXT PRIMARY KEY, from_number TEXT, to_number TEXT, direction TEXT, timestamp TEXT, summary TEXT, recording_url TEXT)''')
-            c.execute('''CREATE TABLE IF NOT EXISTS transcripts 
-                         (id INTEGER PRIMARY KEY AUTOINCREMENT, call_sid TEXT, role TEXT, message TEXT, timestamp TEXT)''')
-            c.execute('''CREATE TABLE IF NOT EXISTS queries 
-                         (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, user TEXT, query TEXT, status TEXT)''')
-            c.execute('''CREATE TABLE IF NOT EXISTS suspicious_activity 
-                         (id INTEGER PRIMARY KEY AUTOINCREMENT, call_sid TEXT, phone_number TEXT, reason TEXT, timestamp TEXT)''')
-            conn.commit()
-            conn.close()
             print("SQLite database initialized successfully!")
     except Exception as e:
         print(f"Error initializing database: {e}")
@@ -162,75 +218,148 @@ def init_db():
 init_db()
 
 # --- Helpers ---
-def log_call(call_sid, from_number, to_number, direction):
-    """Log a call to the database."""
+
+# INSERT statements for the event tables written by the logging helpers,
+# as (PostgreSQL, SQLite). Order matters: calls are written before the
+# transcripts that reference them.
+LOG_INSERT_SQL = {
+    'calls': (
+        "INSERT INTO calls (call_sid, from_number, to_number, direction, timestamp, timestamp_ms) VALUES %s ON CONFLICT (call_sid) DO NOTHING",
+        "INSERT OR IGNORE INTO calls (call_sid, from_number, to_number, direction, timestamp, timestamp_ms) VALUES (?, ?, ?, ?, ?, ?)",
+    ),
+    'transcripts': (
+        "INSERT INTO transcripts (call_sid, role, message, timestamp, timestamp_ms) VALUES %s",
+        "INSERT INTO transcripts (call_sid, role, message, timestamp, timestamp_ms) VALUES (?, ?, ?, ?, ?)",
+    ),
+    'suspicious_activity': (
+        "INSERT INTO suspicious_activity (call_sid, phone_number, reason, timestamp, timestamp_ms) VALUES %s",
+        "INSERT INTO suspicious_activity (call_sid, phone_number, reason, timestamp, timestamp_ms) VALUES (?, ?, ?, ?, ?)",
+    ),
+    'turn_latencies': (
+        "INSERT INTO turn_latencies (call_sid, turn, lang_id, mode, llm_path, model, route, prompt_tokens, completion_tokens, db_ms, groq_ms, post_ms, twiml_ms, total_ms, day, created_ms) VALUES %s",
+        "INSERT INTO turn_latencies (call_sid, turn, lang_id, mode, llm_path, model, route, prompt_tokens, completion_tokens, db_ms, groq_ms, post_ms, twiml_ms, total_ms, day, created_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    ),
+}
+LOG_ERROR_LABELS = {'calls': 'Call Log', 'transcripts': 'Transcript', 'suspicious_activity': 'Suspicious Activity',
+                    'turn_latencies': 'Turn Latency'}
+
+def write_log_rows(events):
+    """Write a list of (table, row) events in one multi-row transaction."""
+    grouped = {}
+    for table, row in events:
+        grouped.setdefault(table, []).append(row)
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        for table, (pg_sql, sqlite_sql) in LOG_INSERT_SQL.items():
+            rows = grouped.get(table)
+            if not rows:
+                continue
+            if DB_TYPE == "postgres" and USING_POSTGRES:
+                execute_values(c, pg_sql, rows)
+            else:
+                c.executemany(sqlite_sql, rows)
+        if grouped.get('transcripts'):
+            update_call_summaries(c, grouped['transcripts'])
+        append_live_events(c, events)
+        conn.commit()
+    event_hub.wake()
+
+def append_live_events(c, events):
+    """Record the events for /api/events subscribers in the same transaction as the rows."""
+    rows = event_rows(events)
+    if not rows:
+        return
+    if DB_TYPE == "postgres" and USING_POSTGRES:
+        # Held until commit, so event ids become visible in increasing order
+        c.execute("SELECT pg_advisory_xact_lock(%s)", (LIVE_EVENTS_LOCK_ID,))
+        execute_values(c, "INSERT INTO live_events (kind, call_sid, payload, created_ms) VALUES %s", rows)
+    else:
+        c.executemany("INSERT INTO live_events (kind, call_sid, payload, created_ms) VALUES (?, ?, ?, ?)", rows)
+
+def update_call_summaries(c, transcript_rows):
+    """Keep calls.last_message / turn_count in step with the transcript rows just written."""
+    summaries = {}
+    for call_sid, _, message, *_ in transcript_rows:
+        count = summaries[call_sid][1] if call_sid in summaries else 0
+        summaries[call_sid] = (message, count + 1)
+    rows = [(call_sid, message, count) for call_sid, (message, count) in summaries.items()]
+    if DB_TYPE == "postgres" and USING_POSTGRES:
+        execute_values(c, """
+            UPDATE calls SET last_message = v.last_message, turn_count = calls.turn_count + v.turns
+            FROM (VALUES %s) AS v(call_sid, last_message, turns)
+            WHERE calls.call_sid = v.call_sid
+        """, rows)
+    else:
+        c.executemany("UPDATE calls SET last_message = ?, turn_count = turn_count + ? WHERE call_sid = ?",
+                      [(message, count, call_sid) for call_sid, message, count in rows])
+
+def write_log_rows_individually(events):
+    """Salvage a failed batch row by row so one bad row does not sink the rest."""
+    for table, row in events:
+        try:
+            write_log_rows([(table, row)])
+        except Exception as e:
+            print(f"DB Error ({LOG_ERROR_LABELS[table]}): {e}")
+
+# Write-behind pipeline: webhooks enqueue rows, a background thread commits them in batches
+write_behind = WriteBehindLogger(
+    write_log_rows,
+    fallback_fn=write_log_rows_individually,
+    max_queue=int(os.environ.get("WRITE_BEHIND_MAX_QUEUE", 10000)),
+    batch_size=int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", 200)),
+    flush_interval=float(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL", 0.2)),
+    enabled=os.environ.get("WRITE_BEHIND_ENABLED", "true").lower() == "true",
+)
+atexit.register(write_behind.stop)
+
+# Live feed for /api/events: one poller per worker fans new events out to its SSE clients
+event_hub = EventHub(
+    SQLLiveEventBackend(get_db_connection, placeholder='%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'),
+    poll_interval=float(os.environ.get("LIVE_EVENTS_POLL_INTERVAL", 0.5)),
+    buffer_size=int(os.environ.get("LIVE_EVENTS_BUFFER", 256)),
+    retention=int(os.environ.get("LIVE_EVENTS_RETENTION", 10000)),
+    max_subscribers=int(os.environ.get("LIVE_EVENTS_MAX_SUBSCRIBERS", 100)),
+    enabled=os.environ.get("LIVE_EVENTS_ENABLED", "true").lower() == "true",
+)
+
+def log_timestamp():
+    """Event time captured at log time (queued rows may be written later), as
+    (local timestamp, epoch milliseconds)."""
+    now = datetime.now()
+    return (now if DB_TYPE == "postgres" and USING_POSTGRES else now.isoformat()), int(now.timestamp() * 1000)
+
+# Writes that must not hold up a response when the write-behind queue is off or full
+deferred_writes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="deferred-log")
+
+def write_log_row(table, row):
     try:
-        if DB_TYPE == "postgres" and USING_POSTGRES:
-            conn = get_db_connection()
-            c = conn.cursor()
-            c.execute("""
-                INSERT INTO calls (call_sid, from_number, to_number, direction, timestamp)
-                VALUES (%s, %s, %s, %s, NOW())
-                ON CONFLICT (call_sid) DO NOTHING
-            """, (call_sid, from_number, to_number, direction))
-            conn.commit()
-            conn.close()
-        else:
-            # SQLite
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-            c.execute("INSERT OR IGNORE INTO calls (call_sid, from_number, to_number, direction, timestamp) VALUES (?, ?, ?, ?, ?)",
-                      (call_sid, from_number, to_number, direction, datetime.now().isoformat()))
-            conn.commit()
-            conn.close()
+        write_log_rows([(table, row)])
     except Exception as e:
-        print(f"DB Error (Call Log): {e}")
+        print(f"DB Error ({LOG_ERROR_LABELS[table]}): {e}")
+
+def log_row(table, row, defer=False):
+    """Queue a row for the background writer, or write it now if the queue is off or full
+    (with ``defer``, without waiting for room in the queue and on deferred_writes instead)."""
+    if write_behind.submit(table, row, timeout=0 if defer else None):
+        return
+    if defer:
+        deferred_writes.submit(write_log_row, table, row)
+    else:
+        write_log_row(table, row)
+
+def log_call(call_sid, from_number, to_number, direction, defer=False):
+    """Log a call to the database."""
+    log_row('calls', (call_sid, from_number, to_number, direction, *log_timestamp()), defer=defer)
 
 def log_transcript(call_sid, role, message):
     """Log a transcript message to the database."""
-    try:
-        if DB_TYPE == "postgres" and USING_POSTGRES:
-            conn = get_db_connection()
-            c = conn.cursor()
-            c.execute("""
-                INSERT INTO transcripts (call_sid, role, message, timestamp)
-                VALUES (%s, %s, %s, NOW())
-            """, (call_sid, role, message))
-            conn.commit()
-            conn.close()
-        else:
-            # SQLite
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-            c.execute("INSERT INTO transcripts (call_sid, role, message, timestamp) VALUES (?, ?, ?, ?)",
-                      (call_sid, role, message, datetime.now().isoformat()))
-            conn.commit()
-            conn.close()
-    except Exception as e:
-        print(f"DB Error (Transcript): {e}")
+    log_row('transcripts', (call_sid, role, message, *log_timestamp()))
 
 def log_suspicious_activity(call_sid, phone_number, reason):
     """Log suspicious activity/fraud attempts."""
-    try:
-        if DB_TYPE == "postgres" and USING_POSTGRES:
-            conn = get_db_connection()
-            c = conn.cursor()
-            c.execute("""
-                INSERT INTO suspicious_activity (call_sid, phone_number, reason, timestamp)
-                VALUES (%s, %s, %s, NOW())
-            """, (call_sid, phone_number, reason))
-            conn.commit()
-            conn.close()
-        else:
-            # SQLite
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-            c.execute("INSERT INTO suspicious_activity (call_sid, phone_number, reason, timestamp) VALUES (?, ?, ?, ?)",
-                      (call_sid, phone_number, reason, datetime.now().isoformat()))
-            conn.commit()
-            conn.close()
-    except Exception as e:
-        print(f"DB Error (Suspicious Activity): {e}")
+    timestamp, timestamp_ms = log_timestamp()
+    log_row('suspicious_activity', (call_sid, phone_number, reason, timestamp, timestamp_ms))
+    caller_guard.flag(phone_number, call_sid, timestamp_ms)
 
 # Enhanced Knowledge Base for 2024-2025 (Supplementing training data that ends in 2023)
 RECENT_GOV_INFO = """
@@ -249,6 +378,20 @@ IMPORTANT RECENT UPDATES (2024-2025):
 - Common Service Centres (CSCs) continue to provide citizen services
 """
 
+# Scheme passages (knowledge/schemes.json, or an index built from it) retrieved per turn instead of
+# inlining the knowledge base; RECENT_GOV_INFO is inlined only when retrieval is off or fails to load
+knowledge_base = None
+if os.environ.get("KNOWLEDGE_RETRIEVAL", "true").lower() == "true":
+    try:
+        knowledge_base = KnowledgeBase.from_file(os.environ.get(
+            "KNOWLEDGE_BASE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge", "schemes.json")))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Knowledge base not loaded, inlining RECENT_GOV_INFO instead: {e}")
+KNOWLEDGE_TOP_K = int(os.environ.get("KNOWLEDGE_TOP_K", 3))
+PROMPT_KNOWLEDGE = RECENT_GOV_INFO if knowledge_base is None else """
+Facts relevant to the caller's question are given under RELEVANT KNOWLEDGE with each turn.
+"""
+
 # Voice Configuration
 VOICE_CONFIG = {
     'female_hindi': 'Polly.Aditi',
@@ -275,7 +418,7 @@ BOUNDARY RULES (STRICTLY FOLLOW):
 - FRAUD DETECTION Agar caller sensitive data maange (jaise voter list, private details, bulk data), toh turant mana karein aur response ki shuruwat mein [SUSPICIOUS] tag lagayein. Example: "[SUSPICIOUS] Maaf kijiye, main yeh personal/sensitive information share nahi kar sakti."
 
 KNOWLEDGE BASE:
-{RECENT_GOV_INFO}
+{PROMPT_KNOWLEDGE}
 
 WORKING GUIDELINES:
 - Apne jawab chhote (1-2 vaakya) aur spasht rakhein
@@ -287,6 +430,7 @@ WORKING GUIDELINES:
 CURRENT CONTEXT: Aap caller ko sarkari yojanao, forms, benefits, aur procedures ke bare mein madad kar rahe hain.""",
         'greeting': "Namaste. Main Government of India ki AI assistant hoon. Main aapki sarkari yojanao aur sevao ke bare mein madad kar sakti hoon.",
         'fallback_msg': "Maaf kijiye, koi samasya aayi hai. Kripya phir se prayas karein ya humare official helpline number par contact karein.",
+        'refusal_msg': "Maaf kijiye, main yeh personal ya sensitive jaankari share nahi kar sakti.",
         'listen_prompt': "Kya aap abhi bhi wahin hain?"
     },
     '2': { # English
@@ -306,7 +450,7 @@ BOUNDARY RULES (STRICTLY FOLLOW):
 - FRAUD DETECTION: If the caller asks for sensitive data (e.g., voter lists, private details of others, bulk data), REFUSE politely and START your response with [SUSPICIOUS] tag. Example: "[SUSPICIOUS] I apologize, I cannot share such sensitive or personal information."
 
 KNOWLEDGE BASE:
-{RECENT_GOV_INFO}
+{PROMPT_KNOWLEDGE}
 
 WORKING GUIDELINES:
 - Keep answers concise (1-2 sentences) and suitable for voice conversation
@@ -318,10 +462,110 @@ WORKING GUIDELINES:
 CURRENT CONTEXT: You are helping callers with government schemes, forms, benefits, and procedures.""",
         'greeting': "Hello. I am an AI assistant for the Government of India. I can help you with government schemes and services.",
         'fallback_msg': "I'm sorry, I encountered an error. Please try again or contact our official helpline.",
+        'refusal_msg': "I apologize, I cannot share such sensitive or personal information.",
         'listen_prompt': "Are you still there?"
     }
 }
 
+# System prompts are referenced by id from conversation state, never copied per call
+SYSTEM_PROMPTS = {f"lang:{lang_id}": cfg['system_prompt'] for lang_id, cfg in LANG_CONFIG.items()}
+
+# Conversation state keyed by CallSid (replaces the cookie session).
+# "db" writes through to the conversations table so any worker can serve the next turn;
+# "memory" keeps state in this process only (single-worker deployments).
+CONVERSATION_STORE = os.environ.get("CONVERSATION_STORE", "db").lower()
+conversation_store = ConversationStore(
+    backend=SQLConversationBackend(
+        get_db_connection,
+        placeholder='%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+    ) if CONVERSATION_STORE == "db" else None,
+    max_entries=int(os.environ.get("CONVERSATION_CACHE_SIZE", 5000)),
+    ttl=int(os.environ.get("CONVERSATION_TTL", 7200)),
+)
+
+def new_conversation(lang_id):
+    """Fresh conversation state for a language menu choice."""
+    config = LANG_CONFIG[lang_id]
+    return {
+        'lang_id': lang_id,
+        'voice': config['voice_female'],  # Default to female voice, can be changed based on detection
+        'prompt_id': f"lang:{lang_id}",
+        'messages': [],
+        'summary': None,
+        'user_turns': 0
+    }
+
+def load_conversation(call_sid, fresh=False):
+    """Conversation state for a call, defaulting to English if none is stored."""
+    return conversation_store.get(call_sid, fresh=fresh) or new_conversation('2')
+
+def system_prompt_for(state):
+    config = LANG_CONFIG.get(state['lang_id'], LANG_CONFIG['2'])
+    return SYSTEM_PROMPTS.get(state.get('prompt_id'), config['system_prompt'])
+
+# Prompt window: system prompt + rolling summary + recent turns within a token budget
+context_window = ContextWindow(
+    max_tokens=int(os.environ.get("CONTEXT_MAX_TOKENS", 1600)),
+    max_turns=int(os.environ.get("CONTEXT_MAX_TURNS", 6)),
+    reminder_every=3,
+)
+SUMMARY_MODEL = os.environ.get("SUMMARY_MODEL", "llama-3.1-8b-instant")
+
+def groq_chat(max_retries=None, **params):
+    """groq_client.chat.completions.create, timed and with failures counted by model."""
+    started = time.perf_counter()
+    client = groq_client if max_retries is None else groq_client.with_options(max_retries=max_retries)
+    try:
+        return client.chat.completions.create(**params)
+    except Exception as e:
+        GROQ_ERRORS.labels(params['model'], type(e).__name__).inc()
+        raise
+    finally:
+        GROQ_REQUEST_SECONDS.labels(params['model'], 'true' if params.get('stream') else 'false').observe(
+            time.perf_counter() - started)
+
+def summarize_turns(previous_summary, messages):
+    """Fold older turns into the running call summary using the small model."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages if m['role'] != 'system')
+    prompt = ("Update the summary of a citizen's call with a Government of India helpline. "
+              "Keep the schemes, facts and open questions the caller mentioned, in under 80 words.\n\n"
+              f"Current summary: {previous_summary or '(none)'}\n\nNew turns:\n{transcript}")
+    chat_completion = groq_chat(
+        messages=[{"role": "user", "content": prompt}],
+        model=SUMMARY_MODEL,
+        temperature=0.2,
+        max_tokens=160,
+    )
+    return chat_completion.choices[0].message.content
+
+summarizer = RollingSummarizer(
+    context_window,
+    summarize_turns,
+    load_state=conversation_store.get,
+    save_state=lambda call_sid, state: conversation_store.save(call_sid, state, rebase=False),
+)
+
+def build_chat_messages(state):
+    """System prompt (resolved from its id), call summary, retrieved passages and the recent turns that fit the budget."""
+    return context_window.build(system_prompt_for(state), state['messages'],
+                                summary=state.get('summary'), user_turns=state.get('user_turns'),
+                                knowledge=retrieve_knowledge(state))
+
+def retrieve_knowledge(state):
+    """Passages matching the caller's last two questions (follow-ups rarely repeat the scheme name)."""
+    if knowledge_base is None:
+        return None
+    started = time.perf_counter()
+    questions = [m['content'] for m in state['messages'] if m['role'] == 'user'][-2:]
+    passages = knowledge_base.search(' '.join(questions), KNOWLEDGE_TOP_K)
+    latency_stats.record('retrieval', time.perf_counter() - started)
+    return '\n'.join(f"- {p['title']}: {p['text']}" for p in passages)
+
+def schedule_summary(call_sid, state):
+    """Summarize turns that fell out of the window, after the response has been built."""
+    if os.environ.get("CONTEXT_SUMMARIZE", "true").lower() == "true":
+        summarizer.maybe_schedule(call_sid, state, system_prompt_for(state))
+
 # --- Routes ---
 
 @app.route("/")
@@ -329,55 +573,188 @@ def dashboard():
     """Render Admin Dashboard."""
     return render_template("dashboard.html")
 
+LOGS_PAGE_SIZE = 50
+LOGS_MAX_PAGE_SIZE = 500
+
+def encode_logs_cursor(timestamp_ms, call_sid):
+    return base64.urlsafe_b64encode(json.dumps([timestamp_ms, call_sid]).encode()).decode()
+
+def decode_logs_cursor(cursor):
+    timestamp_ms, call_sid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return int(timestamp_ms), str(call_sid)
+
 @app.route("/api/logs")
 def get_logs():
-    """API for dashboard to fetch recent calls."""
+    """API for dashboard to fetch recent calls, newest first.
+
+    Keyset-paginated: the X-Next-Cursor header of a page, passed back as
+    ``cursor``, returns the next page. Filters: direction, number (caller or
+    callee), start / end (ISO dates, end inclusive) and limit.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', LOGS_PAGE_SIZE)), 1), LOGS_MAX_PAGE_SIZE)
+        clauses, params = call_filters(request.args)
+        p = '%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+        if request.args.get('number'):
+            clauses.append(f"(c.from_number = {p} OR c.to_number = {p})")
+            params += [request.args['number'], request.args['number']]
+        if request.args.get('cursor'):
+            clauses.append(f"(c.timestamp_ms, c.call_sid) < ({p}, {p})")
+            params += list(decode_logs_cursor(request.args['cursor']))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
     try:
         if DB_TYPE == "postgres" and USING_POSTGRES:
-            conn = get_db_connection()
-            c = conn.cursor()
-            c.execute("""
-                SELECT 
-                    c.call_sid,
-                    c.from_number,
-                    c.to_number,
-                    c.direction,
-                    c.timestamp,
-                    (SELECT message FROM transcripts t WHERE t.call_sid = c.call_sid ORDER BY t.id DESC LIMIT 1) as last_message
-                FROM calls c 
-                ORDER BY c.timestamp DESC LIMIT 50
-            """)
+            with get_db_connection() as conn:
+                c = conn.cursor()
+                c.execute(f"""
+                    SELECT 
+                        c.call_sid,
+                        c.from_number,
+                        c.to_number,
+                        c.direction,
+                        c.timestamp,
+                        c.timestamp_ms,
+                        c.last_message,
+                        c.turn_count
+                    FROM calls c 
+                    {where}
+                    ORDER BY c.timestamp_ms DESC, c.call_sid DESC LIMIT {p}
+                """, params + [limit + 1])
             
-            columns = [desc[0] for desc in c.description]
-            rows = [dict(zip(columns, row)) for row in c.fetchall()]
-            conn.close()
+                columns = [desc[0] for desc in c.description]
+                rows = [dict(zip(columns, row)) for row in c.fetchall()]
         else:
             # SQLite
-            conn = sqlite3.connect(DB_NAME)
-            conn.row_factory = sqlite3.Row
-            c = conn.cursor()
-            c.execute("""
-                SELECT c.*, 
-                (SELECT message FROM transcripts t WHERE t.call_sid = c.call_sid ORDER BY t.id DESC LIMIT 1) as last_message
-                FROM calls c 
-                ORDER BY c.timestamp DESC LIMIT 50
-            """)
-            rows = [dict(row) for row in c.fetchall()]
-            conn.close()
+            with get_db_connection() as conn:
+                c = conn.cursor()
+                c.row_factory = sqlite3.Row
+                c.execute(f"""
+                    SELECT c.* FROM calls c 
+                    {where}
+                    ORDER BY c.timestamp_ms DESC, c.call_sid DESC LIMIT {p}
+                """, params + [limit + 1])
+                rows = [dict(row) for row in c.fetchall()]
         
-        return jsonify(rows)
+        response = jsonify(rows[:limit])
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            response.headers['X-Next-Cursor'] = encode_logs_cursor(last['timestamp_ms'], last['call_sid'])
+        response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+        return response
     except Exception as e:
         print(f"Error fetching logs: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route("/download-logs")
-def download_logs():
-    """Export all transcripts to CSV."""
+@app.route("/api/events")
+def live_events_stream():
+    """Server-Sent Events feed of new calls (``call``), transcript lines (``transcript``)
+    and fraud flags (``suspicious``). Reconnects resume from Last-Event-ID; a ``reset``
+    event means the gap was too large and the client should reload /api/logs."""
+    if not event_hub.enabled:
+        return jsonify({"error": "Live events are disabled"}), 503
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
     try:
-        if DB_TYPE == "postgres" and USING_POSTGRES:
-            conn = get_db_connection()
-            c = conn.cursor()
-            c.execute("""
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"error": "Invalid Last-Event-ID"}), 400
+    subscription = event_hub.subscribe(last_event_id)
+    if subscription is None:
+        return jsonify({"error": "Too many live event subscribers"}), 503
+
+    def generate():
+        try:
+            yield from subscription.stream()
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # stop nginx from buffering the stream
+    })
+
+@app.route("/api/live-events")
+def live_events_stats():
+    """Live feed subscribers, polls and replay counters for this worker."""
+    return jsonify(event_hub.stats())
+
+@app.route("/api/db-pool")
+def db_pool_stats():
+    """Connection pool metrics for this worker (in use, waits, wait time)."""
+    return jsonify(db_pool.stats())
+
+@app.route("/api/write-behind")
+def write_behind_stats():
+    """Write-behind queue depth and flush counters for this worker."""
+    return jsonify(write_behind.stats())
+
+@app.route("/api/outbound-dispatcher")
+def outbound_dispatcher_stats():
+    """Outbound dialer counters and configured calls-per-second for this worker."""
+    return jsonify(outbound_dispatcher.stats())
+
+@app.route("/api/conversation-store")
+def conversation_store_stats():
+    """Conversation state cache hits, misses and evictions for this worker."""
+    return jsonify(conversation_store.stats())
+
+@app.route("/api/context-window")
+def context_window_stats():
+    """Rolling summarizer counters for this worker."""
+    return jsonify(summarizer.stats())
+
+EXPORT_HEADER = ['Call Time', 'Direction', 'From', 'To', 'Speaker', 'Message']
+EXPORT_FETCH_SIZE = int(os.environ.get("EXPORT_FETCH_SIZE", 2000))
+
+def parse_date_bound(value, end=False):
+    """ISO date/datetime query value (server local time) -> datetime; a bare end
+    date includes that whole day."""
+    bound = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        bound += timedelta(days=1)
+    return bound
+
+def call_filters(args):
+    """Date-range and direction conditions on calls (alias ``c``). Raises ValueError on bad input."""
+    p = '%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+    clauses, params = [], []
+    if args.get('start'):
+        clauses.append(f"c.timestamp_ms >= {p}")
+        params.append(int(parse_date_bound(args['start']).timestamp() * 1000))
+    if args.get('end'):
+        clauses.append(f"c.timestamp_ms < {p}")
+        params.append(int(parse_date_bound(args['end'], end=True).timestamp() * 1000))
+    if args.get('direction'):
+        direction = args['direction'].capitalize()
+        if direction not in ('Inbound', 'Outbound'):
+            raise ValueError("direction must be Inbound or Outbound")
+        clauses.append(f"c.direction = {p}")
+        params.append(direction)
+    return clauses, params
+
+def export_filters(args):
+    """WHERE clause and params for /download-logs. Raises ValueError on bad input."""
+    p = '%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+    clauses, params = call_filters(args)
+    if args.get('call_sid'):
+        clauses.append(f"c.call_sid = {p}")
+        params.append(args['call_sid'])
+    if args.get('since'):
+        # Incremental export: only transcript rows written after the previous export's cursor
+        clauses.append(f"t.id > {p}")
+        params.append(int(args['since']))
+    return clauses, params
+
+def export_rows(clauses, params):
+    """Yield export rows in chunks without loading the result set into memory."""
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    if DB_TYPE == "postgres" and USING_POSTGRES:
+        with get_db_connection() as conn:
+            # Named (server-side) cursor: rows arrive EXPORT_FETCH_SIZE at a time
+            c = conn.cursor(name=f"export_{uuid.uuid4().hex}")
+            c.itersize = EXPORT_FETCH_SIZE
+            c.execute(f"""
                 SELECT 
                     c.timestamp::text,
                     c.direction,
@@ -387,83 +764,254 @@ def download_logs():
                     t.message 
                 FROM transcripts t 
                 JOIN calls c ON t.call_sid = c.call_sid 
-                ORDER BY c.timestamp DESC, t.id ASC
-            """)
-            rows = c.fetchall()
-            conn.close()
-        else:
-            # SQLite
-            conn = sqlite3.connect(DB_NAME)
+                {where}
+                ORDER BY c.timestamp_ms DESC, t.id ASC
+            """, params)
+            while True:
+                rows = c.fetchmany(EXPORT_FETCH_SIZE)
+                if not rows:
+                    break
+                yield rows
+            c.close()
+            conn.commit()
+    else:
+        # SQLite
+        with get_db_connection() as conn:
             c = conn.cursor()
-            c.execute("""
+            c.execute(f"""
                 SELECT c.timestamp, c.direction, c.from_number, c.to_number, t.role, t.message 
                 FROM transcripts t 
                 JOIN calls c ON t.call_sid = c.call_sid 
-                ORDER BY c.timestamp DESC, t.id ASC
-            """)
-            rows = c.fetchall()
-            conn.close()
+                {where}
+                ORDER BY c.timestamp_ms DESC, t.id ASC
+            """, params)
+            while True:
+                rows = c.fetchmany(EXPORT_FETCH_SIZE)
+                if not rows:
+                    break
+                yield rows
+            c.close()
 
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Call Time', 'Direction', 'From', 'To', 'Speaker', 'Message'])
-        writer.writerows(rows)
-        
-        csv_content = output.getvalue()
+def export_csv_chunks(clauses, params, compress=False):
+    """Encoded CSV (optionally gzip) chunks for a streamed response."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    gzip_stream = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def drain():
+        data = output.getvalue().encode('utf-8')
+        output.seek(0)
+        output.truncate(0)
+        return gzip_stream.compress(data) if gzip_stream else data
+
+    writer.writerow(EXPORT_HEADER)
+    yield drain()
+    try:
+        for rows in export_rows(clauses, params):
+            writer.writerows(rows)
+            chunk = drain()
+            if chunk:
+                yield chunk
+    except Exception as e:
+        # Headers are already sent; end the file with a marker instead of a 500
+        print(f"Error streaming logs: {e}")
+        writer.writerow(['# export incomplete', str(e)])
+        yield drain()
+    if gzip_stream:
+        yield gzip_stream.flush()
+
+@app.route("/download-logs")
+def download_logs():
+    """Export transcripts to CSV, streamed.
+
+    Query parameters: start / end (ISO date or datetime, end date inclusive),
+    direction, call_sid, since (X-Export-Cursor of a previous export) and
+    gzip=1. The X-Export-Cursor response header is the value to pass as
+    ``since`` next time to get only newer transcript rows.
+    """
+    try:
+        clauses, params = export_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid filter: {e}"}), 400
+    try:
+        # Snapshot the newest transcript id so the cursor matches what is exported
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT COALESCE(MAX(id), 0) FROM transcripts")
+            cursor_id = c.fetchone()[0]
+            conn.commit()
+        p = '%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+        clauses.append(f"t.id <= {p}")
+        params.append(cursor_id)
+
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        filename = f"call_logs_{datetime.now().strftime('%Y-%m-%d')}.csv" + (".gz" if compress else "")
         return Response(
-            csv_content, 
-            mimetype="text/csv",
-            headers={"Content-Disposition": f"attachment;filename=call_logs_{datetime.now().strftime('%Y-%m-%d')}.csv"}
+            stream_with_context(export_csv_chunks(clauses, params, compress)),
+            mimetype="application/gzip" if compress else "text/csv",
+            headers={
+                "Content-Disposition": f"attachment;filename={filename}",
+                "X-Export-Cursor": str(cursor_id),
+                "Access-Control-Expose-Headers": "X-Export-Cursor",
+            }
         )
     except Exception as e:
         print(f"Error downloading logs: {e}")
         return jsonify({"error": str(e)}), 500
 
+# Voice webhooks take the request values (query string and form) and return TwiML, so
+# the Flask routes below and the async serving mode (async_app.py) share them. The ones
+# that wait on Groq are generators of their blocking steps, performed by run_webhook:
+#   ('chat', params) -> (completion, llm path)   ('stream', params) -> (reply, first sentence)
+#   ('wait_done', (reply, timeout)) -> done   ('wait_finished', reply)   ('sleep', seconds)
+# async_app.py awaits the same steps on its event loop instead of blocking a thread.
+
+def perform_step(op, arg):
+    if op == 'chat':
+        return llm_budget.complete(groq_chat, arg)
+    if op == 'stream':
+        reply = StreamingReply(groq_chat(**arg))
+        return reply, reply.wait_first_sentence(STREAM_FIRST_SENTENCE_TIMEOUT)
+    if op == 'wait_done':
+        return arg[0].wait_done(arg[1])
+    if op == 'wait_finished':
+        return arg.wait_finished(STREAM_COMPLETE_TIMEOUT)
+    if op == 'sleep':
+        return time.sleep(arg)
+    raise ValueError(f"Unknown webhook step {op!r}")
+
+def run_webhook(steps):
+    """Drive a webhook generator to its TwiML, performing each step inline."""
+    result, error = None, None
+    while True:
+        try:
+            op, arg = steps.throw(error) if error is not None else steps.send(result)
+        except StopIteration as done:
+            return done.value
+        result, error = None, None
+        try:
+            result = perform_step(op, arg)
+        except Exception as e:
+            error = e
+
+# The menu, "Invalid selection" and /listen documents are built once per language and voice
+twiml_cache = TwimlCache(enabled=os.environ.get("TWIML_CACHE_ENABLED", "true").lower() == "true")
+
+# Fixed prompts synthesized ahead of time by scripts/build_audio_cache.py, played instead of said
+audio_cache = AudioCache(
+    os.environ.get("AUDIO_CACHE_DIR", "audio_cache"),
+    base_url=os.environ.get("AUDIO_BASE_URL", "/audio"),
+    enabled=os.environ.get("AUDIO_CACHE_ENABLED", "true").lower() == "true",
+)
+
+MENU_PROMPTS = (
+    ("Your call will be recorded for training purposes.", None, None),
+    ("Hindi ke liye, ek dabayein. For English, press two.", 'Polly.Aditi', 'hi-IN'),
+    ("Invalid selection.", 'Polly.Aditi', None),
+)
+
+def fixed_prompts():
+    """(text, voice, language) of every prompt worth pre-synthesizing."""
+    prompts = list(MENU_PROMPTS)
+    for config in LANG_CONFIG.values():
+        for voice in (config['voice_female'], config['voice_male']):
+            for key in ('greeting', 'listen_prompt', 'fallback_msg', 'refusal_msg'):
+                prompts.append((config[key], voice, config['code']))
+    return list(dict.fromkeys(prompts))
+
+def speak(verb, text, voice=None, language=None):
+    """<Play> the prompt's pre-synthesized audio if there is one, else <Say> it."""
+    url = audio_cache.url(text, voice, language)
+    if url:
+        return verb.play(url)
+    return verb.say(text, voice=voice, language=language)
+
+@app.route("/audio/<path:filename>")
+def audio_file(filename):
+    """Prompt audio; the names are content hashes, so clients may cache them for good."""
+    response = send_from_directory(os.path.abspath(audio_cache.directory), filename, max_age=AUDIO_MAX_AGE)
+    response.headers['Cache-Control'] = f"public, max-age={AUDIO_MAX_AGE}, immutable"
+    return response
+
+# Per-caller and per-prefix call limits, and a temporary block for numbers flagged in suspicious_activity.
+# "db" also counts the calls and flags logged by the other workers (read in the background).
+caller_guard = CallerGuard(
+    caller_calls=int(os.environ.get("CALLER_LIMIT_CALLS", 5)),
+    caller_window=float(os.environ.get("CALLER_LIMIT_WINDOW", 300)),
+    prefix_calls=int(os.environ.get("PREFIX_LIMIT_CALLS", 30)),
+    prefix_window=float(os.environ.get("PREFIX_LIMIT_WINDOW", 60)),
+    prefix_length=int(os.environ.get("PREFIX_LENGTH", 10)),
+    block_after=int(os.environ.get("BLOCK_AFTER_FLAGS", 3)),
+    block_window=float(os.environ.get("BLOCK_WINDOW", 86400)),
+    exempt=[os.environ.get("TWILIO_PHONE_NUMBER")] + os.environ.get("CALLER_GUARD_EXEMPT", "").split(","),
+    backend=SQLCallerGuardBackend(
+        get_db_connection,
+        placeholder='%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+    ) if os.environ.get("CALLER_GUARD_STORE", "memory").lower() == "db" else None,
+    sync_interval=float(os.environ.get("CALLER_GUARD_SYNC_INTERVAL", 5)),
+    enabled=os.environ.get("CALLER_GUARD_ENABLED", "true").lower() == "true",
+)
+
+@app.before_request
+def start_caller_guard():
+    # Started on the first request of each worker process (threads do not survive fork)
+    caller_guard.ensure_started()
+
+def rejected_call_twiml():
+    resp = VoiceResponse()
+    resp.reject(reason='busy')
+    return str(resp)
+
 @app.route("/voice", methods=['GET', 'POST'])
 def voice():
     """Entry point: Ask for language."""
-    resp = VoiceResponse()
-    
-    # Log incoming call
-    call_sid = request.values.get('CallSid', 'unknown')
-    from_number = request.values.get('From', 'unknown')
-    to_number = request.values.get('To', 'unknown')
-    log_call(call_sid, from_number, to_number, 'Inbound')
-
     session.clear()
+    return voice_twiml(request.values)
+
+def voice_twiml(values):
+    call_sid = values.get('CallSid', 'unknown')
+    from_number = values.get('From', 'unknown')
+    to_number = values.get('To', 'unknown')
+    # Over-limit and blocked callers are turned away before anything is logged
+    if not values.get('Direction', 'inbound').startswith('outbound'):
+        rejected = caller_guard.check(values.get('From'), call_sid)
+        if rejected:
+            VOICE_REJECTED.labels(rejected).inc()
+            return twiml_cache.render('rejected-call', rejected_call_twiml)
+
+    # Log incoming call; the row is queued (or written on another thread), never waited for
+    log_call(call_sid, from_number, to_number, 'Inbound', defer=True)
     
     # Check for custom message in query params (sent from outbound logic)
-    custom_message = request.values.get('custom_message')
+    custom_message = values.get('custom_message')
+    action_query = f"?custom_message={quote(custom_message)}" if custom_message else ''
+    return twiml_cache.render('voice', language_menu_twiml, action_query=action_query)
+
+def language_menu_twiml(action_query):
+    resp = VoiceResponse()
     
     # Add recording disclaimer
-    resp.say("Your call will be recorded for training purposes.")
+    speak(resp, *MENU_PROMPTS[0])
     
-    gather_action = '/set-language'
-    if custom_message:
-         from urllib.parse import quote
-         gather_action += f"?custom_message={quote(custom_message)}"
-
-    gather = Gather(num_digits=1, action=gather_action, method='POST', timeout=10)
-    gather.say("Hindi ke liye, ek dabayein. For English, press two.", language='hi-IN',voice='Polly.Aditi' )
+    gather = Gather(num_digits=1, action='/set-language' + action_query, method='POST', timeout=10)
+    speak(gather, *MENU_PROMPTS[1])
     resp.append(gather)
     resp.redirect('/voice')
     return str(resp)
 
 @app.route("/set-language", methods=['POST'])
 def set_language():
-    digit = request.values.get('Digits')
+    return set_language_twiml(request.values)
+
+def set_language_twiml(values):
+    digit = values.get('Digits')
     # Retrieve passed custom message
-    custom_message = request.values.get('custom_message')
+    custom_message = values.get('custom_message')
     
     if digit not in ['1', '2']:
-        resp = VoiceResponse()
-        resp.say("Invalid selection.", voice='Polly.Aditi')
-        resp.redirect('/voice')
-        return str(resp)
+        return twiml_cache.render('invalid-selection', invalid_selection_twiml)
     
     config = LANG_CONFIG[digit]
-    session['lang_id'] = digit
     
     # If custom message, override system prompt or greeting?
     # Let's say options: 1. Override Greeting. 2. Just say it.
@@ -475,96 +1023,572 @@ def set_language():
         # Also maybe inject into system prompt logic context? 
         # "You initiated this call with: <msg>"
     
-    session['messages'] = [{"role": "system", "content": config['system_prompt']}]
-    session['voice'] = config['voice_female']  # Default to female voice, can be changed based on detection
+    call_sid = values.get('CallSid', 'unknown')
+    conversation_store.save(call_sid, new_conversation(digit))
     
     resp = VoiceResponse()
     gather = Gather(num_digits=1, action='/handle-input', method='POST', input='speech', timeout=3, language=config['code'])
-    gather.say(greeting_text, language=config['code'], voice=config['voice_female'])
+    speak(gather, greeting_text, config['voice_female'], config['code'])
     resp.append(gather)
     resp.redirect('/listen')
     return str(resp)
 
 @app.route("/listen", methods=['GET', 'POST'])
 def listen():
-    lang_id = session.get('lang_id', '2')
-    config = LANG_CONFIG.get(lang_id, LANG_CONFIG['2'])
+    return listen_twiml(request.values)
+
+def invalid_selection_twiml():
+    resp = VoiceResponse()
+    speak(resp, *MENU_PROMPTS[2])
+    resp.redirect('/voice')
+    return str(resp)
+
+def listen_twiml(values):
+    state = load_conversation(values.get('CallSid', 'unknown'))
+    lang_id = state['lang_id'] if state['lang_id'] in LANG_CONFIG else '2'
+    voice = state.get('voice', LANG_CONFIG[lang_id].get('voice_female', 'Polly.Aditi'))
+    return twiml_cache.render(('listen', lang_id, voice), lambda: listen_prompt_twiml(LANG_CONFIG[lang_id], voice))
+
+def listen_prompt_twiml(config, voice):
     resp = VoiceResponse()
-    voice = session.get('voice', config.get('voice_female', 'Polly.Aditi'))
     gather = Gather(action='/handle-input', method='POST', input='speech', timeout=3, language=config['code'])
     resp.append(gather)
-    resp.say(config['listen_prompt'], language=config['code'], voice=voice)
+    speak(resp, config['listen_prompt'], voice, config['code'])
     resp.redirect('/listen')
     return str(resp)
 
+# Groq completion settings shared by the streaming and non-streaming paths
+GROQ_CHAT_PARAMS = dict(
+    model="llama-3.3-70b-versatile",  # Best available model on Groq
+    temperature=0.6,  # Slightly lower for more consistent government info
+    max_tokens=150,  # Keep responses concise for voice
+    top_p=0.9,  # Better quality responses
+)
+
+OPINION_KEYWORDS = ['i think', 'i believe', 'my opinion', 'personally']
+
+def screen_reply(text):
+    """Strip the [SUSPICIOUS] tag and run the boundary check on model output.
+
+    Returns (clean_text, suspicious, off_limits).
+    """
+    suspicious = '[SUSPICIOUS]' in text
+    if suspicious:
+        # Remove the tag for speech output
+        text = text.replace('[SUSPICIOUS]', '').strip()
+    off_limits = any(keyword in text.lower() for keyword in OPINION_KEYWORDS)
+    return text, suspicious, off_limits
+
+def boundary_fallback(config):
+    return config['fallback_msg'] + " Please contact the official helpline for detailed guidance."
+
+# Sensitive-data requests (voter lists, other people's details) are refused before any Groq call;
+# fraud_rules.json is re-read when it changes
+fraud_screen = FraudScreen(
+    os.environ.get("FRAUD_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fraud_rules.json")),
+    reload_interval=float(os.environ.get("FRAUD_RULES_RELOAD_INTERVAL", 5)),
+    enabled=os.environ.get("FRAUD_SCREEN_ENABLED", "true").lower() == "true",
+)
+
+# Simple and conversational turns ("haan", "repeat that") go to the small model, scheme questions to the large one
+model_router = ModelRouter(
+    small_model=os.environ.get("ROUTER_SMALL_MODEL", "llama-3.1-8b-instant"),
+    large_model=GROQ_CHAT_PARAMS['model'],
+    max_simple_words=int(os.environ.get("ROUTER_MAX_SIMPLE_WORDS", 4)),
+    extra_simple=[p.strip() for p in os.environ.get("ROUTER_SIMPLE_PHRASES", "").split(",") if p.strip()],
+    extra_complex=[k.strip() for k in os.environ.get("ROUTER_COMPLEX_KEYWORDS", "").split(",") if k.strip()],
+    enabled=os.environ.get("ROUTER_ENABLED", "true").lower() == "true",
+)
+
+# Per-turn latency budget: hedge to the fast model after LLM_HEDGE_AFTER seconds,
+# give up with fallback_msg after LLM_HARD_CAP (well inside Twilio's 15 s webhook timeout)
+llm_budget = LatencyBudget(
+    hedge_after=float(os.environ.get("LLM_HEDGE_AFTER", 2.5)),
+    hard_cap=float(os.environ.get("LLM_HARD_CAP", 7)),
+    fallback_model=os.environ.get("LLM_FALLBACK_MODEL", "llama-3.1-8b-instant"),
+    workers=int(os.environ.get("LLM_THREADS", 32)),
+    enabled=os.environ.get("LLM_BUDGET_ENABLED", "true").lower() == "true",
+)
+
+# Streaming mode: speak the first sentence while the rest is still being generated
+STREAM_RESPONSES = os.environ.get("STREAM_RESPONSES", "false").lower() == "true"
+STREAM_FIRST_SENTENCE_TIMEOUT = float(os.environ.get("STREAM_FIRST_SENTENCE_TIMEOUT", 4))
+STREAM_COMPLETE_TIMEOUT = float(os.environ.get("STREAM_COMPLETE_TIMEOUT", 15))
+reply_buffer = ReplyBuffer()
+latency_stats = LatencyRecorder()
+
+# Answers to repeated first questions (PM-KISAN, Ayushman Bharat, PMAY...) skip the Groq call
+answer_cache = AnswerCache(
+    max_entries=int(os.environ.get("ANSWER_CACHE_SIZE", 2000)),
+    ttl=int(os.environ.get("ANSWER_CACHE_TTL", 21600)),
+    backend=SQLAnswerCacheBackend(
+        get_db_connection,
+        placeholder='%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+    ) if os.environ.get("ANSWER_CACHE_PERSIST", "false").lower() == "true" else None,
+    enabled=os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true",
+)
+
+def finish_streamed_reply(call_sid, config, from_number, user_speech, full_text, error):
+    """Runs when a streamed completion ends: log it and park the unspoken rest in call state."""
+    state = load_conversation(call_sid)
+    pending = state.get('pending_reply') or {}
+    spoken = pending.get('spoken', '')
+    if error is not None:
+        print(f"Error: {error}")
+        GROQ_ERRORS.labels(GROQ_CHAT_PARAMS['model'], type(error).__name__).inc()
+        rest = config['fallback_msg']
+    else:
+        rest, suspicious, off_limits = screen_reply(full_text[len(spoken):].strip())
+        if suspicious and not pending.get('flagged'):
+            log_suspicious_activity(call_sid, from_number, f"Suspicious Query: {user_speech}")
+        if off_limits:
+            rest = boundary_fallback(config)
+        elif not suspicious and not pending.get('flagged'):
+            answer_cache.put(pending.get('cache_key'), f"{screen_reply(spoken)[0]} {rest}".strip())
+    spoken_text = screen_reply(spoken)[0]
+    ai_response = f"{spoken_text} {rest}".strip()
+    log_transcript(call_sid, 'AI', ai_response)
+    state['messages'].append({"role": "assistant", "content": ai_response})
+    state['pending_reply'] = {'status': 'ready', 'rest': rest}
+    conversation_store.save(call_sid, state)
+    schedule_summary(call_sid, state)
+
+def record_turn_latency(call_sid, state, mode, turn, llm):
+    """Store where one /handle-input turn spent its time and which model answered, next to its transcript rows."""
+    now = datetime.now()
+    LLM_TURNS.labels(llm['path']).inc()
+    LLM_TURN_SECONDS.labels(llm['path']).observe(turn.ms('groq') / 1000)
+    latency_stats.record(f"llm.{llm['path']}", turn.ms('groq') / 1000)
+    for kind in ('prompt', 'completion'):
+        if llm.get(f'{kind}_tokens') is not None:
+            LLM_TOKENS.labels(llm['model'], kind).inc(llm[f'{kind}_tokens'])
+    log_row('turn_latencies', (call_sid, state['user_turns'], state['lang_id'], mode, llm['path'], llm['model'],
+                               llm['route'], llm.get('prompt_tokens'), llm.get('completion_tokens'),
+                               turn.ms('db'), turn.ms('groq'), turn.ms('post'), turn.ms('twiml'), turn.total_ms(),
+                               now.date().isoformat(), int(now.timestamp() * 1000)))
+
 @app.route("/handle-input", methods=['GET', 'POST'])
 def handle_input():
-    lang_id = session.get('lang_id', '2')
-    config = LANG_CONFIG.get(lang_id, LANG_CONFIG['2'])
+    return run_webhook(handle_input_steps(request.values))
+
+def handle_input_steps(values):
+    # Phases: db (call state and log writes), groq, post (screening, caching), twiml
+    turn = PhaseTimer()
+    user_speech = values.get('SpeechResult')
+    call_sid = values.get('CallSid', 'unknown')
+    from_number = values.get('From', 'unknown')
+
+    state = load_conversation(call_sid)
+    config = LANG_CONFIG.get(state['lang_id'], LANG_CONFIG['2'])
     resp = VoiceResponse()
-    
-    user_speech = request.values.get('SpeechResult')
-    call_sid = request.values.get('CallSid', 'unknown')
+    turn.lap('db')
     
     if user_speech:
         log_transcript(call_sid, 'User', user_speech)
+        turn.lap('db')
 
-        messages = session.get('messages', [{"role": "system", "content": config['system_prompt']}])
+        messages = state['messages']
+        state.pop('pending_reply', None)
         
-        # Add reminder prompt to keep AI within boundaries (every 3 exchanges)
-        conversation_length = len([m for m in messages if m['role'] == 'user'])
-        if conversation_length > 0 and conversation_length % 3 == 0:
-            boundary_reminder = {
-                "role": "system", 
-                "content": "REMINDER: Stay strictly within government services context. Do not provide personal opinions, financial/medical/legal advice, or discuss non-governmental topics."
-            }
-            messages.append(boundary_reminder)
+        # The boundary reminder (every 3 exchanges) is added by the context window
+        conversation_length = state.get('user_turns', len([m for m in messages if m['role'] == 'user']))
+        state['user_turns'] = conversation_length + 1
         
         messages.append({"role": "user", "content": user_speech})
+        voice = state.get('voice', config.get('voice_female', 'Polly.Aditi'))
+
+        # Sensitive-data requests get the canned refusal; nothing is looked up or sent to Groq
+        screened = fraud_screen.check(user_speech)
+        if screened is not None:
+            FRAUD_SCREEN_MATCHES.labels(screened['id']).inc()
+            log_suspicious_activity(call_sid, from_number, f"Suspicious Query ({screened['reason']}): {user_speech}")
+
+        # Only opening questions are stored (later turns may depend on context),
+        # but any turn can be answered from the cache
+        cache_key = answer_cache.key_for(state['lang_id'], user_speech)
+        cached_answer = answer_cache.get(cache_key) if screened is None else None
+        store_key = cache_key if conversation_length == 0 and screened is None else None
+        mode = ('screened' if screened is not None else 'cache_hit' if cached_answer is not None
+                else 'streaming' if STREAM_RESPONSES else 'full')
+        llm = {'path': 'screen' if screened is not None else 'cache' if cached_answer is not None
+               else 'stream' if STREAM_RESPONSES else 'primary', 'model': None, 'route': None}
+        chat_params = GROQ_CHAT_PARAMS
+        if cached_answer is None and screened is None:
+            llm['model'], llm['route'] = model_router.route(user_speech, config['code'])
+            LLM_ROUTES.labels(llm['model'], llm['route']).inc()
+            chat_params = dict(GROQ_CHAT_PARAMS, model=llm['model'])
+        turn.lap('post')
         
         try:
-            chat_completion = groq_client.chat.completions.create(
-                messages=messages,
-                model="llama-3.3-70b-versatile",  # Best available model on Groq
-                temperature=0.6,  # Slightly lower for more consistent government info
-                max_tokens=150,  # Keep responses concise for voice
-                top_p=0.9,  # Better quality responses
-            )
-            ai_response = chat_completion.choices[0].message.content
+            if screened is not None:
+                ai_response = config['refusal_msg']
+            elif cached_answer is not None:
+                ai_response = cached_answer
+            elif STREAM_RESPONSES:
+                streamed_at = time.monotonic()
+                reply, first_sentence = yield 'stream', dict(
+                    messages=build_chat_messages(state), stream=True, **chat_params)
+                turn.lap('groq')
+                if first_sentence and not reply.done:
+                    spoken, suspicious, off_limits = screen_reply(first_sentence)
+                    if not off_limits:
+                        # Speak the first sentence now; /continue-response picks up the rest
+                        if suspicious:
+                            log_suspicious_activity(call_sid, from_number, f"Suspicious Query: {user_speech}")
+                        state['pending_reply'] = {'status': 'streaming', 'spoken': first_sentence,
+                                                  'flagged': suspicious, 'cache_key': store_key}
+                        conversation_store.save(call_sid, state)
+                        turn.lap('db')
+                        reply_buffer.put(call_sid, reply)
+                        reply.on_complete(lambda text, error: finish_streamed_reply(
+                            call_sid, config, from_number, user_speech, text, error))
+                        turn.lap('post')
+                        resp.say(spoken, language=config['code'], voice=voice)
+                        resp.redirect('/continue-response')
+                        twiml = str(resp)
+                        turn.lap('twiml')
+                        latency_stats.record('ttfa.streaming', turn.total_ms() / 1000)
+                        record_turn_latency(call_sid, state, mode, turn, llm)
+                        return twiml
+                    reply.cancel()
+                    ai_response = first_sentence
+                else:
+                    timeout = STREAM_COMPLETE_TIMEOUT
+                    if llm_budget.enabled:
+                        timeout = min(timeout, max(0.0, streamed_at + llm_budget.hard_cap - time.monotonic()))
+                    done = yield 'wait_done', (reply, timeout)
+                    turn.lap('groq')
+                    if not done:
+                        reply.cancel()
+                        raise LLMUnavailable('timeout')
+                    if reply.error is not None:
+                        GROQ_ERRORS.labels(chat_params['model'], type(reply.error).__name__).inc()
+                        raise reply.error
+                    ai_response = reply.text()
+            else:
+                chat_completion, llm['path'] = yield 'chat', dict(
+                    messages=build_chat_messages(state), **chat_params)
+                ai_response = chat_completion.choices[0].message.content
+                if llm['path'] == 'fast':
+                    llm['model'] = llm_budget.fallback_model
+                usage = getattr(chat_completion, 'usage', None)
+                if usage is not None:
+                    llm['prompt_tokens'], llm['completion_tokens'] = usage.prompt_tokens, usage.completion_tokens
+                turn.lap('groq')
             
             # Check for suspicious activity flag from AI
-            if '[SUSPICIOUS]' in ai_response:
-                from_number = request.values.get('From', 'unknown')
+            ai_response, suspicious, off_limits = screen_reply(ai_response)
+            turn.lap('post')
+            if suspicious:
                 log_suspicious_activity(call_sid, from_number, f"Suspicious Query: {user_speech}")
-                # Remove the tag for speech output
-                ai_response = ai_response.replace('[SUSPICIOUS]', '').strip()
+                turn.lap('db')
 
             # Post-process to ensure boundaries (basic check)
-            if any(keyword in ai_response.lower() for keyword in ['i think', 'i believe', 'my opinion', 'personally']):
-                ai_response = config['fallback_msg'] + " Please contact the official helpline for detailed guidance."
+            if off_limits:
+                ai_response = boundary_fallback(config)
+            elif not suspicious and cached_answer is None and screened is None:
+                answer_cache.put(store_key, ai_response)
+            turn.lap('post')
             
             log_transcript(call_sid, 'AI', ai_response)
             
             messages.append({"role": "assistant", "content": ai_response})
-            session['messages'] = messages
+            conversation_store.save(call_sid, state)
+            turn.lap('db')
+            schedule_summary(call_sid, state)
+            turn.lap('post')
             
-            voice = session.get('voice', config.get('voice_female', 'Polly.Aditi'))
             gather = Gather(num_digits=1, action='/handle-input', method='POST', input='speech', timeout=3, language=config['code'])
-            gather.say(ai_response, language=config['code'], voice=voice)
+            speak(gather, ai_response, voice, config['code'])
             resp.append(gather)
             resp.redirect('/listen')
             
         except Exception as e:
+            # Nearly always the completion failing or timing out; the steps after it lap as they go
+            turn.lap('groq')
+            llm['path'] = e.path if isinstance(e, LLMUnavailable) else 'error'
             print(f"Error: {e}")
-            voice = session.get('voice', config.get('voice_female', 'Polly.Aditi'))
-            resp.say(config['fallback_msg'], language=config['code'], voice=voice)
+            speak(resp, config['fallback_msg'], voice, config['code'])
+        twiml = str(resp)
+        turn.lap('twiml')
+        latency_stats.record(f'ttfa.{mode}', turn.total_ms() / 1000)
+        record_turn_latency(call_sid, state, mode, turn, llm)
+        return twiml
     else:
         resp.redirect('/listen')
 
     return str(resp)
 
+@app.route("/continue-response", methods=['GET', 'POST'])
+def continue_response():
+    """Speak the rest of a streamed reply once generation has finished."""
+    return run_webhook(continue_response_steps(request.values))
+
+def continue_response_steps(values):
+    call_sid = values.get('CallSid', 'unknown')
+    deadline = time.monotonic() + STREAM_COMPLETE_TIMEOUT
+    reply = reply_buffer.pop(call_sid)
+    if reply is not None:
+        yield 'wait_finished', reply
+
+    # The stream may be finishing on another worker: poll the shared call state
+    state = load_conversation(call_sid, fresh=True)
+    while (state.get('pending_reply') or {}).get('status') == 'streaming' and time.monotonic() < deadline:
+        yield 'sleep', 0.05
+        state = load_conversation(call_sid, fresh=True)
+
+    config = LANG_CONFIG.get(state['lang_id'], LANG_CONFIG['2'])
+    voice = state.get('voice', config.get('voice_female', 'Polly.Aditi'))
+    pending = state.pop('pending_reply', None) or {}
+    if pending.get('status') == 'ready':
+        conversation_store.save(call_sid, state)
+        rest = pending.get('rest', '')
+    else:
+        rest = config['fallback_msg']
+
+    resp = VoiceResponse()
+    gather = Gather(num_digits=1, action='/handle-input', method='POST', input='speech', timeout=3, language=config['code'])
+    if rest:
+        speak(gather, rest, voice, config['code'])
+    resp.append(gather)
+    resp.redirect('/listen')
+    return str(resp)
+
+def admin_authorized():
+    """Admin endpoints require ADMIN_TOKEN (Bearer or X-Admin-Token) when it is set."""
+    token = os.environ.get("ADMIN_TOKEN")
+    if not token:
+        return True
+    supplied = request.headers.get('X-Admin-Token') or request.headers.get('Authorization', '').replace('Bearer ', '', 1)
+    return supplied == token
+
+@app.route("/api/admin/answer-cache", methods=['GET'])
+def answer_cache_stats():
+    """Answer cache hit/miss counters for this worker."""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(answer_cache.stats())
+
+@app.route("/api/admin/answer-cache/invalidate", methods=['POST'])
+def invalidate_answer_cache():
+    """Drop cached answers: one question, one language, or everything (empty body)."""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    data = request.get_json(silent=True) or {}
+    lang_id = data.get('lang_id')
+    if lang_id is not None and str(lang_id) not in LANG_CONFIG:
+        return jsonify({"error": f"Unknown lang_id: {lang_id}"}), 400
+    removed = answer_cache.invalidate(lang_id=str(lang_id) if lang_id is not None else None,
+                                      question=data.get('question'))
+    return jsonify({"removed": removed})
+
+@app.route("/api/admin/fraud-screen", methods=['GET'])
+def fraud_screen_stats():
+    """Fraud screen rules loaded in this worker and its match counters."""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(fraud_screen.stats())
+
+@app.route("/api/admin/fraud-screen/reload", methods=['POST'])
+def reload_fraud_screen():
+    """Re-read the rule file in this worker now (the others pick up changes within FRAUD_RULES_RELOAD_INTERVAL)."""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    if not fraud_screen.reload():
+        return jsonify({"error": fraud_screen.last_error}), 400
+    return jsonify(fraud_screen.stats())
+
+@app.route("/api/admin/caller-guard", methods=['GET'])
+def caller_guard_stats():
+    """Caller limits and counters in this worker, and the numbers it is blocking."""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(dict(caller_guard.stats(), blocked_numbers=caller_guard.blocked()))
+
+@app.route("/api/admin/caller-guard/unblock", methods=['POST'])
+def unblock_caller():
+    """Lift a block in this worker by forgetting the number's flags (each worker must be told)."""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    number = (request.get_json(silent=True) or {}).get('number')
+    if not number:
+        return jsonify({"error": "number is required"}), 400
+    return jsonify({"number": number, "was_blocked": caller_guard.unblock(number)})
+
+@app.route("/api/latency")
+def latency_summary():
+    """Latency percentiles recorded by this worker (e.g. time-to-first-audio per mode)."""
+    return jsonify(latency_stats.summary())
+
+TURN_PHASES = ('db_ms', 'groq_ms', 'post_ms', 'twiml_ms', 'total_ms')
+
+def turn_latency_filters(args):
+    """Day range (default: the last 7 days), lang_id, mode, llm_path, model, route and call_sid conditions.
+    Raises ValueError on bad input."""
+    p = '%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+    today = datetime.now().date()
+    start = datetime.fromisoformat(args['start']).date() if args.get('start') else today - timedelta(days=6)
+    end = datetime.fromisoformat(args['end']).date() if args.get('end') else today
+    clauses, params = [f"day >= {p}", f"day <= {p}"], [start.isoformat(), end.isoformat()]
+    for column in ('lang_id', 'mode', 'llm_path', 'model', 'route', 'call_sid'):
+        if args.get(column):
+            clauses.append(f"{column} = {p}")
+            params.append(args[column])
+    return clauses, params
+
+@app.route("/api/turn-latency")
+def turn_latency_summary():
+    """p50/p95/p99 of each /handle-input phase (ms) per day and language, from every worker.
+    Filters: start / end (ISO dates, inclusive), lang_id, mode (full / streaming / cache_hit / screened),
+    llm_path (primary / hedged / fast / stream / cache / screen / timeout / error), model, route."""
+    try:
+        clauses, params = turn_latency_filters(request.args)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    where = ' AND '.join(clauses)
+    groups = []
+    try:
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            if DB_TYPE == "postgres" and USING_POSTGRES:
+                percentiles = ", ".join(
+                    f"percentile_disc(ARRAY[0.5, 0.95, 0.99]) WITHIN GROUP (ORDER BY {phase})" for phase in TURN_PHASES)
+                c.execute(f"""
+                    SELECT day, lang_id, COUNT(*), {percentiles}
+                    FROM turn_latencies WHERE {where}
+                    GROUP BY day, lang_id ORDER BY day DESC, lang_id
+                """, params)
+                for day, lang_id, turns, *values in c.fetchall():
+                    groups.append((day, lang_id, turns, dict(zip(TURN_PHASES, values))))
+            else:
+                # No percentile aggregate in SQLite: sort each group's samples here
+                c.execute(f"""
+                    SELECT day, lang_id, {', '.join(TURN_PHASES)}
+                    FROM turn_latencies WHERE {where} ORDER BY day DESC, lang_id
+                """, params)
+                samples = {}
+                for day, lang_id, *values in c.fetchall():
+                    group = samples.setdefault((day, lang_id), [[] for _ in TURN_PHASES])
+                    for column, value in zip(group, values):
+                        column.append(value)
+                for (day, lang_id), columns in samples.items():
+                    groups.append((day, lang_id, len(columns[0]), {
+                        phase: [percentile(sorted(column), pct) for pct in (50, 95, 99)]
+                        for phase, column in zip(TURN_PHASES, columns)}))
+            conn.commit()
+    except Exception as e:
+        print(f"Error fetching turn latency: {e}")
+        return jsonify({"error": str(e)}), 500
+    return jsonify([
+        dict(day=day, lang_id=lang_id, language=LANG_CONFIG.get(lang_id, {}).get('code'), turns=turns,
+             **{phase[:-3]: {f"p{pct}_ms": round(value, 2) for pct, value in zip((50, 95, 99), values)}
+                for phase, values in phases.items()})
+        for day, lang_id, turns, phases in groups
+    ])
+
+@app.route("/api/turn-latency/slowest")
+def slowest_turns():
+    """The slowest /handle-input turns (by total time) in the day range, with their breakdown."""
+    try:
+        clauses, params = turn_latency_filters(request.args)
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    p = '%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+    columns = (('call_sid', 'turn', 'lang_id', 'mode', 'llm_path', 'model', 'route', 'prompt_tokens', 'completion_tokens')
+               + TURN_PHASES + ('day', 'created_ms'))
+    try:
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                SELECT {', '.join(columns)} FROM turn_latencies
+                WHERE {' AND '.join(clauses)} ORDER BY total_ms DESC LIMIT {p}
+            """, params + [limit])
+            rows = [dict(zip(columns, row)) for row in c.fetchall()]
+            conn.commit()
+    except Exception as e:
+        print(f"Error fetching turn latency: {e}")
+        return jsonify({"error": str(e)}), 500
+    return jsonify(rows)
+
+@app.route("/api/model-router")
+def model_router_stats():
+    """Router settings, this worker's decisions, and per model and route from every worker:
+    turns, mean Groq wait and turn time, and tokens (same filters as /api/turn-latency)."""
+    try:
+        clauses, params = turn_latency_filters(request.args)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    try:
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                SELECT model, route, COUNT(*), AVG(groq_ms), AVG(total_ms),
+                       SUM(prompt_tokens), SUM(completion_tokens), COUNT(prompt_tokens)
+                FROM turn_latencies WHERE {' AND '.join(clauses + ['model IS NOT NULL'])}
+                GROUP BY model, route ORDER BY model, route
+            """, params)
+            rows = c.fetchall()
+            conn.commit()
+    except Exception as e:
+        print(f"Error fetching model router stats: {e}")
+        return jsonify({"error": str(e)}), 500
+    return jsonify(dict(model_router.stats(), turns=[
+        {"model": model, "route": route, "turns": turns, "avg_groq_ms": round(groq_ms, 2),
+         "avg_total_ms": round(total_ms, 2), "prompt_tokens": int(prompt or 0),
+         "completion_tokens": int(completion or 0),
+         "avg_tokens": round((int(prompt or 0) + int(completion or 0)) / with_usage, 1) if with_usage else None}
+        for model, route, turns, groq_ms, total_ms, prompt, completion, with_usage in rows
+    ]))
+
+def place_outbound_call(to_number, payload):
+    """Start one outbound call via Twilio and log it. Returns the call SID."""
+    from_number = os.environ.get("TWILIO_PHONE_NUMBER")
+    if not from_number:
+        raise ValueError("TWILIO_PHONE_NUMBER not configured in environment")
+        
+    options = {}
+    if payload.get('status_callback'):
+        # Final call outcome (completed / busy / no-answer / failed) for campaign retries
+        options = dict(status_callback=payload['status_callback'], status_callback_method='POST')
+    started = time.perf_counter()
+    try:
+        call = twilio_client.calls.create(
+            to=to_number,
+            from_=from_number,
+            url=payload['webhook_url'],
+            **options
+        )
+    except Exception:
+        TWILIO_CREATE_SECONDS.labels('error').observe(time.perf_counter() - started)
+        raise
+    TWILIO_CREATE_SECONDS.labels('ok').observe(time.perf_counter() - started)
+    # Log Outbound Call Start
+    log_call(call.sid, from_number, to_number, 'Outbound')
+    return call.sid
+
+def record_dispatch_result(batch_id, position, to_number, status, call_sid, error):
+    """Persist the outcome of one dialed number so any worker can report batch progress."""
+    p = '%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute(f"""
+            UPDATE outbound_batch_calls SET status = {p}, call_sid = {p}, error = {p}, updated_at = {p}
+            WHERE batch_id = {p} AND position = {p}
+        """, (status, call_sid, error, time.time(), batch_id, position))
+        conn.commit()
+
+# Bulk outbound dialing: bounded worker pool under the Twilio calls-per-second allowance
+outbound_dispatcher = OutboundDispatcher(
+    place_outbound_call,
+    record_dispatch_result,
+    calls_per_second=float(os.environ.get("TWILIO_CALLS_PER_SECOND", 1)),
+    workers=int(os.environ.get("OUTBOUND_WORKERS", 8)),
+)
+
 @app.route("/make-call", methods=['POST'])
 def make_call():
+    """Queue outbound calls and return a batch id; progress is at /api/make-call/<batch_id>."""
     try:
         to_numbers_raw = request.form.get('to_number', '').strip()
         webhook_url = request.form.get('webhook_url', '').strip()
@@ -582,49 +1606,342 @@ def make_call():
         # Append custom message to webhook URL if present
         final_webhook_url = webhook_url
         if custom_message:
-            from urllib.parse import quote
             # Ensure we have ? or &
             separator = '&' if '?' in webhook_url else '?'
             final_webhook_url += f"{separator}custom_message={quote(custom_message)}"
-        
-        successful_calls = []
-        failed_calls = []
-
-        for to_number in to_numbers:
-            try:
-                from_number = os.environ.get("TWILIO_PHONE_NUMBER")
-                if not from_number:
-                    raise ValueError("TWILIO_PHONE_NUMBER not configured in environment")
-                    
-                call = twilio_client.calls.create(
-                    to=to_number,
-                    from_=from_number,
-                    url=final_webhook_url
-                )
-                # Log Outbound Call Start
-                log_call(call.sid, from_number, to_number, 'Outbound')
-                successful_calls.append(to_number)
-            except Exception as e:
-                failed_calls.append({"number": to_number, "error": str(e)})
-                print(f"Failed to call {to_number}: {e}")
-
-        message = f"Initiated {len(successful_calls)} calls."
-        if failed_calls:
-            message += f" Failed: {len(failed_calls)}"
+
+        # Record the batch before dialing so status is available immediately
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        p = '%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"INSERT INTO outbound_batches (batch_id, webhook_url, total, created_at) VALUES ({p}, {p}, {p}, {p})",
+                      (batch_id, final_webhook_url, len(to_numbers), now))
+            c.executemany(f"""
+                INSERT INTO outbound_batch_calls (batch_id, position, to_number, status, updated_at)
+                VALUES ({p}, {p}, {p}, 'queued', {p})
+            """, [(batch_id, position, number, now) for position, number in enumerate(to_numbers)])
+            conn.commit()
+
+        outbound_dispatcher.submit(to_numbers, {'webhook_url': final_webhook_url}, batch_id=batch_id)
             
         return jsonify({
-            "message": message,
-            "successful": successful_calls,
-            "failed": failed_calls,
+            "message": f"Queued {len(to_numbers)} calls.",
+            "batch_id": batch_id,
+            "status_url": f"/api/make-call/{batch_id}",
             "total": len(to_numbers)
-        })
+        }), 202
     except Exception as e:
         print(f"Error in make_call: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/make-call/<batch_id>")
+def make_call_status(batch_id):
+    """Per-number progress of an outbound batch."""
+    try:
+        p = '%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?'
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT total, created_at FROM outbound_batches WHERE batch_id = {p}", (batch_id,))
+            batch = c.fetchone()
+            if not batch:
+                return jsonify({"error": "Unknown batch"}), 404
+            c.execute(f"""
+                SELECT to_number, status, call_sid, error FROM outbound_batch_calls
+                WHERE batch_id = {p} ORDER BY position
+            """, (batch_id,))
+            rows = c.fetchall()
+
+        successful = [number for number, status, _, _ in rows if status == 'initiated']
+        failed = [{"number": number, "error": error} for number, status, _, error in rows if status == 'failed']
+        pending = len(rows) - len(successful) - len(failed)
+        message = f"Initiated {len(successful)} calls."
+        if failed:
+            message += f" Failed: {len(failed)}"
+        if pending:
+            message += f" Pending: {pending}"
+        return jsonify({
+            "batch_id": batch_id,
+            "message": message,
+            "done": pending == 0,
+            "total": batch[0],
+            "pending": pending,
+            "successful": successful,
+            "failed": failed,
+            "calls": [{"number": number, "status": status, "call_sid": call_sid, "error": error}
+                      for number, status, call_sid, error in rows]
+        })
+    except Exception as e:
+        print(f"Error in make_call_status: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# --- Campaigns (durable, scheduled outbound calling) ---
+
+CAMPAIGN_DEFAULT_WINDOW = os.environ.get("CAMPAIGN_WINDOW", "09:00-21:00")
+CAMPAIGN_DEFAULT_TIMEZONE = os.environ.get("CAMPAIGN_TIMEZONE", "Asia/Kolkata")
+
+campaign_backend = SQLCampaignBackend(
+    get_db_connection,
+    placeholder='%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?',
+)
+campaign_scheduler = CampaignScheduler(
+    campaign_backend,
+    place_outbound_call,
+    outbound_dispatcher.bucket,  # campaigns and /make-call share the account's CPS
+    poll_interval=float(os.environ.get("CAMPAIGN_POLL_INTERVAL", 2)),
+    workers=int(os.environ.get("CAMPAIGN_WORKERS", 4)),
+    call_timeout=float(os.environ.get("CAMPAIGN_CALL_TIMEOUT", 3600)),
+    enabled=os.environ.get("CAMPAIGN_SCHEDULER_ENABLED", "true").lower() == "true",
+)
+
+@app.before_request
+def start_campaign_scheduler():
+    # Started on the first request of each worker process (threads do not survive fork)
+    campaign_scheduler.ensure_started()
+
+def campaign_summary(campaign):
+    counts = campaign_backend.status_counts(campaign['campaign_id'])
+    data = {k: v for k, v in campaign.items() if k != 'status_callback'}
+    data['counts'] = counts
+    data['done'] = counts.get('completed', 0) + counts.get('failed', 0)
+    return data
+
+@app.route("/api/campaigns", methods=['POST'])
+def create_campaign():
+    """Create a campaign from pasted numbers (to_number) and/or an uploaded CSV (numbers_file)."""
+    try:
+        webhook_url = request.form.get('webhook_url', '').strip()
+        if not webhook_url:
+            return jsonify({"error": "Missing required parameter: webhook_url"}), 400
+        window = request.form.get('window', CAMPAIGN_DEFAULT_WINDOW).strip()
+        window_start, _, window_end = window.partition('-')
+        try:
+            # Normalized to zero-padded HH:MM so windows compare as strings
+            window_start = datetime.strptime(window_start.strip(), '%H:%M').strftime('%H:%M')
+            window_end = datetime.strptime(window_end.strip(), '%H:%M').strftime('%H:%M')
+            timezone = request.form.get('timezone', CAMPAIGN_DEFAULT_TIMEZONE).strip()
+            ZoneInfo(timezone)
+            max_concurrent = int(request.form.get('max_concurrent', 5))
+            max_attempts = int(request.form.get('max_attempts', 3))
+            retry_delay = float(request.form.get('retry_delay', 900))
+        except Exception as e:
+            return jsonify({"error": f"Invalid campaign settings: {e}"}), 400
+
+        base_url = os.environ.get("PUBLIC_BASE_URL", request.url_root).rstrip('/')
+        campaign_id = campaign_backend.create_campaign(
+            request.form.get('name', '').strip() or None, webhook_url, f"{base_url}/campaign-status",
+            window_start, window_end, timezone, max_concurrent, max_attempts, retry_delay)
+
+        # Numbers are streamed into the table in chunks; uploads are never read whole
+        rejected = []
+        def valid_numbers():
+            sources = [request.form.get('to_number', '').splitlines()]
+            if 'numbers_file' in request.files:
+                sources.append(request.files['numbers_file'].stream)
+            for source in sources:
+                for number, valid in iter_numbers(source):
+                    if valid:
+                        yield number
+                    elif len(rejected) < 100:
+                        rejected.append(number)
+
+        total = campaign_backend.add_numbers(campaign_id, valid_numbers())
+        if not total:
+            campaign_backend.set_status(campaign_id, 'completed')
+            return jsonify({"error": "Please provide at least one valid phone number", "rejected": rejected}), 400
+        campaign_scheduler.wake()
+        return jsonify({
+            "campaign_id": campaign_id,
+            "total": total,
+            "rejected": rejected,
+            "status_url": f"/api/campaigns/{campaign_id}"
+        }), 201
+    except Exception as e:
+        print(f"Error in create_campaign: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/campaigns", methods=['GET'])
+def list_campaigns():
+    try:
+        return jsonify([campaign_summary(campaign) for campaign in campaign_backend.list_campaigns()])
+    except Exception as e:
+        print(f"Error in list_campaigns: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/campaigns/<campaign_id>", methods=['GET'])
+def get_campaign(campaign_id):
+    campaign = campaign_backend.get_campaign(campaign_id)
+    if not campaign:
+        return jsonify({"error": "Unknown campaign"}), 404
+    return jsonify(campaign_summary(campaign))
+
+@app.route("/api/campaigns/<campaign_id>/<action>", methods=['POST'])
+def update_campaign(campaign_id, action):
+    """Pause or resume a campaign. Calls already ringing are not interrupted."""
+    transitions = {'pause': ('paused', 'active'), 'resume': ('active', 'paused')}
+    if action not in transitions:
+        return jsonify({"error": "Unknown action"}), 404
+    status, only_from = transitions[action]
+    if not campaign_backend.set_status(campaign_id, status, only_from=only_from):
+        return jsonify({"error": f"Campaign is not {only_from}"}), 409
+    if status == 'active':
+        campaign_scheduler.wake()
+    return jsonify({"campaign_id": campaign_id, "status": status})
+
+@app.route("/campaign-status", methods=['POST'])
+def campaign_status():
+    """Twilio StatusCallback for campaign calls: schedules a retry or closes the number."""
+    call_sid = request.values.get('CallSid')
+    outcome = request.values.get('CallStatus', '')
+    if call_sid and outcome in ('completed', 'busy', 'no-answer', 'failed', 'canceled'):
+        try:
+            campaign_backend.finish_call(call_sid, outcome, time.time())
+            campaign_scheduler.wake()
+        except Exception as e:
+            print(f"DB Error (Campaign Status): {e}")
+    return ('', 204)
+
+@app.route("/api/campaign-scheduler")
+def campaign_scheduler_stats():
+    """Campaign scheduler tick and dial counters for this worker."""
+    return jsonify(campaign_scheduler.stats())
+
+# --- Metrics and health probes ---
+
+# A call counts as active while its conversation state was saved within this many seconds
+ACTIVE_CALL_WINDOW = float(os.environ.get("ACTIVE_CALL_WINDOW", 120))
+READINESS_CHECKS = [name.strip() for name in os.environ.get("READINESS_CHECKS", "db").split(",") if name.strip()]
+READINESS_TIMEOUT = float(os.environ.get("READINESS_TIMEOUT", 2))
+
+def check_database():
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT 1")
+        c.fetchone()
+        conn.commit()
+
+def check_groq():
+    groq_client.with_options(timeout=READINESS_TIMEOUT, max_retries=0).models.list()
+
+def check_twilio():
+    twilio_client.api.v2010.accounts(twilio_client.account_sid).fetch()
+
+readiness_probe = DependencyProbe(
+    {name: {'db': check_database, 'groq': check_groq, 'twilio': check_twilio}[name] for name in READINESS_CHECKS},
+    timeout=READINESS_TIMEOUT,
+    cache_ttl=float(os.environ.get("READINESS_CACHE_TTL", 5)),
+)
+PROCESS_STARTED = time.time()
+
+Gauge("calls_active", f"Calls whose conversation state changed in the last {ACTIVE_CALL_WINDOW:g} s.",
+      registry=metrics_registry, shared=CONVERSATION_STORE == "db",
+      function=lambda: conversation_store.active_calls(ACTIVE_CALL_WINDOW))
+Gauge("campaign_calls_in_progress", "Campaign numbers being dialed or on a call.",
+      registry=metrics_registry, shared=True, function=lambda: campaign_backend.in_flight())
+Gauge("outbound_calls_dialing", "/make-call numbers waiting on twilio_client.calls.create.",
+      registry=metrics_registry, function=lambda: outbound_dispatcher.stats()['in_flight'])
+Gauge("db_pool_connections", "Database connections held by the pool, by state.",
+      ["state"], registry=metrics_registry,
+      function=lambda: {(state,): db_pool.stats()[state] for state in ('in_use', 'idle')})
+Gauge("write_behind_queue_depth", "Log rows waiting for the background writer.",
+      registry=metrics_registry, function=lambda: write_behind.stats()['queue_depth'])
+Gauge("dependency_up", "1 if the dependency passed its last readiness check.",
+      ["dependency"], registry=metrics_registry, shared=True,
+      function=lambda: {(name,): int(r['ok']) for name, r in readiness_probe.run().items()})
+Gauge("dependency_check_duration_seconds", "Latency of the last readiness check of each dependency.",
+      ["dependency"], registry=metrics_registry, shared=True,
+      function=lambda: {(name,): r['latency_ms'] / 1000 for name, r in readiness_probe.last_results().items()})
+
+@app.before_request
+def start_request_timer():
+    if METRICS_ENABLED:
+        request.environ['metrics.started'] = time.perf_counter()
+        metrics_registry.ensure_started()
+
+@app.after_request
+def record_request_metrics(response):
+    started = request.environ.get('metrics.started')
+    if started is not None:
+        # The URL rule, not the path, so ids in URLs do not create new series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUEST_SECONDS.labels(route).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(route, response.status_code).inc()
+    return response
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route("/healthz")
+def liveness():
+    """Liveness: this worker answers and its background threads are running. No dependency checks,
+    so a database outage does not get healthy workers restarted."""
+    threads = {'write_behind': write_behind.alive(), 'live_events': event_hub.alive(),
+               'campaign_scheduler': campaign_scheduler.alive(), 'caller_guard': caller_guard.alive(),
+               'sheets_outbox': sheets_outbox.alive()}
+    alive = all(threads.values())
+    return jsonify({"status": "ok" if alive else "failing", "threads": threads, "pid": os.getpid(),
+                    "uptime_s": round(time.time() - PROCESS_STARTED, 1)}), 200 if alive else 503
+
+@app.route("/readyz")
+def readiness():
+    """Readiness: every dependency in READINESS_CHECKS answered within READINESS_TIMEOUT."""
+    checks = readiness_probe.run()
+    ready = all(result['ok'] for result in checks.values())
+    return jsonify({"status": "ready" if ready else "unavailable", "checks": checks}), 200 if ready else 503
+
+# /api/submit-query rows reach Google Sheets through the sheets_outbox table: a background
+# thread appends them in batches with one cached client, retrying with backoff.
+GOOGLE_SHEETS_SHEET_ID = os.environ.get('GOOGLE_SHEETS_SHEET_ID')
+GOOGLE_SHEETS_CREDENTIALS_JSON = os.environ.get('GOOGLE_SHEETS_CREDENTIALS_JSON')
+# A local stand-in (see scripts/fake_sheets.py) needs no credentials
+GOOGLE_SHEETS_API_URL = os.environ.get('GOOGLE_SHEETS_API_URL', SHEETS_API_URL)
+
+def sheets_sync_status():
+    """What /api/submit-query reports for the sheet, decided once at startup."""
+    has_credentials = bool(GOOGLE_SHEETS_CREDENTIALS_JSON) and os.path.exists(GOOGLE_SHEETS_CREDENTIALS_JSON)
+    if not GOOGLE_SHEETS_SHEET_ID or not (has_credentials or GOOGLE_SHEETS_API_URL != SHEETS_API_URL):
+        return "Google Sheets not configured"
+    if has_credentials:
+        try:
+            import google.oauth2.service_account  # noqa: F401
+            import google.auth.transport.requests  # noqa: F401
+        except ImportError:
+            return "Google API libraries not installed"
+    return "Queued for Google Sheets"
+
+SHEETS_SYNC_STATUS = sheets_sync_status()
+sheets_outbox_backend = SQLSheetsOutboxBackend(
+    get_db_connection,
+    placeholder='%s' if DB_TYPE == "postgres" and USING_POSTGRES else '?',
+)
+sheets_outbox = SheetsOutbox(
+    sheets_outbox_backend,
+    SheetsClient(
+        GOOGLE_SHEETS_SHEET_ID or '',
+        range_=os.environ.get('GOOGLE_SHEETS_RANGE', 'Sheet1!A:D'),
+        make_session=(lambda: service_account_session(GOOGLE_SHEETS_CREDENTIALS_JSON))
+        if GOOGLE_SHEETS_CREDENTIALS_JSON else None,
+        api_url=GOOGLE_SHEETS_API_URL,
+    ).append,
+    batch_size=int(os.environ.get("SHEETS_BATCH_SIZE", 500)),
+    interval=float(os.environ.get("SHEETS_SYNC_INTERVAL", 2)),
+    max_attempts=int(os.environ.get("SHEETS_MAX_ATTEMPTS", 10)),
+    retry_base=float(os.environ.get("SHEETS_RETRY_BASE", 2)),
+    retry_max=float(os.environ.get("SHEETS_RETRY_MAX", 300)),
+    enabled=SHEETS_SYNC_STATUS == "Queued for Google Sheets",
+)
+
+@app.before_request
+def start_sheets_outbox():
+    # Started on the first request of each worker process (threads do not survive fork)
+    sheets_outbox.ensure_started()
+
 @app.route("/api/submit-query", methods=['POST'])
 def submit_query():
-    """Submit a query/grievance (to be synced with Google Sheets if configured)."""
+    """Submit a query/grievance (queued for Google Sheets if configured)."""
     try:
         data = request.get_json()
         query_text = data.get('query', '').strip()
@@ -633,80 +1950,34 @@ def submit_query():
         if not query_text:
             return jsonify({"error": "Query text is required"}), 400
         
-        # Log to database (PostgreSQL or SQLite)
+        # Log to database (PostgreSQL or SQLite); the sheet row commits with it
+        sheet_row = [datetime.now().strftime('%Y-%m-%d %H:%M:%S'), user, query_text, 'Submitted']
+        google_sync_status = SHEETS_SYNC_STATUS
         try:
-            if DB_TYPE == "postgres" and USING_POSTGRES:
-                conn = get_db_connection()
+            with get_db_connection() as conn:
                 c = conn.cursor()
-                c.execute("""
-                    INSERT INTO queries (timestamp, user_name, query, status)
-                    VALUES (NOW(), %s, %s, %s)
-                """, (user, query_text, 'Submitted'))
+                if DB_TYPE == "postgres" and USING_POSTGRES:
+                    c.execute("""
+                        INSERT INTO queries (timestamp, user_name, query, status)
+                        VALUES (NOW(), %s, %s, %s) RETURNING id
+                    """, (user, query_text, 'Submitted'))
+                    query_id = c.fetchone()[0]
+                    db_status = "Stored in PostgreSQL"
+                else:
+                    c.execute("INSERT INTO queries (timestamp, user, query, status) VALUES (?, ?, ?, ?)",
+                              (datetime.now().isoformat(), user, query_text, 'Submitted'))
+                    query_id = c.lastrowid
+                    db_status = "Stored in SQLite"
+                if sheets_outbox.enabled:
+                    sheets_outbox_backend.add(c, query_id, sheet_row, int(time.time() * 1000))
                 conn.commit()
-                conn.close()
-                db_status = "Stored in PostgreSQL"
-            else:
-                # SQLite
-                conn = sqlite3.connect(DB_NAME)
-                c = conn.cursor()
-                c.execute('''CREATE TABLE IF NOT EXISTS queries 
-                             (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, user TEXT, query TEXT, status TEXT)''')
-                c.execute("INSERT INTO queries (timestamp, user, query, status) VALUES (?, ?, ?, ?)",
-                          (datetime.now().isoformat(), user, query_text, 'Submitted'))
-                conn.commit()
-                conn.close()
-                db_status = "Stored in SQLite"
+            if sheets_outbox.enabled:
+                sheets_outbox.wake()
         except Exception as db_err:
             print(f"Database error: {db_err}")
             db_status = f"Database error: {str(db_err)}"
-        
-        # Attempt to sync with Google Sheets (if configured)
-        google_sync_status = "Not Configured"
-        try:
-            from google.oauth2.service_account import Credentials
-            from google.auth.transport.requests import Request
-            from googleapiclient.discovery import build
-            
-            credentials_path = os.environ.get('GOOGLE_SHEETS_CREDENTIALS_JSON')
-            sheet_id = os.environ.get('GOOGLE_SHEETS_SHEET_ID')
-            
-            if credentials_path and sheet_id and os.path.exists(credentials_path):
-                try:
-                    # Load credentials from JSON file
-                    credentials = Credentials.from_service_account_file(
-                        credentials_path,
-                        scopes=['https://www.googleapis.com/auth/spreadsheets']
-                    )
-                    
-                    # Build the Sheets API client
-                    service = build('sheets', 'v4', credentials=credentials)
-                    
-                    # Prepare the data to append
-                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    values = [[timestamp, user, query_text, 'Submitted']]
-                    
-                    # Append to the sheet (assumes headers in first row)
-                    body = {'values': values}
-                    result = service.spreadsheets().values().append(
-                        spreadsheetId=sheet_id,
-                        range='Sheet1!A:D',
-                        valueInputOption='USER_ENTERED',
-                        body=body
-                    ).execute()
-                    
-                    google_sync_status = "Synced to Google Sheets"
-                    print(f"Successfully appended to sheet: {result}")
-                    
-                except Exception as sheets_err:
-                    google_sync_status = f"Google Sheets error: {str(sheets_err)}"
-                    print(f"Google Sheets sync error: {sheets_err}")
-            else:
-                google_sync_status = "Google Sheets not configured"
-        except ImportError:
-            google_sync_status = "Google API libraries not installed"
-        except Exception as google_err:
-            google_sync_status = f"Error: {str(google_err)}"
-            print(f"Google integration error: {google_err}")
+            if sheets_outbox.enabled:
+                google_sync_status = "Not queued (database error)"
         
         return jsonify({
             "message": "Query submitted successfully",
@@ -718,6 +1989,23 @@ def submit_query():
         print(f"Error in submit_query: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/admin/sheets-outbox", methods=['GET'])
+def sheets_outbox_stats():
+    """Rows waiting for (or given up on by) the Google Sheets sync, and this worker's counters."""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(dict(sheets_outbox.stats(), status=SHEETS_SYNC_STATUS, outbox=sheets_outbox_backend.counts()))
+
+@app.route("/api/admin/sheets-outbox/retry", methods=['POST'])
+def retry_sheets_outbox():
+    """Queue the rows that ran out of attempts again (e.g. after fixing the sheet's sharing)."""
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    requeued = sheets_outbox_backend.retry_failed(int(time.time() * 1000))
+    if requeued:
+        sheets_outbox.wake()
+    return jsonify({"requeued": requeued})
+
 if __name__ == "__main__":
     port = int(os.environ.get('PORT', 8000))
     app.run(host='0.0.0.0', port=port, debug=False)
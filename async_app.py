@@ -0,0 +1,222 @@
+"""
+Async serving mode for the voice webhooks.
+
+Under the sync workers every /handle-input holds a gunicorn thread for the
+whole Groq round trip, so concurrent calls are capped by workers x threads.
+Here the webhook routes run on an aiohttp event loop: Groq is called through
+``AsyncGroq`` and awaited, and the short database steps in between (call
+state, answer cache, log rows) run on a thread pool sized to the DB pool. The
+handlers are the same functions and generators as the Flask routes in app.py,
+so the TwiML is identical. Every other route (dashboard API, exports, SSE,
+/make-call, /metrics...) is passed to the Flask app on a separate pool.
+
+    gunicorn async_app:app -k aiohttp.GunicornWebWorker -w 2 -b 0.0.0.0:8000
+    python async_app.py
+"""
+
+import asyncio
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+import app as sync_app
+from streaming_reply import AsyncStreamingReply
+
+# Blocking database steps of the webhooks; more threads than connections would only queue on the pool
+db_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ASYNC_DB_THREADS", sync_app.DB_POOL_MAX)), thread_name_prefix="async-db")
+# Routes served by the Flask app; SSE clients and exports hold a thread each, as under gthread
+wsgi_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ASYNC_WSGI_THREADS", 32)), thread_name_prefix="async-wsgi")
+
+# The SDK's default pool allows 100 connections, which would cap the calls in flight
+ASYNC_GROQ_CONNECTIONS = int(os.environ.get("ASYNC_GROQ_CONNECTIONS", 1000))
+groq_async = AsyncGroq(
+    api_key=os.environ.get("GROQ_API_KEY"),
+    http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+        max_connections=ASYNC_GROQ_CONNECTIONS, max_keepalive_connections=min(ASYNC_GROQ_CONNECTIONS, 100))),
+)
+
+# Campaign uploads and /make-call batches can carry long number lists
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+
+async def groq_chat_async(max_retries=None, **params):
+    """groq_async.chat.completions.create with the same metrics as app.groq_chat."""
+    started = time.perf_counter()
+    client = groq_async if max_retries is None else groq_async.with_options(max_retries=max_retries)
+    try:
+        return await client.chat.completions.create(**params)
+    except Exception as e:
+        sync_app.GROQ_ERRORS.labels(params['model'], type(e).__name__).inc()
+        raise
+    finally:
+        sync_app.GROQ_REQUEST_SECONDS.labels(params['model'], 'true' if params.get('stream') else 'false').observe(
+            time.perf_counter() - started)
+
+
+async def perform_step(op, arg):
+    """Async counterpart of app.perform_step."""
+    if op == 'chat':
+        return await sync_app.llm_budget.complete_async(groq_chat_async, arg)
+    if op == 'stream':
+        reply = AsyncStreamingReply(await groq_chat_async(**arg), db_executor)
+        return reply, await reply.async_wait_first_sentence(sync_app.STREAM_FIRST_SENTENCE_TIMEOUT)
+    if op == 'wait_done':
+        return await arg[0].async_wait_done(arg[1])
+    if op == 'wait_finished':
+        return await arg.async_wait_finished(sync_app.STREAM_COMPLETE_TIMEOUT)
+    if op == 'sleep':
+        return await asyncio.sleep(arg)
+    raise ValueError(f"Unknown webhook step {op!r}")
+
+
+def advance(steps, result, error):
+    # StopIteration cannot cross a Future, so the generator's return value is passed back as data
+    try:
+        return False, steps.throw(error) if error is not None else steps.send(result)
+    except StopIteration as done:
+        return True, done.value
+
+
+async def run_webhook_async(steps):
+    """Drive a webhook generator: its code runs on db_executor, its steps are awaited here."""
+    loop = asyncio.get_running_loop()
+    result, error = None, None
+    while True:
+        finished, value = await loop.run_in_executor(db_executor, advance, steps, result, error)
+        if finished:
+            return value
+        result, error = None, None
+        try:
+            result = await perform_step(*value)
+        except Exception as e:
+            error = e
+
+
+def run_steps(handler):
+    return lambda values: run_webhook_async(handler(values))
+
+
+def run_blocking(handler):
+    return lambda values: asyncio.get_running_loop().run_in_executor(db_executor, handler, values)
+
+
+# path -> (methods, handler taking the request values); the methods match the Flask routes
+WEBHOOKS = {
+    '/voice': (('GET', 'POST'), run_blocking(sync_app.voice_twiml)),
+    '/set-language': (('POST',), run_blocking(sync_app.set_language_twiml)),
+    '/listen': (('GET', 'POST'), run_blocking(sync_app.listen_twiml)),
+    '/handle-input': (('GET', 'POST'), run_steps(sync_app.handle_input_steps)),
+    '/continue-response': (('GET', 'POST'), run_steps(sync_app.continue_response_steps)),
+}
+
+
+async def request_values(request):
+    """Query string and form fields, the query string first (like Flask's request.values)."""
+    values = {}
+    form = await request.post() if request.method == 'POST' else {}
+    for source in (request.query, form):
+        for key in source.keys():
+            values.setdefault(key, source.get(key))
+    return values
+
+
+async def webhook(request):
+    started = time.perf_counter()
+    route = request.match_info.route.resource.canonical
+    sync_app.campaign_scheduler.ensure_started()
+    sync_app.caller_guard.ensure_started()
+    if sync_app.METRICS_ENABLED:
+        sync_app.metrics_registry.ensure_started()
+    try:
+        twiml = await WEBHOOKS[route][1](await request_values(request))
+        response = web.Response(text=twiml, content_type='text/html', charset='utf-8')
+    except Exception as e:
+        print(f"Error in {route}: {e}")
+        response = web.Response(status=500, text="Internal Server Error")
+    if sync_app.METRICS_ENABLED:
+        sync_app.HTTP_REQUEST_SECONDS.labels(route).observe(time.perf_counter() - started)
+        sync_app.HTTP_REQUESTS.labels(route, response.status).inc()
+    return response
+
+
+def wsgi_environ(request, body):
+    host, _, port = request.host.partition(':')
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': request.path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': request.query_string,
+        'SERVER_NAME': host,
+        'SERVER_PORT': port or ('443' if request.secure else '80'),
+        'SERVER_PROTOCOL': f"HTTP/{request.version.major}.{request.version.minor}",
+        'REMOTE_ADDR': request.remote or '',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if 'Content-Type' in request.headers:
+        environ['CONTENT_TYPE'] = request.headers['Content-Type']
+    for name in set(request.headers.keys()):
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        if key not in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'):
+            environ[key] = ','.join(request.headers.getall(name))
+    return environ
+
+
+async def flask_fallback(request):
+    """Serve any other route with the Flask app on wsgi_executor, streaming bodies without a length."""
+    loop = asyncio.get_running_loop()
+    environ = wsgi_environ(request, await request.read())
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = int(status.split(' ', 1)[0]), headers
+
+    body = await loop.run_in_executor(wsgi_executor, sync_app.app, environ, start_response)
+    try:
+        headers = started['headers']
+        if any(name.lower() == 'content-length' for name, _ in headers):
+            data = await loop.run_in_executor(wsgi_executor, b''.join, body)
+            return web.Response(status=started['status'], headers=headers, body=data)
+        response = web.StreamResponse(status=started['status'], headers=headers)
+        await response.prepare(request)
+        chunks = iter(body)
+        while True:
+            chunk = await loop.run_in_executor(wsgi_executor, next, chunks, None)
+            if chunk is None:
+                break
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+    finally:
+        if hasattr(body, 'close'):
+            await loop.run_in_executor(wsgi_executor, body.close)
+
+
+def create_app():
+    application = web.Application(client_max_size=MAX_BODY_SIZE)
+    for path, (methods, _) in WEBHOOKS.items():
+        for method in methods:
+            application.router.add_route(method, path, webhook)
+    # Paths above with another method fall through to Flask too, which answers 405 as before
+    application.router.add_route('*', '/{tail:.*}', flask_fallback)
+    return application
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    web.run_app(app, host='0.0.0.0', port=int(os.environ.get('PORT', 8000)), access_log=None)
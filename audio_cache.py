@@ -0,0 +1,133 @@
+"""
+Pre-synthesized audio for the fixed prompts.
+
+The recording disclaimer, the language menu, the greetings, listen prompts
+and fallback messages are the same text on every call, yet each <Say> makes
+Twilio run Polly again before the caller hears anything. An offline build
+(scripts/build_audio_cache.py) synthesizes each (text, voice, language) once
+into ``directory``, named by a hash of the three, and the app serves the
+files at ``base_url`` with long cache headers. When a prompt's file exists,
+the TwiML plays it instead of saying the text. Files are looked up in an
+index read at startup, so restart the workers after a build.
+
+Synthesizers: ``local`` writes a tone as long as the text would take to
+speak (WAV, for tests and offline runs); ``polly`` calls Amazon Polly
+through boto3 (optional dependency) with the same voices Twilio uses.
+"""
+
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import wave
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+# File names change with the content, so clients and CDNs may keep them for good
+AUDIO_MAX_AGE = 365 * 24 * 3600
+
+
+def prompt_key(text, voice=None, language=None):
+    return hashlib.sha256(f"{language or ''}\x1f{voice or ''}\x1f{text}".encode('utf-8')).hexdigest()[:32]
+
+
+class LocalSynthesizer:
+    """Stand-in for TTS: a quiet 440 Hz tone, ``chars_per_second`` of text per second."""
+
+    extension = 'wav'
+
+    def __init__(self, sample_rate=8000, chars_per_second=15.0):
+        self.sample_rate = sample_rate
+        self.chars_per_second = chars_per_second
+
+    def synthesize(self, text, voice=None, language=None):
+        frames = int(self.sample_rate * max(0.5, len(text) / self.chars_per_second))
+        samples = b''.join(struct.pack('<h', int(2000 * math.sin(2 * math.pi * 440 * i / self.sample_rate)))
+                           for i in range(frames))
+        with tempfile.SpooledTemporaryFile() as buffer:
+            with wave.open(buffer, 'wb') as out:
+                out.setnchannels(1)
+                out.setsampwidth(2)
+                out.setframerate(self.sample_rate)
+                out.writeframes(samples)
+            buffer.seek(0)
+            return buffer.read()
+
+
+class PollySynthesizer:
+    """Amazon Polly (MP3). Twilio voice names ("Polly.Aditi") map to Polly voice ids;
+    prompts said without a voice use ``default_voice``."""
+
+    extension = 'mp3'
+
+    def __init__(self, region=None, default_voice='Raveena'):
+        if boto3 is None:
+            raise RuntimeError("The polly synthesizer needs boto3 (pip install boto3)")
+        self.client = boto3.client('polly', region_name=region)
+        self.default_voice = default_voice
+
+    def synthesize(self, text, voice=None, language=None):
+        params = dict(Text=text, VoiceId=(voice or self.default_voice).removeprefix('Polly.'), OutputFormat='mp3')
+        if language:
+            params['LanguageCode'] = language
+        return self.client.synthesize_speech(**params)['AudioStream'].read()
+
+
+SYNTHESIZERS = {'local': LocalSynthesizer, 'polly': PollySynthesizer}
+
+
+class AudioCache:
+    """Index of the synthesized prompts in ``directory``; ``url()`` is None for prompts without a file."""
+
+    def __init__(self, directory, base_url='/audio', enabled=True):
+        self.directory = directory
+        self.base_url = base_url.rstrip('/')
+        self.enabled = enabled
+        self._files = {}
+        self.load()
+
+    def load(self):
+        """Re-read the directory: file name is ``<key>.<extension>``."""
+        files = {}
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                key, dot, _ = name.partition('.')
+                if dot and len(key) == 32 and not name.startswith('.'):
+                    files[key] = name
+        self._files = files
+
+    def url(self, text, voice=None, language=None):
+        if not self.enabled or not self._files:
+            return None
+        name = self._files.get(prompt_key(text, voice, language))
+        return f"{self.base_url}/{name}" if name else None
+
+    def build(self, prompts, synthesizer, force=False):
+        """Synthesize each (text, voice, language) missing from the directory. Returns (built, skipped)."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.load()
+        built = skipped = 0
+        for text, voice, language in dict.fromkeys(prompts):
+            key = prompt_key(text, voice, language)
+            if key in self._files and not force:
+                skipped += 1
+                continue
+            name = f"{key}.{synthesizer.extension}"
+            # Written under a temporary name and renamed, so a worker never serves half a file
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.')
+            with os.fdopen(fd, 'wb') as out:
+                out.write(synthesizer.synthesize(text, voice, language))
+            os.replace(tmp, os.path.join(self.directory, name))
+            if self._files.get(key, name) != name:
+                os.remove(os.path.join(self.directory, self._files[key]))
+            self._files[key] = name
+            built += 1
+        return built, skipped
+
+    def stats(self):
+        return {"enabled": self.enabled, "directory": self.directory, "base_url": self.base_url,
+                "files": len(self._files)}
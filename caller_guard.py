@@ -0,0 +1,282 @@
+"""
+Per-caller call limits and a temporary block list, checked at /voice.
+
+Every admitted call is counted in two sliding windows: one per ``From``
+number and one per number prefix (the first ``prefix_length`` characters,
+i.e. a range of consecutive numbers). A caller over either limit is rejected
+before the call is logged or a conversation exists, so repeated calls cannot
+burn Groq quota turn after turn. The language menu redirects back to /voice
+with the same CallSid; an admitted call is let through again without being
+counted twice.
+
+Numbers written to ``suspicious_activity`` (log_suspicious_activity) are
+flagged here too, once per call; a number flagged on ``block_after`` calls
+within ``block_window`` seconds is blocked until enough of them age out of the
+window. The block therefore lifts on its own.
+
+The windows are kept in memory, so /voice never waits on the database. With
+a backend, a background thread also reads the inbound calls and flags every
+worker has logged since its last pass (every ``sync_interval`` seconds,
+re-reading ``sync_overlap`` seconds for rows still in the write-behind
+queue) and merges them into this worker's windows by call SID. Every worker
+then enforces the same limits, at most one sync interval behind the others.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class SlidingWindows:
+    """Event times per key over the last ``window`` seconds. Past ``max_keys`` the least recently
+    used key is dropped. Events carry an id, so an event seen locally and again in the database
+    counts once."""
+
+    def __init__(self, window, max_keys=100000):
+        self.window = window
+        self.max_keys = max_keys
+        self._keys = OrderedDict()  # key -> {event_id: at}, oldest event first
+
+    def _live(self, key, now):
+        events = self._keys.get(key)
+        if events is None:
+            return None
+        cutoff = now - self.window
+        while events and next(iter(events.values())) < cutoff:
+            del events[next(iter(events))]
+        if not events:
+            del self._keys[key]
+            return None
+        return events
+
+    def count(self, key, now):
+        events = self._live(key, now)
+        return len(events) if events else 0
+
+    def times(self, key, now):
+        events = self._live(key, now)
+        return list(events.values()) if events else []
+
+    def add(self, key, event_id, at):
+        """Record an event; False if this id was already counted for the key."""
+        events = self._keys.get(key)
+        if events is None:
+            events = self._keys[key] = {}
+            if len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(key)
+            if event_id in events:
+                return False
+        late = events and at < next(reversed(events.values()))
+        events[event_id] = at
+        if late:
+            # Read back from the database after newer local events: keep time order
+            self._keys[key] = dict(sorted(events.items(), key=lambda item: item[1]))
+        return True
+
+    def discard(self, key):
+        self._keys.pop(key, None)
+
+    def keys(self):
+        return list(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class SQLCallerGuardBackend:
+    """Reads the inbound calls and suspicious-activity rows that every worker logs."""
+
+    def __init__(self, get_connection, placeholder="?"):
+        self.get_connection = get_connection
+        self.p = placeholder
+
+    def calls_since(self, since_ms):
+        """(call_sid, from_number, epoch ms) of inbound calls logged at or after ``since_ms``."""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""SELECT call_sid, from_number, timestamp_ms FROM calls
+                          WHERE timestamp_ms >= {self.p} AND direction = 'Inbound'""", (since_ms,))
+            return c.fetchall()
+
+    def flags_since(self, since_ms):
+        """(call_sid, phone_number, epoch ms) of suspicious-activity rows logged at or after ``since_ms``."""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""SELECT call_sid, phone_number, timestamp_ms FROM suspicious_activity
+                          WHERE timestamp_ms >= {self.p}""", (since_ms,))
+            return c.fetchall()
+
+
+class CallerGuard:
+    """``check(number, call_sid)`` admits and counts a call (returns None), or returns why it is
+    rejected: ``blocked``, ``caller_limit`` or ``prefix_limit``. A limit of 0 calls is off."""
+
+    REASONS = ("blocked", "caller_limit", "prefix_limit")
+
+    def __init__(self, caller_calls=5, caller_window=300.0, prefix_calls=30, prefix_window=60.0,
+                 prefix_length=10, block_after=3, block_window=86400.0, exempt=(), backend=None,
+                 sync_interval=5.0, sync_overlap=30.0, max_keys=100000, enabled=True):
+        self.caller_calls = caller_calls
+        self.prefix_calls = prefix_calls
+        self.prefix_length = prefix_length
+        self.block_after = block_after
+        self.exempt = frozenset(number.strip() for number in exempt if number and number.strip())
+        self.backend = backend
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self.enabled = enabled
+        self._callers = SlidingWindows(caller_window, max_keys)
+        self._prefixes = SlidingWindows(prefix_window, max_keys)
+        self._flags = SlidingWindows(block_window, max_keys)
+        self._admitted = OrderedDict()  # call SIDs admitted or synced, most recent last
+        self._max_keys = max_keys
+        self._unblocked = {}  # number -> time; flags from before it are ignored
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._calls_since = self._flags_since = None
+        self.last_sync = None
+        self.last_error = None
+        self.counters = dict({reason: 0 for reason in self.REASONS}, checks=0, admitted=0, readmitted=0, flags=0,
+                             syncs=0, sync_errors=0, synced_calls=0, synced_flags=0)
+
+    def prefix(self, number):
+        return number[:self.prefix_length] if len(number) > self.prefix_length else None
+
+    def _blocked(self, number, now):
+        return bool(self.block_after) and self._flags.count(number, now) >= self.block_after
+
+    def check(self, number, call_sid, now=None):
+        if not self.enabled or not number or number in self.exempt:
+            return None
+        now = now or time.time()
+        prefix = self.prefix(number)
+        with self._lock:
+            self.counters["checks"] += 1
+            if call_sid in self._admitted:
+                # Back at /voice from the menu: the call is already under way
+                self.counters["readmitted"] += 1
+                return None
+            if self._blocked(number, now):
+                reason = "blocked"
+            elif self.caller_calls and self._callers.count(number, now) >= self.caller_calls:
+                reason = "caller_limit"
+            elif prefix and self.prefix_calls and self._prefixes.count(prefix, now) >= self.prefix_calls:
+                reason = "prefix_limit"
+            else:
+                self._count_call(number, prefix, call_sid, now)
+                self.counters["admitted"] += 1
+                return None
+            self.counters[reason] += 1
+        return reason
+
+    def _count_call(self, number, prefix, call_sid, at):
+        self._admitted[call_sid] = at
+        self._admitted.move_to_end(call_sid)
+        if len(self._admitted) > self._max_keys:
+            self._admitted.popitem(last=False)
+        added = self._callers.add(number, call_sid, at)
+        if prefix:
+            self._prefixes.add(prefix, call_sid, at)
+        return added
+
+    def _add_flag(self, number, event_id, at):
+        if at <= self._unblocked.get(number, 0):
+            return False
+        return self._flags.add(number, event_id, at)
+
+    def flag(self, number, call_sid, at_ms):
+        """Count a suspicious-activity row (same call SID and epoch ms as the logged row). Further
+        rows from the same call do not add to the count."""
+        if not self.enabled or not number or number in self.exempt:
+            return
+        with self._lock:
+            if self._add_flag(number, call_sid, at_ms / 1000):
+                self.counters["flags"] += 1
+
+    def unblock(self, number, now=None):
+        """Forget the number's flags in this worker (other workers keep theirs). True if it was blocked."""
+        now = now or time.time()
+        with self._lock:
+            was_blocked = self._blocked(number, now)
+            self._flags.discard(number)
+            self._unblocked[number] = now
+        return was_blocked
+
+    def blocked(self, now=None):
+        """[{number, flags, until}] of the numbers blocked now; ``until`` is when the block lifts."""
+        now = now or time.time()
+        result = []
+        with self._lock:
+            for number in self._flags.keys():
+                times = sorted(self._flags.times(number, now))
+                if self.block_after and len(times) >= self.block_after:
+                    until = times[len(times) - self.block_after] + self._flags.window
+                    result.append({"number": number, "flags": len(times), "until": until})
+        return sorted(result, key=lambda entry: entry["until"], reverse=True)
+
+    def sync(self, now=None):
+        """Merge the calls and flags logged by every worker since the last pass."""
+        now = now or time.time()
+        calls_since = self._calls_since
+        if calls_since is None:
+            calls_since = now - max(self._callers.window, self._prefixes.window)
+        flags_since = self._flags_since if self._flags_since is not None else now - self._flags.window
+        calls = self.backend.calls_since(int(calls_since * 1000))
+        flags = self.backend.flags_since(int(flags_since * 1000))
+        merged_calls = merged_flags = 0
+        with self._lock:
+            for call_sid, number, at_ms in calls:
+                if number and number not in self.exempt:
+                    merged_calls += self._count_call(number, self.prefix(number), call_sid, at_ms / 1000)
+            for call_sid, number, at_ms in flags:
+                if number and number not in self.exempt:
+                    merged_flags += self._add_flag(number, call_sid, at_ms / 1000)
+            self._unblocked = {number: at for number, at in self._unblocked.items()
+                               if at > now - self._flags.window}
+            self._calls_since = self._flags_since = now - self.sync_overlap
+            self.last_sync = now
+            self.counters["syncs"] += 1
+            self.counters["synced_calls"] += merged_calls
+            self.counters["synced_flags"] += merged_flags
+
+    def ensure_started(self):
+        # Start lazily, and again after a fork: threads do not survive fork().
+        if not self.enabled or self.backend is None or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="caller-guard-sync", daemon=True)
+            self._thread.start()
+
+    def alive(self):
+        """False only if the sync thread was started in this process and has died."""
+        return self._pid != os.getpid() or self._thread is None or self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+                self.last_error = None
+            except Exception as e:
+                with self._lock:
+                    self.counters["sync_errors"] += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Caller guard sync error: {e}")
+            time.sleep(self.sync_interval)
+
+    def stats(self):
+        now = time.time()
+        blocked = len(self.blocked(now))
+        with self._lock:
+            return dict(self.counters, enabled=self.enabled, shared=self.backend is not None,
+                        caller_limit=[self.caller_calls, self._callers.window],
+                        prefix_limit=[self.prefix_calls, self._prefixes.window], prefix_length=self.prefix_length,
+                        block_after=self.block_after, block_window=self._flags.window, blocked=blocked,
+                        tracked_callers=len(self._callers), tracked_prefixes=len(self._prefixes),
+                        flagged_numbers=len(self._flags), last_sync=self.last_sync, last_error=self.last_error)
@@ -0,0 +1,454 @@
+"""
+Durable outbound calling campaigns.
+
+A campaign is a row in ``campaigns`` plus one row per number in
+``campaign_numbers``; every dial is recorded in ``campaign_attempts``. All
+progress lives in the database, so a restarted process picks up where the
+last one stopped and numbers are never held in memory beyond one claim.
+
+CampaignScheduler runs in each worker. Every tick it takes a short lease on
+each active campaign (so one worker schedules a given campaign at a time),
+checks the campaign's calling-hour window, and claims due numbers up to the
+campaign's concurrency cap. Twilio reports the outcome of each call to the
+status callback; busy and no-answer are retried with exponential backoff
+until ``max_attempts`` is reached. A callback can beat the worker that placed
+the call to recording it (a number that fails at once); it is kept in
+``campaign_early_callbacks`` and settled when the dial is recorded.
+"""
+
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# Outcomes worth another attempt. "failed" (invalid number, carrier reject)
+# and "canceled" are final.
+RETRYABLE_OUTCOMES = {'busy', 'no-answer', 'dial-error', 'timeout'}
+
+_PHONE = re.compile(r'^\+?\d{7,15}$')
+
+
+def _clean_number(cell):
+    return re.sub(r'[\s\-()]', '', cell.strip().strip('"'))
+
+
+def iter_numbers(lines):
+    """Phone numbers from an iterable of text lines, yielded as ``(number, valid)``.
+
+    A line of comma-separated numbers (pasted list) yields each of them; any
+    other line is treated as a CSV row and yields its first column, so header
+    rows come out as invalid.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'ignore')
+        cells = [number for number in (_clean_number(cell) for cell in line.split(',')) if number]
+        if not cells:
+            continue
+        if all(_PHONE.match(number) for number in cells):
+            for number in cells:
+                yield number, True
+        else:
+            yield cells[0], bool(_PHONE.match(cells[0]))
+
+
+def in_window(now, window_start, window_end, timezone):
+    """True if epoch ``now`` falls inside the daily HH:MM window in ``timezone``.
+
+    Windows may wrap midnight (e.g. 22:00-06:00); equal bounds mean all day.
+    """
+    if window_start == window_end:
+        return True
+    local = datetime.fromtimestamp(now, ZoneInfo(timezone)).strftime('%H:%M')
+    if window_start <= window_end:
+        return window_start <= local < window_end
+    return local >= window_start or local < window_end
+
+
+def retry_decision(outcome, attempts, max_attempts, retry_delay, now):
+    """(status, next_attempt_at) for a number after an attempt ended with ``outcome``."""
+    if outcome == 'completed':
+        return 'completed', None
+    if outcome in RETRYABLE_OUTCOMES and attempts < max_attempts:
+        return 'retry', now + retry_delay * (2 ** max(0, attempts - 1))
+    return 'failed', None
+
+
+class SQLCampaignBackend:
+    """Campaign state in the ``campaigns``, ``campaign_numbers`` and ``campaign_attempts`` tables."""
+
+    CAMPAIGN_COLUMNS = ('campaign_id', 'name', 'webhook_url', 'status_callback', 'status', 'window_start',
+                        'window_end', 'timezone', 'max_concurrent', 'max_attempts', 'retry_delay', 'total',
+                        'created_at')
+
+    def __init__(self, get_connection, placeholder="?"):
+        self.get_connection = get_connection
+        self.p = placeholder
+
+    def create_campaign(self, name, webhook_url, status_callback, window_start, window_end, timezone,
+                        max_concurrent, max_attempts, retry_delay):
+        campaign_id = uuid.uuid4().hex
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                INSERT INTO campaigns (campaign_id, name, webhook_url, status_callback, status, window_start,
+                                       window_end, timezone, max_concurrent, max_attempts, retry_delay, total, created_at)
+                VALUES ({p}, {p}, {p}, {p}, 'loading', {p}, {p}, {p}, {p}, {p}, {p}, 0, {p})
+            """, (campaign_id, name, webhook_url, status_callback, window_start, window_end, timezone,
+                  max_concurrent, max_attempts, retry_delay, time.time()))
+            conn.commit()
+        return campaign_id
+
+    def add_numbers(self, campaign_id, numbers, chunk_size=1000):
+        """Insert numbers in chunks of ``chunk_size``, then activate the campaign. Returns the count."""
+        p = self.p
+        sql = f"""
+            INSERT INTO campaign_numbers (campaign_id, position, to_number, status, attempts, next_attempt_at, updated_at)
+            VALUES ({p}, {p}, {p}, 'pending', 0, {p}, {p})
+        """
+        total = 0
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            chunk = []
+            now = time.time()
+            for number in numbers:
+                chunk.append((campaign_id, total, number, now, now))
+                total += 1
+                if len(chunk) >= chunk_size:
+                    c.executemany(sql, chunk)
+                    conn.commit()
+                    chunk = []
+            if chunk:
+                c.executemany(sql, chunk)
+            c.execute(f"UPDATE campaigns SET total = {p}, status = 'active' WHERE campaign_id = {p}",
+                      (total, campaign_id))
+            conn.commit()
+        return total
+
+    def _campaign_rows(self, where="", params=()):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT {', '.join(self.CAMPAIGN_COLUMNS)} FROM campaigns {where} ORDER BY created_at DESC",
+                      params)
+            return [dict(zip(self.CAMPAIGN_COLUMNS, row)) for row in c.fetchall()]
+
+    def get_campaign(self, campaign_id):
+        rows = self._campaign_rows(f"WHERE campaign_id = {self.p}", (campaign_id,))
+        return rows[0] if rows else None
+
+    def list_campaigns(self):
+        return self._campaign_rows()
+
+    def active_campaigns(self):
+        return self._campaign_rows("WHERE status = 'active'")
+
+    def status_counts(self, campaign_id):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT status, COUNT(*) FROM campaign_numbers WHERE campaign_id = {self.p} GROUP BY status",
+                      (campaign_id,))
+            return dict(c.fetchall())
+
+    def set_status(self, campaign_id, status, only_from=None):
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            if only_from:
+                c.execute(f"UPDATE campaigns SET status = {p} WHERE campaign_id = {p} AND status = {p}",
+                          (status, campaign_id, only_from))
+            else:
+                c.execute(f"UPDATE campaigns SET status = {p} WHERE campaign_id = {p}", (status, campaign_id))
+            changed = c.rowcount
+            conn.commit()
+        return changed > 0
+
+    def acquire_lease(self, campaign_id, owner, now, ttl):
+        """Take or renew the scheduling lease on a campaign. Returns True if ``owner`` holds it."""
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                UPDATE campaigns SET lease_owner = {p}, lease_until = {p}
+                WHERE campaign_id = {p} AND (lease_owner = {p} OR lease_owner IS NULL OR lease_until < {p})
+            """, (owner, now + ttl, campaign_id, owner, now))
+            held = c.rowcount == 1
+            conn.commit()
+        return held
+
+    def in_flight(self, campaign_id=None):
+        """Numbers being dialed or on a call, for one campaign or (None) all of them."""
+        where, params = (f"campaign_id = {self.p} AND ", (campaign_id,)) if campaign_id is not None else ("", ())
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                SELECT COUNT(*) FROM campaign_numbers
+                WHERE {where}status IN ('dialing', 'in_progress')
+            """, params)
+            return c.fetchone()[0]
+
+    def claim(self, campaign_id, limit, now):
+        """Mark up to ``limit`` due numbers as dialing. Returns [(position, to_number, attempt)]."""
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                SELECT position, to_number, attempts FROM campaign_numbers
+                WHERE campaign_id = {p} AND status IN ('pending', 'retry') AND next_attempt_at <= {p}
+                ORDER BY next_attempt_at, position LIMIT {p}
+            """, (campaign_id, now, limit))
+            rows = c.fetchall()
+            c.executemany(f"""
+                UPDATE campaign_numbers SET status = 'dialing', attempts = attempts + 1, updated_at = {p}
+                WHERE campaign_id = {p} AND position = {p}
+            """, [(now, campaign_id, position) for position, _, _ in rows])
+            conn.commit()
+        return [(position, number, attempts + 1) for position, number, attempts in rows]
+
+    def record_dialed(self, campaign_id, position, attempt, call_sid, now):
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                UPDATE campaign_numbers SET status = 'in_progress', call_sid = {p}, updated_at = {p}
+                WHERE campaign_id = {p} AND position = {p}
+            """, (call_sid, now, campaign_id, position))
+            c.execute(f"""
+                INSERT INTO campaign_attempts (call_sid, campaign_id, position, attempt, started_at)
+                VALUES ({p}, {p}, {p}, {p}, {p})
+            """, (call_sid, campaign_id, position, attempt, now))
+            conn.commit()
+        return self._settle_early(call_sid, now)
+
+    def _settle_early(self, call_sid, now):
+        """Apply a status callback that came before its attempt was recorded, once the attempt
+        exists. Whoever deletes the stored callback settles it, so it is applied once."""
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT result, received_at FROM campaign_early_callbacks WHERE call_sid = {p}", (call_sid,))
+            early = c.fetchone()
+            c.execute(f"SELECT campaign_id, position FROM campaign_attempts WHERE call_sid = {p}", (call_sid,))
+            row = c.fetchone() if early else None
+            if row:
+                c.execute(f"DELETE FROM campaign_early_callbacks WHERE call_sid = {p}", (call_sid,))
+                if c.rowcount != 1:
+                    row = None
+            if row:
+                c.execute(f"""
+                    UPDATE campaign_attempts SET result = {p}, ended_at = {p}
+                    WHERE call_sid = {p} AND ended_at IS NULL
+                """, (early[0], early[1], call_sid))
+            conn.commit()
+        if not row:
+            return None
+        return self.settle(row[0], row[1], early[0], now)
+
+    def settle(self, campaign_id, position, outcome, now, count_attempt=True):
+        """Apply the retry policy to a number whose attempt ended with ``outcome``."""
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                SELECT n.attempts, m.max_attempts, m.retry_delay FROM campaign_numbers n
+                JOIN campaigns m ON m.campaign_id = n.campaign_id
+                WHERE n.campaign_id = {p} AND n.position = {p}
+            """, (campaign_id, position))
+            row = c.fetchone()
+            if not row:
+                return None
+            attempts, max_attempts, retry_delay = row
+            if not count_attempt:
+                # Not a real attempt (e.g. rate limited before dialing): give it back.
+                attempts -= 1
+                status, next_attempt_at = 'retry', now + 1
+            else:
+                status, next_attempt_at = retry_decision(outcome, attempts, max_attempts, retry_delay, now)
+            c.execute(f"""
+                UPDATE campaign_numbers
+                SET status = {p}, attempts = {p}, last_result = {p}, updated_at = {p},
+                    next_attempt_at = COALESCE({p}, next_attempt_at)
+                WHERE campaign_id = {p} AND position = {p}
+            """, (status, attempts, outcome, now, next_attempt_at, campaign_id, position))
+            conn.commit()
+        return status
+
+    def finish_call(self, call_sid, outcome, now):
+        """Record a Twilio status callback. Returns the number's new status, or None if unknown."""
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                UPDATE campaign_attempts SET result = {p}, ended_at = {p}
+                WHERE call_sid = {p} AND ended_at IS NULL
+            """, (outcome, now, call_sid))
+            c.execute(f"SELECT campaign_id, position FROM campaign_attempts WHERE call_sid = {p}", (call_sid,))
+            row = c.fetchone()
+            if not row:
+                # record_dialed() has not run yet: keep the outcome for it
+                c.execute(f"""
+                    INSERT INTO campaign_early_callbacks (call_sid, result, received_at) VALUES ({p}, {p}, {p})
+                    ON CONFLICT (call_sid) DO NOTHING
+                """, (call_sid, outcome, now))
+            c.execute(f"SELECT call_sid, status FROM campaign_numbers WHERE campaign_id = {p} AND position = {p}",
+                      row or (None, None))
+            current = c.fetchone()
+            conn.commit()
+        if not row:
+            # ...unless it committed the attempt meanwhile and missed the stored outcome
+            return self._settle_early(call_sid, now)
+        # Ignore callbacks for attempts that were already superseded.
+        if not row or not current or current[0] != call_sid or current[1] != 'in_progress':
+            return None
+        return self.settle(row[0], row[1], outcome, now)
+
+    def recover_stale(self, campaign_id, now, dial_timeout, call_timeout):
+        """Requeue numbers stuck mid-dial (process died) or whose status callback never came."""
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                UPDATE campaign_numbers SET status = 'retry', attempts = attempts - 1, updated_at = {p}
+                WHERE campaign_id = {p} AND status = 'dialing' AND updated_at < {p}
+            """, (now, campaign_id, now - dial_timeout))
+            c.execute(f"""
+                SELECT position FROM campaign_numbers
+                WHERE campaign_id = {p} AND status = 'in_progress' AND updated_at < {p}
+            """, (campaign_id, now - call_timeout))
+            lost = [row[0] for row in c.fetchall()]
+            # Callbacks for calls no dial was ever recorded for
+            c.execute(f"DELETE FROM campaign_early_callbacks WHERE received_at < {p}", (now - call_timeout,))
+            conn.commit()
+        for position in lost:
+            self.settle(campaign_id, position, 'timeout', now)
+        return len(lost)
+
+    def complete_if_done(self, campaign_id):
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                UPDATE campaigns SET status = 'completed' WHERE campaign_id = {p} AND status = 'active'
+                AND NOT EXISTS (SELECT 1 FROM campaign_numbers WHERE campaign_id = {p}
+                                AND status IN ('pending', 'retry', 'dialing', 'in_progress'))
+            """, (campaign_id, campaign_id))
+            done = c.rowcount > 0
+            conn.commit()
+        return done
+
+
+class CampaignScheduler:
+    """Background thread that dials due campaign numbers.
+
+    ``place_call(number, payload)`` returns the Twilio call SID or raises;
+    ``bucket`` is the shared calls-per-second TokenBucket.
+    """
+
+    def __init__(self, backend, place_call, bucket, poll_interval=2.0, workers=4, lease_ttl=30.0,
+                 dial_timeout=120.0, call_timeout=3600.0, enabled=True):
+        self.backend = backend
+        self.place_call = place_call
+        self.bucket = bucket
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.lease_ttl = lease_ttl
+        self.dial_timeout = dial_timeout
+        self.call_timeout = call_timeout
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._executor = None
+        self._wake = threading.Event()
+        self.owner = None
+        self.counters = {"ticks": 0, "claimed": 0, "dialed": 0, "dial_errors": 0, "recovered": 0,
+                         "completed_campaigns": 0, "tick_errors": 0}
+
+    def ensure_started(self):
+        # Start lazily, and again after a fork: threads do not survive fork().
+        if not self.enabled or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self.owner = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="campaign-dialer")
+            self._thread = threading.Thread(target=self._run, name="campaign-scheduler", daemon=True)
+            self._thread.start()
+
+    def alive(self):
+        """False only if the scheduler thread was started in this process and has died."""
+        return self._pid != os.getpid() or self._thread is None or self._thread.is_alive()
+
+    def wake(self):
+        """Run the next tick now (e.g. after a campaign was created or resumed)."""
+        self.ensure_started()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                with self._lock:
+                    self.counters["tick_errors"] += 1
+                print(f"Campaign scheduler error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def tick(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            self.counters["ticks"] += 1
+        for campaign in self.backend.active_campaigns():
+            campaign_id = campaign['campaign_id']
+            if not self.backend.acquire_lease(campaign_id, self.owner, now, self.lease_ttl):
+                continue
+            recovered = self.backend.recover_stale(campaign_id, now, self.dial_timeout, self.call_timeout)
+            if not in_window(now, campaign['window_start'], campaign['window_end'], campaign['timezone']):
+                continue
+            capacity = campaign['max_concurrent'] - self.backend.in_flight(campaign_id)
+            claimed = self.backend.claim(campaign_id, capacity, now) if capacity > 0 else []
+            completed = not claimed and self.backend.complete_if_done(campaign_id)
+            with self._lock:
+                self.counters["recovered"] += recovered
+                self.counters["claimed"] += len(claimed)
+                self.counters["completed_campaigns"] += int(completed)
+            for position, number, attempt in claimed:
+                self._executor.submit(self._dial, campaign, position, number, attempt)
+
+    def _dial(self, campaign, position, number, attempt):
+        campaign_id = campaign['campaign_id']
+        try:
+            self.bucket.acquire()
+            payload = {'webhook_url': campaign['webhook_url'], 'status_callback': campaign['status_callback']}
+            try:
+                call_sid = self.place_call(number, payload)
+            except Exception as e:
+                rate_limited = getattr(e, 'status', None) == 429
+                print(f"Campaign {campaign_id}: failed to call {number}: {e}")
+                with self._lock:
+                    self.counters["dial_errors"] += 1
+                self.backend.settle(campaign_id, position, 'rate-limited' if rate_limited else 'dial-error',
+                                    time.time(), count_attempt=not rate_limited)
+                return
+            self.backend.record_dialed(campaign_id, position, attempt, call_sid, time.time())
+            with self._lock:
+                self.counters["dialed"] += 1
+        except Exception as e:
+            # Left in 'dialing'; recover_stale() requeues it after dial_timeout.
+            print(f"DB Error (Campaign): {e}")
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+        data["enabled"] = self.enabled
+        data["running"] = self._pid == os.getpid() and self._thread is not None
+        data["poll_interval"] = self.poll_interval
+        return data
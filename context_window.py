@@ -0,0 +1,169 @@
+"""
+Token-budgeted prompt window for long calls.
+
+The stored history for a call is the rolling summary of older turns plus the
+turns not yet summarized. ContextWindow.build() assembles what is sent to
+Groq: the system prompt, the summary (if any), the knowledge base passages
+retrieved for the question (if any), and as many of the most recent
+turns as fit in the token budget, capped at ``max_turns`` exchanges. The
+boundary reminder is injected once, just before the latest user message, on
+the turns where it is due; it is never stored, so reminders cannot stack.
+
+RollingSummarizer folds turns that have fallen out of the window into the
+summary on a background thread, after the webhook has responded.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BOUNDARY_REMINDER = ("REMINDER: Stay strictly within government services context. Do not provide personal "
+                     "opinions, financial/medical/legal advice, or discuss non-governmental topics.")
+
+# Per-message overhead of the chat format (role markers), in tokens.
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for Latin-script text)."""
+    return (len(text) + 3) // 4 + MESSAGE_OVERHEAD
+
+
+def count_prompt_tokens(messages):
+    return sum(estimate_tokens(m['content']) for m in messages)
+
+
+class ContextWindow:
+    """Builds the per-turn prompt from the system prompt, summary and recent turns."""
+
+    def __init__(self, max_tokens=1600, max_turns=6, reminder_every=3):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.reminder_every = reminder_every
+
+    def recent_start(self, messages, fixed_tokens=0):
+        """Index of the oldest stored message that still fits in the window."""
+        budget = self.max_tokens - fixed_tokens
+        used = 0
+        user_turns = 0
+        start = len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            message = messages[i]
+            cost = estimate_tokens(message['content'])
+            is_user = message['role'] == 'user'
+            if start < len(messages) and (used + cost > budget or (is_user and user_turns >= self.max_turns)):
+                break
+            used += cost
+            start = i
+            if is_user:
+                user_turns += 1
+        # Never start the window on an assistant reply whose question was cut.
+        while start < len(messages) - 1 and messages[start]['role'] != 'user':
+            start += 1
+        return start
+
+    def build(self, system_prompt, messages, summary=None, user_turns=None, knowledge=None):
+        head = [{"role": "system", "content": system_prompt}]
+        if summary:
+            head.append({"role": "system", "content": f"Summary of the conversation so far: {summary}"})
+        if knowledge:
+            head.append({"role": "system", "content": f"RELEVANT KNOWLEDGE:\n{knowledge}"})
+        # Reminders stored by older versions of the app are dropped here.
+        turns = [m for m in messages if m['role'] != 'system']
+        fixed = count_prompt_tokens(head) + estimate_tokens(BOUNDARY_REMINDER)
+        recent = turns[self.recent_start(turns, fixed):]
+
+        if user_turns is None:
+            user_turns = sum(1 for m in turns if m['role'] == 'user')
+        previous_turns = user_turns - 1
+        if self.reminder_every and previous_turns > 0 and previous_turns % self.reminder_every == 0 \
+                and recent and recent[-1]['role'] == 'user':
+            recent = recent[:-1] + [{"role": "system", "content": BOUNDARY_REMINDER}, recent[-1]]
+        return head + recent
+
+
+class RollingSummarizer:
+    """Compresses turns that left the window into a short running summary.
+
+    ``summarize_fn(previous_summary, messages)`` returns the new summary text;
+    ``load_state(call_sid)`` / ``save_state(call_sid, state)`` access the
+    conversation store. ``save_state`` must only write if the state is still
+    the version that was loaded, and return False otherwise; the summary is
+    then applied to a re-read state, up to ``attempts`` times. Work runs on a
+    small thread pool so the webhook never waits for it.
+    """
+
+    def __init__(self, window, summarize_fn, load_state, save_state, min_batch=4, workers=2, attempts=3):
+        self.window = window
+        self.summarize_fn = summarize_fn
+        self.load_state = load_state
+        self.save_state = save_state
+        self.min_batch = min_batch
+        self.attempts = attempts
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summarizer")
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self.counters = {"scheduled": 0, "completed": 0, "failed": 0, "skipped": 0, "conflicts": 0}
+
+    def pending_count(self, state, system_prompt):
+        """How many stored messages have fallen out of the window without being summarized."""
+        messages = state.get('messages', [])
+        head_tokens = estimate_tokens(system_prompt) + estimate_tokens(BOUNDARY_REMINDER)
+        if state.get('summary'):
+            head_tokens += estimate_tokens(state['summary'])
+        return self.window.recent_start(messages, head_tokens)
+
+    def maybe_schedule(self, call_sid, state, system_prompt):
+        if self.pending_count(state, system_prompt) < self.min_batch:
+            return False
+        with self._lock:
+            if call_sid in self._in_flight:
+                return False
+            self._in_flight.add(call_sid)
+            self.counters["scheduled"] += 1
+        self._executor.submit(self._run, call_sid, system_prompt)
+        return True
+
+    def _run(self, call_sid, system_prompt):
+        try:
+            state = self.load_state(call_sid)
+            if state is None:
+                return
+            cut = self.pending_count(state, system_prompt)
+            if cut < self.min_batch:
+                with self._lock:
+                    self.counters["skipped"] += 1
+                return
+            folded = state['messages'][:cut]
+            summary = self.summarize_fn(state.get('summary'), folded)
+            if not summary:
+                raise ValueError("empty summary")
+            # The call may have moved on meanwhile: re-read, and only drop the
+            # messages we actually summarized. A turn saved between the read and
+            # the write makes the save fail; read again and retry.
+            for _ in range(self.attempts):
+                fresh = self.load_state(call_sid)
+                if fresh is None or fresh.get('summary') != state.get('summary') or fresh['messages'][:cut] != folded:
+                    break
+                fresh['summary'] = summary.strip()
+                fresh['messages'] = fresh['messages'][cut:]
+                if self.save_state(call_sid, fresh):
+                    with self._lock:
+                        self.counters["completed"] += 1
+                    return
+                with self._lock:
+                    self.counters["conflicts"] += 1
+            with self._lock:
+                self.counters["skipped"] += 1
+        except Exception as e:
+            with self._lock:
+                self.counters["failed"] += 1
+            print(f"Summarizer error for {call_sid}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(call_sid)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+            data["in_flight"] = len(self._in_flight)
+        return data
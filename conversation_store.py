@@ -0,0 +1,286 @@
+"""
+Server-side conversation state keyed by Twilio CallSid.
+
+Replaces the chat history that used to live in Flask's cookie session. State
+is a small dict (language, voice, prompt id and the user/assistant turns);
+the system prompt itself is referenced by id and resolved at request time.
+
+The store is an in-memory LRU with TTL eviction. With a SQL backend it is
+write-through, so the next webhook for the call can be served by any gunicorn
+worker. Reads trust the cached copy; writes are a compare-and-set on the
+row's version (``UPDATE ... SET version = version + 1 WHERE version = ?``),
+so a copy that went stale (another worker served a turn meanwhile) is caught
+when it is saved. A conflicting save is rebased onto the current row: the
+turns appended since the copy was read are added after the other worker's,
+and fields this save changed replace theirs. ``save(..., rebase=False)``
+gives up on a conflict instead (the summarizer redoes its work).
+
+States handed out by get() carry the version and shape they were read at
+under ``META_KEY``; save() uses it as the expected version. A state without
+it (a new conversation) replaces whatever is stored.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+META_KEY = '_stored'
+
+
+class SQLConversationBackend:
+    """Stores conversation state in the ``conversations`` table."""
+
+    def __init__(self, get_connection, placeholder="?"):
+        self.get_connection = get_connection
+        self.p = placeholder
+
+    def load(self, call_sid):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT version, state FROM conversations WHERE call_sid = {self.p}", (call_sid,))
+            row = c.fetchone()
+        if not row:
+            return None
+        return row[0], json.loads(row[1])
+
+    def compare_and_set(self, call_sid, version, state, updated_at):
+        """Write ``state`` as version + 1 if the row is still at ``version``. Returns True if written."""
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                UPDATE conversations SET version = version + 1, state = {p}, updated_at = {p}
+                WHERE call_sid = {p} AND version = {p}
+            """, (json.dumps(state, separators=(',', ':')), updated_at, call_sid, version))
+            written = c.rowcount == 1
+            conn.commit()
+        return written
+
+    def replace(self, call_sid, state, updated_at):
+        """Write ``state`` whatever version is stored. Returns the new version."""
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""
+                INSERT INTO conversations (call_sid, version, state, updated_at)
+                VALUES ({p}, 1, {p}, {p})
+                ON CONFLICT (call_sid) DO UPDATE SET
+                    version = conversations.version + 1,
+                    state = excluded.state,
+                    updated_at = excluded.updated_at
+                RETURNING version
+            """, (call_sid, json.dumps(state, separators=(',', ':')), updated_at))
+            version = c.fetchone()[0]
+            conn.commit()
+        return version
+
+    def delete(self, call_sid):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"DELETE FROM conversations WHERE call_sid = {self.p}", (call_sid,))
+            conn.commit()
+
+    def count_active(self, since):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT COUNT(*) FROM conversations WHERE updated_at >= {self.p}", (since,))
+            return c.fetchone()[0]
+
+    def purge(self, older_than):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"DELETE FROM conversations WHERE updated_at < {self.p}", (older_than,))
+            conn.commit()
+
+
+class ConversationStore:
+    """LRU + TTL cache of per-call state, optionally backed by SQL."""
+
+    def __init__(self, backend=None, max_entries=5000, ttl=7200, purge_every=500):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # call_sid -> (version, state, touched_at)
+        self._saves = 0
+        self.counters = {"hits": 0, "misses": 0, "backend_loads": 0, "evictions": 0, "conflicts": 0}
+
+    def get(self, call_sid, fresh=False):
+        """Return a copy-safe state dict for the call, or None. ``fresh`` skips the cached copy
+        (e.g. to see a change another worker is about to make)."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(call_sid)
+            if entry is not None and now - entry[2] > self.ttl:
+                del self._entries[call_sid]
+                self.counters["evictions"] += 1
+                entry = None
+            if entry is not None and not (fresh and self.backend is not None):
+                self._entries[call_sid] = (entry[0], entry[1], now)
+                self._entries.move_to_end(call_sid)
+                self.counters["hits"] += 1
+                return _hand_out(entry[0], entry[1])
+            self.counters["misses"] += 1
+        loaded = self._load(call_sid)
+        if loaded is None:
+            return None
+        version, state = loaded
+        self._remember(call_sid, version, state, now)
+        return _hand_out(version, state)
+
+    def _load(self, call_sid):
+        """(version, state) as stored now: from the backend, or this process's copy without one."""
+        if self.backend is None:
+            with self._lock:
+                entry = self._entries.get(call_sid)
+            return (entry[0], entry[1]) if entry is not None else None
+        try:
+            loaded = self.backend.load(call_sid)
+        except Exception as e:
+            print(f"Conversation store load failed: {e}")
+            return None
+        if loaded is not None:
+            with self._lock:
+                self.counters["backend_loads"] += 1
+        return loaded
+
+    def save(self, call_sid, state, rebase=True):
+        """Write the state read by get() (or a new one). Returns False if the write was given up:
+        a conflict with ``rebase=False``, or conflicts on every attempt."""
+        now = time.time()
+        caller_state, state = state, _copy_state(state)
+        base = state.pop(META_KEY, None)
+        rebased = False
+        with self._lock:
+            self._saves += 1
+            purge = self.backend is not None and self._saves % self.purge_every == 0
+        try:
+            for _ in range(3):
+                if base is None:
+                    version = self._replace(call_sid, state, now)
+                elif self._compare_and_set(call_sid, base['version'], state, now):
+                    version = base['version'] + 1
+                else:
+                    version = None
+                if version is not None:
+                    self._remember(call_sid, version, state, now)
+                    # The caller's dict now describes the stored row, so it can be saved again
+                    if rebased:
+                        caller_state.clear()
+                        caller_state.update(_copy_state(state))
+                    caller_state[META_KEY] = _meta(version, state)
+                    return True
+                with self._lock:
+                    self.counters["conflicts"] += 1
+                    if self.backend is not None:
+                        self._entries.pop(call_sid, None)
+                if not rebase:
+                    return False
+                current = self._load(call_sid)
+                rebased = True
+                if current is not None:
+                    state = _rebase(state, base, current[1])
+                    base = _meta(*current)
+                else:
+                    base = None
+            print(f"Conversation store save for {call_sid} gave up after repeated conflicts")
+            return False
+        except Exception as e:
+            print(f"Conversation store save failed: {e}")
+            # Keep serving this worker's copy; the next save from it will be rebased
+            self._remember(call_sid, base['version'] if base else 0, state, now)
+            return False
+        finally:
+            if purge:
+                try:
+                    self.backend.purge(now - self.ttl)
+                except Exception as e:
+                    print(f"Conversation store purge failed: {e}")
+
+    def _compare_and_set(self, call_sid, version, state, now):
+        if self.backend is not None:
+            return self.backend.compare_and_set(call_sid, version, state, now)
+        with self._lock:
+            entry = self._entries.get(call_sid)
+            if entry is None or entry[0] != version:
+                return False
+            self._entries[call_sid] = (version + 1, state, now)
+            return True
+
+    def _replace(self, call_sid, state, now):
+        if self.backend is not None:
+            return self.backend.replace(call_sid, state, now)
+        with self._lock:
+            entry = self._entries.get(call_sid)
+            version = (entry[0] if entry else 0) + 1
+            self._entries[call_sid] = (version, state, now)
+            return version
+
+    def delete(self, call_sid):
+        with self._lock:
+            self._entries.pop(call_sid, None)
+        if self.backend is not None:
+            try:
+                self.backend.delete(call_sid)
+            except Exception as e:
+                print(f"Conversation store delete failed: {e}")
+
+    def _remember(self, call_sid, version, state, now):
+        with self._lock:
+            self._entries[call_sid] = (version, state, now)
+            self._entries.move_to_end(call_sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def active_calls(self, window=None):
+        """Conversations saved within ``window`` seconds (default: the TTL). With a SQL
+        backend this counts every worker's calls; otherwise only this process's."""
+        cutoff = time.time() - (self.ttl if window is None else window)
+        if self.backend is not None:
+            return self.backend.count_active(cutoff)
+        with self._lock:
+            return sum(1 for _, _, touched in self._entries.values() if touched >= cutoff)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+            data["entries"] = len(self._entries)
+        data["backend"] = "sql" if self.backend is not None else "memory"
+        return data
+
+
+def _meta(version, state):
+    return {'version': version, 'keys': list(state), 'messages': len(state.get('messages', [])),
+            'user_turns': state.get('user_turns', 0)}
+
+
+def _hand_out(version, state):
+    copied = _copy_state(state)
+    copied[META_KEY] = _meta(version, state)
+    return copied
+
+
+def _rebase(ours, base, theirs):
+    """Our changes to the copy described by ``base``, replayed onto ``theirs`` (the stored state)."""
+    merged = _copy_state(theirs)
+    for key in base['keys']:
+        if key not in ours:
+            merged.pop(key, None)
+    for key, value in ours.items():
+        if key not in ('messages', 'summary', 'user_turns'):
+            merged[key] = value
+    # The summary belongs with their message list; our new turns go after theirs
+    merged['messages'] = merged.get('messages', []) + ours.get('messages', [])[base['messages']:]
+    merged['user_turns'] = theirs.get('user_turns', 0) + ours.get('user_turns', 0) - base['user_turns']
+    return merged
+
+
+def _copy_state(state):
+    # Callers mutate the message list in place; never hand out our own copy.
+    copied = dict(state)
+    if "messages" in copied:
+        copied["messages"] = [dict(m) for m in copied["messages"]]
+    return copied
@@ -0,0 +1,535 @@
+"""
+Database connection pooling for the voice agent.
+
+PostgreSQL gets a bounded pool of psycopg2 connections per worker process and
+SQLite gets one persistent connection per thread. Both hand out a
+PooledConnection proxy whose close() returns the connection to the pool, so
+helpers can keep the usual connect / execute / commit / close shape.
+
+With an ``observer`` each execute, fetch and commit is timed and reported as
+``observer(label, operation, seconds, failed)``, where ``label`` names the
+helper that borrowed the connection.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the acquire timeout."""
+
+
+class TimedCursor:
+    """Cursor proxy that reports execute and fetch timings to the pool's observer."""
+
+    def __init__(self, cursor, observer, label):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_observer", observer)
+        object.__setattr__(self, "_label", label)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # e.g. itersize on psycopg2 named cursors, row_factory on sqlite3 cursors
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+        return False
+
+    def _timed(self, operation, method, *args):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = method(*args)
+            failed = False
+            return result
+        finally:
+            self._observer(self._label, operation, time.perf_counter() - started, failed)
+
+    def execute(self, *args):
+        return self._timed("execute", self._cursor.execute, *args)
+
+    def executemany(self, *args):
+        return self._timed("execute", self._cursor.executemany, *args)
+
+    def fetchone(self):
+        return self._timed("fetch", self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed("fetch", self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed("fetch", self._cursor.fetchall)
+
+
+class PooledConnection:
+    """Thin proxy around a DB-API connection borrowed from a pool."""
+
+    def __init__(self, pool, raw, label=None):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+        self.label = label
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        observer = self._pool.observer
+        return cursor if observer is None else TimedCursor(cursor, observer, self.label)
+
+    def _commit(self):
+        self._raw.commit()
+
+    def commit(self):
+        observer = self._pool.observer
+        if observer is None:
+            return self._commit()
+        started = time.perf_counter()
+        failed = True
+        try:
+            self._commit()
+            failed = False
+        finally:
+            observer(self.label, "commit", time.perf_counter() - started, failed)
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)."""
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            try:
+                self.rollback()
+            except Exception:
+                pass
+        self.close()
+        return False
+
+
+class SavepointConnection(PooledConnection):
+    """A nested borrow of a connection already lent out on this thread. Its work runs inside a
+    SAVEPOINT, so its commit(), rollback() and close() leave the outer borrower's transaction alone.
+    What it commits becomes part of that transaction (or is committed, if none was open)."""
+
+    def __init__(self, pool, raw, label, name):
+        super().__init__(pool, raw, label)
+        self._savepoint = name
+        raw.execute(f"SAVEPOINT {name}")
+
+    def _commit(self):
+        self._raw.execute(f"RELEASE SAVEPOINT {self._savepoint}")
+        self._raw.execute(f"SAVEPOINT {self._savepoint}")
+
+    def rollback(self):
+        self._raw.execute(f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+
+    def close(self):
+        """Discard uncommitted work since the savepoint and return the connection."""
+        if not self._released:
+            try:
+                self._raw.execute(f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+                self._raw.execute(f"RELEASE SAVEPOINT {self._savepoint}")
+            except Exception:
+                pass
+        super().close()
+
+
+class _PoolStats:
+    """Counters shared by both pool implementations."""
+
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.acquired = 0
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+        self.health_check_failures = 0
+        self.expired = 0
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "closed": self.closed,
+            "acquired": self.acquired,
+            "waits": self.waits,
+            "wait_time_total_ms": round(self.wait_time_total * 1000, 3),
+            "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+            "timeouts": self.timeouts,
+            "health_check_failures": self.health_check_failures,
+            "expired": self.expired,
+        }
+
+
+class PostgresPool:
+    """Bounded, thread-safe psycopg2 connection pool.
+
+    Connections are created lazily up to ``maxconn``. Idle connections are
+    health-checked with ``SELECT 1`` when they have not been used for
+    ``health_check_interval`` seconds and are recycled once they are older
+    than ``max_lifetime`` seconds. The pool resets itself after a fork so each
+    gunicorn worker owns its own sockets.
+    """
+
+    def __init__(self, connect_kwargs, minconn=1, maxconn=10, acquire_timeout=5.0,
+                 max_lifetime=1800.0, health_check_interval=30.0, observer=None):
+        import psycopg2
+        self._psycopg2 = psycopg2
+        self.connect_kwargs = dict(connect_kwargs)
+        self.minconn = max(0, minconn)
+        self.maxconn = max(1, maxconn)
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.observer = observer
+        self._cond = threading.Condition()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = deque()        # (raw, created_at, last_used)
+        self._created_at = {}       # id(raw) -> created_at for checked-out conns
+        self._size = 0
+        self._in_use = 0
+        self.stats_counters = _PoolStats()
+
+    def _check_pid(self):
+        # Connections inherited from the parent process must not be reused
+        # (or closed) in the child; just drop our references to them.
+        if self._pid != os.getpid():
+            self._reset_state()
+
+    def _connect(self):
+        raw = self._psycopg2.connect(**self.connect_kwargs)
+        raw.autocommit = False
+        return raw
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self.stats_counters.closed += 1
+
+    def _healthy(self, raw):
+        try:
+            cur = raw.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+            raw.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self.stats_counters.health_check_failures += 1
+            return False
+
+    def prefill(self):
+        """Open ``minconn`` connections up front."""
+        with self._cond:
+            self._check_pid()
+            missing = self.minconn - self._size
+            self._size += max(0, missing)
+        for _ in range(max(0, missing)):
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            now = time.monotonic()
+            with self._cond:
+                self.stats_counters.created += 1
+                self._idle.append((raw, now, now))
+                self._cond.notify()
+
+    def acquire(self, label=None):
+        deadline = time.monotonic() + self.acquire_timeout
+        waited = False
+        wait_started = 0.0
+        while True:
+            candidate = None
+            create = False
+            with self._cond:
+                self._check_pid()
+                while True:
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats_counters.timeouts += 1
+                        raise PoolTimeout(
+                            f"No database connection available after {self.acquire_timeout}s "
+                            f"(pool size {self.maxconn})")
+                    if not waited:
+                        waited = True
+                        wait_started = time.monotonic()
+                        self.stats_counters.waits += 1
+                    self._cond.wait(remaining)
+                self._in_use += 1
+
+            now = time.monotonic()
+            if create:
+                try:
+                    raw = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+                created_at = now
+            else:
+                raw, created_at, last_used = candidate
+                expired = not raw.closed and self.max_lifetime and now - created_at > self.max_lifetime
+                stale = raw.closed or expired
+                if not stale and now - last_used > self.health_check_interval:
+                    stale = not self._healthy(raw)
+                if stale:
+                    self._discard(raw)
+                    with self._cond:
+                        if expired:
+                            self.stats_counters.expired += 1
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    continue
+
+            with self._cond:
+                if create:
+                    self.stats_counters.created += 1
+                if waited:
+                    waited_for = time.monotonic() - wait_started
+                    self.stats_counters.wait_time_total += waited_for
+                    self.stats_counters.wait_time_max = max(self.stats_counters.wait_time_max, waited_for)
+                self.stats_counters.acquired += 1
+                self._created_at[id(raw)] = created_at
+            return PooledConnection(self, raw, label)
+
+    def release(self, raw):
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            created_at = self._created_at.pop(id(raw), time.monotonic())
+        keep = not raw.closed
+        if keep:
+            try:
+                # Never hand out a connection with an open transaction.
+                if raw.status != self._psycopg2.extensions.STATUS_READY:
+                    raw.rollback()
+            except Exception:
+                keep = False
+        expired = keep and self.max_lifetime and time.monotonic() - created_at > self.max_lifetime
+        if expired:
+            keep = False
+        if not keep:
+            self._discard(raw)
+        with self._cond:
+            if expired:
+                self.stats_counters.expired += 1
+            self._in_use -= 1
+            if keep:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._cond:
+            self._check_pid()
+            data = {
+                "backend": "postgres",
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max": self.maxconn,
+            }
+        data.update(self.stats_counters.as_dict())
+        return data
+
+
+class _ThreadConnection:
+    """Per-thread holder so the connection is closed when its thread exits."""
+
+    def __init__(self, raw, created_at):
+        self.raw = raw
+        self.created_at = created_at
+        self.checked_at = created_at
+        self.depth = 0
+        self.finalizer = None
+
+
+class SQLitePool:
+    """Persistent per-thread SQLite connections.
+
+    SQLite connections are cheap to keep but not safe to share across
+    threads, so each thread keeps its own connection for up to
+    ``max_lifetime`` seconds. Nested acquires on the same thread share the
+    connection through a SAVEPOINT (SavepointConnection), so an inner commit
+    or rollback does not end the outer borrower's transaction; any
+    transaction left open is rolled back when the outermost borrower
+    releases it.
+    """
+
+    def __init__(self, database, max_lifetime=1800.0, health_check_interval=30.0,
+                 timeout=5.0, pragmas=(), observer=None):
+        self.database = database
+        self.observer = observer
+        self.pragmas = pragmas
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._open = 0
+        self._in_use = 0
+        self.stats_counters = _PoolStats()
+
+    def _connect(self):
+        raw = sqlite3.connect(self.database, timeout=self.timeout)
+        for pragma in self.pragmas:
+            raw.execute(pragma)
+        holder = _ThreadConnection(raw, time.monotonic())
+        holder.finalizer = weakref.finalize(holder, self._close_raw, raw, self._pid)
+        with self._lock:
+            self.stats_counters.created += 1
+            self._open += 1
+        return holder
+
+    def _close_raw(self, raw, pid):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            if pid == self._pid:
+                self.stats_counters.closed += 1
+                self._open -= 1
+
+    def _discard(self, holder):
+        self._local.conn = None
+        holder.finalizer()
+
+    def _healthy(self, raw):
+        try:
+            raw.execute("SELECT 1").fetchone()
+            return True
+        except Exception:
+            with self._lock:
+                self.stats_counters.health_check_failures += 1
+            return False
+
+    def acquire(self, label=None):
+        if self._pid != os.getpid():
+            # Forked: start over with a fresh thread-local namespace.
+            with self._lock:
+                self._local = threading.local()
+                self._pid = os.getpid()
+                self._open = 0
+                self._in_use = 0
+        holder = getattr(self._local, "conn", None)
+        now = time.monotonic()
+        if holder is not None and holder.depth == 0:
+            if self.max_lifetime and now - holder.created_at > self.max_lifetime:
+                with self._lock:
+                    self.stats_counters.expired += 1
+                self._discard(holder)
+                holder = None
+            elif now - holder.checked_at > self.health_check_interval:
+                if self._healthy(holder.raw):
+                    holder.checked_at = now
+                else:
+                    self._discard(holder)
+                    holder = None
+        if holder is None:
+            holder = self._connect()
+            self._local.conn = holder
+        holder.depth += 1
+        with self._lock:
+            self.stats_counters.acquired += 1
+            if holder.depth == 1:
+                self._in_use += 1
+        if holder.depth == 1:
+            return PooledConnection(self, holder.raw, label)
+        try:
+            return SavepointConnection(self, holder.raw, label, f"nested_{holder.depth}")
+        except Exception:
+            self.release(holder.raw)
+            raise
+
+    def release(self, raw):
+        holder = getattr(self._local, "conn", None)
+        if holder is None or holder.raw is not raw:
+            # Connection was replaced (fork or recycle) while borrowed.
+            return
+        holder.depth = max(0, holder.depth - 1)
+        if holder.depth == 0:
+            if raw.in_transaction:
+                try:
+                    raw.rollback()
+                except Exception:
+                    pass
+            with self._lock:
+                self._in_use -= 1
+
+    def close_all(self):
+        """Close the calling thread's connection (others close with their threads)."""
+        holder = getattr(self._local, "conn", None)
+        if holder is not None and holder.depth == 0:
+            self._discard(holder)
+
+    def stats(self):
+        with self._lock:
+            data = {
+                "backend": "sqlite",
+                "size": self._open,
+                "idle": max(0, self._open - self._in_use),
+                "in_use": self._in_use,
+                "max": None,
+            }
+            data.update(self.stats_counters.as_dict())
+        return data
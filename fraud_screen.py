@@ -0,0 +1,192 @@
+"""
+Screens caller speech for sensitive-data requests before any LLM call.
+
+Requests such as voter-list dumps or another person's Aadhaar details used
+to be refused only after a full Groq round trip, when the model tagged its
+reply [SUSPICIOUS]. FraudScreen matches every utterance against a rule file
+instead: each rule lists groups of phrases (English, Hinglish, Devanagari)
+and fires when every group has a phrase in the utterance, plus an optional
+regular expression that must also match (e.g. a 12-digit number). Phrases
+under ``none`` stop the rule from firing (e.g. a caller reading out their
+own Aadhaar number).
+
+All phrases of all rules are compiled into one Aho-Corasick automaton, run
+once over the utterance's normalized tokens (text_normalize, stop words
+kept), so the cost does not grow with the number of phrases. Phrases match
+whole words only. The rule file is re-read when its modification time
+changes (checked every ``reload_interval`` seconds, so every worker picks up
+an edit); a file that fails to load leaves the previous rules in place.
+
+Rule file:
+    {"rules": [{"id": "voter-list", "reason": "Voter list request",
+                "all": [["voter list", "मतदाता सूची"], ["sabki", "bulk", "excel"]],
+                "none": ["optional phrases that rule the match out"],
+                "regex": "optional pattern, matched case-insensitively on the raw text"}]}
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from text_normalize import normalize_tokens
+
+# Automaton value for a rule's ``none`` phrases, next to its group numbers
+EXCLUDED = "none"
+
+
+def normalize(text):
+    """Tokens joined and padded with spaces, so phrases match on word boundaries."""
+    return f" {' '.join(normalize_tokens(text, drop_stop_words=False))} "
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: ``find(text)`` returns the set of values whose pattern occurs in text."""
+
+    def __init__(self, patterns):
+        """``patterns``: iterable of (pattern string, value)."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+        for pattern, value in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                node = nxt
+            self._out[node].add(value)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                # Children of the root fail back to the root, not to themselves
+                self._fail[nxt] = fail if fail != nxt else 0
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
+    def __len__(self):
+        return len(self._goto)
+
+
+class CompiledRules:
+    """One rule file compiled: the automaton over every phrase, and per rule its groups and regex."""
+
+    def __init__(self, rules):
+        self.rules = []
+        patterns = []
+        for rule in rules:
+            if not rule.get("all") and not rule.get("regex"):
+                raise ValueError(f"rule {rule.get('id')!r} has neither phrase groups nor a regex")
+            regex = re.compile(rule["regex"], re.IGNORECASE) if rule.get("regex") else None
+            index = len(self.rules)
+            self.rules.append((rule, len(rule.get("all", [])), regex))
+            for group, phrases in enumerate(rule.get("all", [])):
+                for phrase in phrases:
+                    if normalize(phrase).strip():
+                        patterns.append((normalize(phrase), (index, group)))
+            for phrase in rule.get("none", []):
+                if normalize(phrase).strip():
+                    patterns.append((normalize(phrase), (index, EXCLUDED)))
+        self.phrases = len(patterns)
+        self.automaton = AhoCorasick(patterns)
+
+    def match(self, text):
+        hits = {}
+        for index, group in self.automaton.find(normalize(text)):
+            hits.setdefault(index, set()).add(group)
+        for index, (rule, groups, regex) in enumerate(self.rules):
+            found = hits.get(index, set())
+            if EXCLUDED not in found and len(found) == groups and (regex is None or regex.search(text)):
+                return rule
+        return None
+
+
+class FraudScreen:
+    """``check(text)`` returns the first matching rule (a dict with ``id`` and ``reason``) or None."""
+
+    def __init__(self, path, reload_interval=5.0, enabled=True):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._compiled = CompiledRules([])
+        self._mtime = None
+        self._seen_mtime = None
+        self._checked_at = 0.0
+        self.last_error = None
+        self.counters = {"checks": 0, "matches": 0, "reloads": 0, "reload_errors": 0}
+        self._matches = {}
+        self.reload()
+
+    def reload(self):
+        """Re-read the rule file; on failure keep the current rules. Returns True if new rules were loaded."""
+        try:
+            mtime = self._seen_mtime = os.stat(self.path).st_mtime
+            with open(self.path, encoding='utf-8') as f:
+                compiled = CompiledRules(json.load(f)["rules"])
+        except (OSError, ValueError, KeyError, TypeError, re.error) as e:
+            with self._lock:
+                self.counters["reload_errors"] += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Fraud rules not loaded from {self.path}: {e}")
+            return False
+        with self._lock:
+            self._compiled, self._mtime = compiled, mtime
+            self.counters["reloads"] += 1
+            self.last_error = None
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        # A broken file is tried once; the next edit is picked up again
+        if mtime != self._seen_mtime:
+            self.reload()
+
+    def check(self, text):
+        if not self.enabled or not text:
+            return None
+        self._maybe_reload()
+        rule = self._compiled.match(text)
+        with self._lock:
+            self.counters["checks"] += 1
+            if rule is not None:
+                self.counters["matches"] += 1
+                self._matches[rule["id"]] = self._matches.get(rule["id"], 0) + 1
+        return rule
+
+    def stats(self):
+        with self._lock:
+            compiled = self._compiled
+            return dict(self.counters, enabled=self.enabled, path=self.path, rules=len(compiled.rules),
+                        phrases=compiled.phrases, states=len(compiled.automaton), last_error=self.last_error,
+                        loaded_mtime=self._mtime, matches_by_rule=dict(self._matches))
@@ -3,6 +3,7 @@ import { Download, RefreshCw, Phone, Clock } from 'lucide-react'
 import { useLanguage } from '../context/LanguageContext'
 import { translations } from '../translations/en-hi'
 import { API_URL } from '../config'
+import { subscribeToCallEvents, applyCallEvent } from '../liveEvents'
 
 const CallLogs = () => {
   const { language } = useLanguage()
@@ -31,8 +32,11 @@ const CallLogs = () => {
 
   useEffect(() => {
     fetchLogs()
-    const interval = setInterval(fetchLogs, 10000)
-    return () => clearInterval(interval)
+    // New calls and transcript lines are pushed by the server instead of polled
+    return subscribeToCallEvents(
+      (kind, data) => setLogs(logs => applyCallEvent(logs, kind, data)),
+      fetchLogs,
+    )
   }, [])
 
   const handleDownload = async () => {
@@ -3,6 +3,7 @@ import { Phone, Download, RefreshCw, BarChart3, Clock } from 'lucide-react'
 import { useLanguage } from '../context/LanguageContext'
 import { translations } from '../translations/en-hi'
 import { API_URL } from '../config'
+import { subscribeToCallEvents, applyCallEvent } from '../liveEvents'
 
 const Dashboard = () => {
   const { language } = useLanguage()
@@ -28,8 +29,11 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchLogs()
-    const interval = setInterval(fetchLogs, 10000)
-    return () => clearInterval(interval)
+    // New calls and transcript lines are pushed by the server instead of polled
+    return subscribeToCallEvents(
+      (kind, data) => setLogs(logs => applyCallEvent(logs, kind, data)),
+      fetchLogs,
+    )
   }, [])
 
   
@@ -3,6 +3,7 @@ import { PhoneIncoming, Clock, MapPin, RefreshCw, Download } from 'lucide-react'
 import { useLanguage } from '../context/LanguageContext'
 import { translations } from '../translations/en-hi'
 import { API_URL } from '../config'
+import { subscribeToCallEvents, applyCallEvent } from '../liveEvents'
 
 
 const InboundCalls = () => {
@@ -13,7 +14,7 @@ const InboundCalls = () => {
 
   const fetchLogs = async () => {
     try {
-      const response = await fetch(`${API_URL}/api/logs`)
+      const response = await fetch(`${API_URL}/api/logs?direction=Inbound`)
       if (!response.ok) {
         throw new Error(`Server error: ${response.status}`)
       }
@@ -29,8 +30,11 @@ const InboundCalls = () => {
 
   useEffect(() => {
     fetchLogs()
-    const interval = setInterval(fetchLogs, 10000)
-    return () => clearInterval(interval)
+    // New calls and transcript lines are pushed by the server instead of polled
+    return subscribeToCallEvents(
+      (kind, data) => setLogs(logs => applyCallEvent(logs, kind, data, 'Inbound')),
+      fetchLogs,
+    )
   }, [])
 
   const handleDownload = async () => {
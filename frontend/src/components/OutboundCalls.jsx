@@ -3,6 +3,7 @@ import { PhoneOutgoing, Phone, RefreshCw, Download, CheckCircle, XCircle, Clock
 import { useLanguage } from '../context/LanguageContext'
 import { translations } from '../translations/en-hi'
 import { API_URL } from '../config'
+import { subscribeToCallEvents, applyCallEvent } from '../liveEvents'
 
 const OutboundCalls = () => {
   const { language } = useLanguage()
@@ -44,7 +45,7 @@ const OutboundCalls = () => {
 
   const fetchLogs = async () => {
     try {
-      const response = await fetch(`${API_URL}/api/logs`)
+      const response = await fetch(`${API_URL}/api/logs?direction=Outbound`)
       if (!response.ok) {
         throw new Error(`Server error: ${response.status}`)
       }
@@ -73,10 +74,35 @@ const OutboundCalls = () => {
 
   useEffect(() => {
     fetchLogs()
-    const interval = setInterval(fetchLogs, 10000)
-    return () => clearInterval(interval)
+    // New calls and transcript lines are pushed by the server instead of polled
+    return subscribeToCallEvents(
+      (kind, data) => setLogs(logs => applyCallEvent(logs, kind, data, 'Outbound')),
+      fetchLogs,
+    )
   }, [])
 
+  // Calls are dialed in the background; follow the batch until every number is done
+  const pollBatchStatus = (statusUrl) => {
+    const poll = async () => {
+      try {
+        const response = await fetch(`${API_URL}${statusUrl}`)
+        if (!response.ok) {
+          throw new Error(`Server error: ${response.status}`)
+        }
+        const status = await response.json()
+        setCallStatus({ type: 'success', message: status.message, details: status })
+        if (status.done) {
+          fetchLogs()
+          return
+        }
+      } catch (error) {
+        console.error('Error fetching batch status:', error)
+      }
+      setTimeout(poll, 2000)
+    }
+    setTimeout(poll, 2000)
+  }
+
   const handleMakeCall = async (e) => {
     e.preventDefault()
     
@@ -118,7 +144,11 @@ const OutboundCalls = () => {
       savePhoneToHistory(formData.to_number)
       // Keep webhook URL and custom message, only clear phone numbers
       setFormData(prev => ({ ...prev, to_number: '' }))
-      setTimeout(fetchLogs, 2000)
+      if (result.status_url) {
+        pollBatchStatus(result.status_url)
+      } else {
+        setTimeout(fetchLogs, 2000)
+      }
     } catch (error) {
       console.error('Make call error:', error)
       const errorMessage = error.message.includes('Failed to fetch')
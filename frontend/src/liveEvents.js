@@ -0,0 +1,33 @@
+import { API_URL } from './config'
+
+// Longest call list kept in memory while new calls stream in
+const MAX_ROWS = 500
+
+// Subscribe to /api/events. The browser reconnects on its own and sends
+// Last-Event-ID, so nothing is missed; `onReset` runs when the server could
+// not replay the gap and the list should be reloaded. Returns an unsubscribe
+// function for useEffect cleanup.
+export const subscribeToCallEvents = (onEvent, onReset) => {
+  const source = new EventSource(`${API_URL}/api/events`)
+  for (const kind of ['call', 'transcript', 'suspicious']) {
+    source.addEventListener(kind, (e) => onEvent(kind, JSON.parse(e.data)))
+  }
+  source.addEventListener('reset', () => onReset && onReset())
+  return () => source.close()
+}
+
+// Fold one event into a newest-first list of /api/logs rows
+export const applyCallEvent = (logs, kind, data, direction) => {
+  if (kind === 'call') {
+    if ((direction && data.direction !== direction) || logs.some(log => log.call_sid === data.call_sid)) {
+      return logs
+    }
+    return [data, ...logs].slice(0, MAX_ROWS)
+  }
+  if (kind === 'transcript') {
+    return logs.map(log => log.call_sid === data.call_sid
+      ? { ...log, last_message: data.message, turn_count: (log.turn_count || 0) + 1 }
+      : log)
+  }
+  return logs
+}
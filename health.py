@@ -0,0 +1,73 @@
+"""
+Dependency checks for the readiness probe.
+
+Each check is a function that raises on failure. Checks run concurrently in
+short-lived threads and each is bounded by ``timeout``, so one hung
+dependency cannot stall the probe. Results are cached for ``cache_ttl``
+seconds: orchestrators probe every few seconds on every pod and external
+APIs should not see that traffic. A check still running from an earlier
+probe is reported as timed out rather than started a second time.
+"""
+
+import threading
+import time
+
+
+class DependencyProbe:
+    """Runs named checks and reports whether each passed and how long it took."""
+
+    def __init__(self, checks, timeout=2.0, cache_ttl=5.0):
+        self.checks = dict(checks)
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._running = {}
+        self._results = {}
+        self._checked_at = None
+
+    def _start(self, name, check, outcome):
+        def run():
+            started = time.perf_counter()
+            try:
+                check()
+                outcome.update(ok=True)
+            except Exception as e:
+                outcome.update(ok=False, error=f"{type(e).__name__}: {e}")
+            outcome["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+        thread = threading.Thread(target=run, name=f"probe-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        """{name: {"ok", "latency_ms"[, "error"]}}, from cache when fresh."""
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.cache_ttl:
+                return dict(self._results)
+            started = time.monotonic()
+            pending = {}
+            results = {}
+            for name, check in self.checks.items():
+                running = self._running.get(name)
+                if running is not None and running.is_alive():
+                    results[name] = {"ok": False, "error": "previous check still running",
+                                     "latency_ms": round(self.timeout * 1000, 2)}
+                    continue
+                outcome = {}
+                self._running[name] = self._start(name, check, outcome)
+                pending[name] = outcome
+            for name, outcome in pending.items():
+                self._running[name].join(max(0.0, started + self.timeout - time.monotonic()))
+                if "latency_ms" in outcome:
+                    results[name] = dict(outcome)
+                else:
+                    results[name] = {"ok": False, "error": f"timed out after {self.timeout}s",
+                                     "latency_ms": round(self.timeout * 1000, 2)}
+            self._results = results
+            self._checked_at = time.monotonic()
+            return dict(results)
+
+    def last_results(self):
+        """The most recent results without running the checks."""
+        with self._lock:
+            return dict(self._results)
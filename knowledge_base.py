@@ -0,0 +1,145 @@
+"""
+Scheme knowledge base with BM25 retrieval.
+
+Instead of inlining every scheme detail into the system prompt, each turn
+gets the few passages that match the caller's question. Passages are
+{"id", "title", "text", "keywords"}; ``keywords`` holds Hindi and Hinglish
+names that the English text does not use. Questions and passages go through
+text_normalize.normalize_tokens (romanization variants, Devanagari scheme
+names, filler words) plus the folds below, so "kisaan ki kisht", "PM-KISAN
+installment" and "किसान किस्त" meet on the same terms.
+
+The index maps each term to its postings with the BM25 weight already
+computed, so a search only adds up weights for the query's terms. It is built
+from the passages on startup, or loaded from a file written by
+``python knowledge_base.py build``.
+"""
+
+import argparse
+import heapq
+import json
+import math
+import sys
+from collections import Counter
+
+from text_normalize import normalize_tokens
+
+INDEX_VERSION = 1
+
+# Hinglish and Devanagari words (as normalize_tokens leaves them) that mean a term used in the passages
+RETRIEVAL_TERMS = {
+    'dastavej': 'document', 'kagaj': 'document', 'kagjat': 'document', 'दस्तावेज': 'document', 'कागज': 'document',
+    'ghar': 'house', 'makan': 'house', 'घर': 'house', 'मकान': 'house',
+    'bima': 'insurance', 'बीमा': 'insurance', 'ilaj': 'treatment', 'इलाज': 'treatment',
+    'aspatal': 'hospital', 'अस्पताल': 'hospital', 'पेंशन': 'pension', 'penshan': 'pension',
+    'budhapa': 'pension', 'vridha': 'pension', 'वृद्धा': 'pension',
+    'karj': 'loan', 'rin': 'loan', 'लोन': 'loan', 'ऋण': 'loan', 'कर्ज': 'loan',
+    'paisa': 'kist', 'paise': 'kist', 'पैसा': 'kist', 'पैसे': 'kist', 'किसत': 'kist',
+    'gas': 'lpg', 'silindar': 'lpg', 'silendar': 'lpg', 'cylinder': 'lpg', 'गैस': 'lpg', 'सिलेंडर': 'lpg',
+    'bijli': 'electricity', 'बिजली': 'electricity', 'anaj': 'foodgrain', 'अनाज': 'foodgrain',
+    'gehun': 'foodgrain', 'chaval': 'foodgrain', 'dhokha': 'fraud', 'thagi': 'fraud', 'धोखा': 'fraud',
+    'ठगी': 'fraud', 'beti': 'girl', 'ladki': 'girl', 'बेटी': 'girl', 'लड़की': 'girl',
+    'chhatravritti': 'scholarship', 'छात्रवृत्ति': 'scholarship', 'naukri': 'job', 'rojgar': 'job',
+}
+
+
+def tokenize(text):
+    """normalize_tokens plus the retrieval folds and plural stripping for English words."""
+    tokens = []
+    for token in normalize_tokens(text):
+        token = RETRIEVAL_TERMS.get(token, token)
+        if token.isascii() and len(token) > 4:
+            if token.endswith('ies'):
+                token = token[:-3] + 'y'
+            elif token.endswith('s') and not token.endswith('ss'):
+                token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def passage_text(passage):
+    return ' '.join(passage.get(field) or '' for field in ('title', 'text', 'keywords'))
+
+
+class KnowledgeBase:
+    """BM25 index over ``passages``. ``search(question, k)`` returns up to k passages, best first,
+    leaving out those scoring under ``min_share`` of the best (matches on a stray common word)."""
+
+    def __init__(self, passages, k1=1.2, b=0.75, min_share=0.25, postings=None):
+        self.passages = list(passages)
+        self.k1 = k1
+        self.b = b
+        self.min_share = min_share
+        self._postings = postings if postings is not None else self._index()
+
+    def _index(self):
+        counts = [Counter(tokenize(passage_text(passage))) for passage in self.passages]
+        lengths = [sum(c.values()) for c in counts]
+        average = sum(lengths) / len(lengths) if lengths else 0.0
+        docs = {}
+        for i, c in enumerate(counts):
+            for term, tf in c.items():
+                docs.setdefault(term, []).append((i, tf))
+        postings = {}
+        for term, entries in docs.items():
+            idf = math.log(1 + (len(counts) - len(entries) + 0.5) / (len(entries) + 0.5))
+            postings[term] = [
+                (i, idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * lengths[i] / average)))
+                for i, tf in entries]
+        return postings
+
+    def search(self, question, k=3):
+        scores = {}
+        for term in set(tokenize(question)):
+            for i, weight in self._postings.get(term, ()):
+                scores[i] = scores.get(i, 0.0) + weight
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [self.passages[i] for i, score in top if score >= top[0][1] * self.min_share]
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "k1": self.k1, "b": self.b, "passages": self.passages,
+                       "postings": {term: [[i, round(w, 6)] for i, w in entries]
+                                    for term, entries in self._postings.items()}},
+                      f, ensure_ascii=False)
+
+    @classmethod
+    def from_file(cls, path, **options):
+        """Passages (a JSON list) indexed now, or an index written by save(). Raises OSError / ValueError."""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            return cls(data, **options)
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            raise ValueError(f"{path}: not a passage list or a version {INDEX_VERSION} index")
+        postings = {term: [tuple(entry) for entry in entries] for term, entries in data["postings"].items()}
+        return cls(data["passages"], k1=data["k1"], b=data["b"], postings=postings, **options)
+
+    def stats(self):
+        return {"passages": len(self.passages), "terms": len(self._postings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheme knowledge base index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="index a passage list and write the index file")
+    build.add_argument("passages")
+    build.add_argument("index")
+    search = sub.add_parser("search", help="show the passages a question retrieves")
+    search.add_argument("path", help="passage list or index file")
+    search.add_argument("question")
+    search.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        kb = KnowledgeBase.from_file(args.passages)
+        kb.save(args.index)
+        print(f"Indexed {kb.stats()['passages']} passages, {kb.stats()['terms']} terms -> {args.index}")
+    else:
+        for passage in KnowledgeBase.from_file(args.path).search(args.question, args.k):
+            print(f"[{passage['id']}] {passage['title']}: {passage['text']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
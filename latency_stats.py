@@ -0,0 +1,77 @@
+"""
+In-process latency samples with percentile summaries.
+
+Each key keeps a bounded ring of its most recent samples, so memory stays
+flat no matter how long the worker runs.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, min(len(ordered), int(-(-pct * len(ordered) // 100))))
+    return ordered[rank - 1]
+
+
+class LatencyRecorder:
+    """Recent latency samples (seconds) per key."""
+
+    def __init__(self, max_samples=2048):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def record(self, key, seconds):
+        with self._lock:
+            ring = self._samples.get(key)
+            if ring is None:
+                ring = self._samples[key] = deque(maxlen=self.max_samples)
+            ring.append(seconds)
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def summary(self, prefix=None):
+        """p50/p95/p99/max in milliseconds for every key (optionally filtered by prefix)."""
+        with self._lock:
+            snapshot = {k: sorted(v) for k, v in self._samples.items()
+                        if prefix is None or k.startswith(prefix)}
+            counts = dict(self._counts)
+        return {
+            key: {
+                "count": counts[key],
+                "window": len(ordered),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            }
+            for key, ordered in snapshot.items()
+        }
+
+
+class PhaseTimer:
+    """Splits one request's wall time into named phases.
+
+    ``lap(name)`` charges the time since the previous lap (or the start) to
+    ``name``, so straight-line handler code needs one call after each step.
+    """
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases = {}
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + (now - self._last)
+        self._last = now
+
+    def ms(self, name):
+        return round(self.phases.get(name, 0.0) * 1000, 3)
+
+    def total_ms(self):
+        return round((self._last - self.started) * 1000, 3)
@@ -0,0 +1,271 @@
+"""
+Live call feed for the dashboards, served as Server-Sent Events.
+
+write_log_rows() appends one ``live_events`` row per logged call, transcript
+line and fraud flag, in the same transaction as the data. Each worker runs a
+single EventHub thread that polls the table for ids above the last one it saw
+and fans new events out to that worker's subscribers, so database reads scale
+with the number of workers rather than the number of open dashboards.
+
+Event ids are the table ids. A browser that reconnects sends the last id it
+received as Last-Event-ID and is replayed what it missed, from the hub's
+in-memory history or, for longer gaps, from the table. Each subscriber has a
+bounded queue; a subscriber that falls behind is disconnected instead of
+buffering without limit, and resumes the same way.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+LiveEvent = namedtuple("LiveEvent", "id kind data")
+
+# Arbitrary constant for pg_advisory_xact_lock: serializes event inserts so ids
+# become visible in order and a poller never skips a late-committing lower id
+LIVE_EVENTS_LOCK_ID = 4480212
+
+# Event kind and payload fields for each logged table, in LOG_INSERT_SQL row order
+EVENT_FIELDS = {
+    'calls': ('call', ('call_sid', 'from_number', 'to_number', 'direction', 'timestamp', 'timestamp_ms')),
+    'transcripts': ('transcript', ('call_sid', 'role', 'message', 'timestamp', 'timestamp_ms')),
+    'suspicious_activity': ('suspicious', ('call_sid', 'phone_number', 'reason', 'timestamp', 'timestamp_ms')),
+}
+
+
+def event_rows(events):
+    """``live_events`` rows (kind, call_sid, payload, created_ms) for the (table, row) log events
+    the dashboards show."""
+    rows = []
+    for table, row in events:
+        if table not in EVENT_FIELDS:
+            continue  # e.g. turn_latencies: not shown on the dashboards
+        kind, fields = EVENT_FIELDS[table]
+        data = dict(zip(fields, row))
+        if isinstance(data['timestamp'], datetime):
+            data['timestamp'] = data['timestamp'].isoformat()
+        if kind == 'call':
+            # Same shape as an /api/logs row
+            data.update(last_message=None, turn_count=0)
+        rows.append((kind, data['call_sid'], json.dumps(data), data['timestamp_ms']))
+    return rows
+
+
+def format_sse(event):
+    return f"id: {event.id}\nevent: {event.kind}\ndata: {event.data}\n\n"
+
+
+class SQLLiveEventBackend:
+    """Reads the ``live_events`` table (rows are written by app.write_log_rows)."""
+
+    def __init__(self, get_connection, placeholder="?"):
+        self.get_connection = get_connection
+        self.p = placeholder
+
+    def since(self, after_id, limit):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT id, kind, payload FROM live_events WHERE id > {self.p} ORDER BY id LIMIT {self.p}",
+                      (after_id, limit))
+            rows = [LiveEvent(*row) for row in c.fetchall()]
+            conn.commit()
+        return rows
+
+    def bounds(self):
+        """(oldest id, newest id), both 0 when the table is empty."""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM live_events")
+            oldest, newest = c.fetchone()
+            conn.commit()
+        return oldest, newest
+
+    def prune(self, keep):
+        """Delete all but the newest ``keep`` events."""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"DELETE FROM live_events WHERE id <= (SELECT MAX(id) FROM live_events) - {self.p}", (keep,))
+            deleted = c.rowcount
+            conn.commit()
+        return deleted
+
+
+class Subscription:
+    """One SSE client: a bounded queue filled by the hub, plus its replay backlog."""
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.backlog = []
+        self.last_id = 0
+        self.reset = False
+        self.overflowed = False
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def stream(self, heartbeat=15.0, retry_ms=2000):
+        """SSE text: replayed events, then live ones. A comment line every ``heartbeat``
+        seconds of silence keeps proxies from closing the connection."""
+        yield f"retry: {retry_ms}\n\n"
+        if self.reset:
+            # Too far behind to replay; the client reloads /api/logs instead
+            yield "event: reset\ndata: {}\n\n"
+        for event in self.backlog:
+            self.last_id = event.id
+            yield format_sse(event)
+        self.backlog = []
+        while not self.overflowed:
+            try:
+                event = self.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if event.id > self.last_id:
+                self.last_id = event.id
+                yield format_sse(event)
+        # Ends the response; the browser reconnects with Last-Event-ID and is replayed the rest
+
+
+class EventHub:
+    """Per-worker poller of ``live_events`` that fans events out to subscribers."""
+
+    def __init__(self, backend, poll_interval=0.5, buffer_size=256, history=1000, retention=10000,
+                 max_replay=5000, max_subscribers=100, prune_interval=60.0, enabled=True):
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.buffer_size = buffer_size
+        self.retention = retention
+        self.max_replay = max_replay
+        self.max_subscribers = max_subscribers
+        self.prune_interval = prune_interval
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._last_id = 0
+        self.counters = {"polls": 0, "events": 0, "subscribed": 0, "overflows": 0, "replayed": 0,
+                         "resets": 0, "rejected": 0, "poll_errors": 0, "pruned": 0}
+
+    def ensure_started(self):
+        # Start lazily, and again after a fork: threads do not survive fork().
+        if not self.enabled or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._subscribers = set()
+            self._history.clear()
+            self._last_id = self.backend.bounds()[1]
+            self._thread = threading.Thread(target=self._run, name="live-events", daemon=True)
+            self._thread.start()
+
+    def alive(self):
+        """False only if the poller thread was started in this process and has died."""
+        return self._pid != os.getpid() or self._thread is None or self._thread.is_alive()
+
+    def wake(self):
+        """Poll now (called after this worker commits log rows)."""
+        self._wake.set()
+
+    def _run(self):
+        last_prune = time.monotonic()
+        while True:
+            try:
+                self.poll()
+                if self.retention and time.monotonic() - last_prune >= self.prune_interval:
+                    last_prune = time.monotonic()
+                    pruned = self.backend.prune(self.retention)
+                    with self._lock:
+                        self.counters["pruned"] += pruned
+            except Exception as e:
+                with self._lock:
+                    self.counters["poll_errors"] += 1
+                print(f"Live events poll error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def poll(self, limit=500):
+        """Fetch events newer than the last seen and publish them. Returns how many."""
+        total = 0
+        while True:
+            events = self.backend.since(self._last_id, limit)
+            with self._lock:
+                self.counters["polls"] += 1
+                self.counters["events"] += len(events)
+                for event in events:
+                    self._history.append(event)
+                    for subscription in self._subscribers:
+                        subscription.offer(event)
+                if events:
+                    self._last_id = events[-1].id
+                for subscription in [s for s in self._subscribers if s.overflowed]:
+                    self._subscribers.discard(subscription)
+                    self.counters["overflows"] += 1
+            total += len(events)
+            if len(events) < limit:
+                return total
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber, or return None when this worker is at ``max_subscribers``.
+        With ``last_event_id`` the subscriber first gets every later event (or a reset
+        event when they are no longer available)."""
+        self.ensure_started()
+        subscription = Subscription(self.buffer_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self.counters["rejected"] += 1
+                return None
+            self._subscribers.add(subscription)
+            self.counters["subscribed"] += 1
+            head = self._last_id
+            history = list(self._history)
+        if last_event_id is None or last_event_id >= head:
+            # Another worker may already have sent ids this hub has not polled yet
+            subscription.last_id = max(head, last_event_id or 0)
+            return subscription
+        subscription.last_id = head
+
+        if history and history[0].id <= last_event_id + 1:
+            subscription.backlog = [event for event in history if event.id > last_event_id]
+        elif head - last_event_id <= self.max_replay and self.backend.bounds()[0] <= last_event_id + 1:
+            # Older than this worker's history but still in the table: read it once for this client
+            backlog = []
+            after = last_event_id
+            while after < head:
+                events = [event for event in self.backend.since(after, 1000) if event.id <= head]
+                if not events:
+                    break
+                backlog.extend(events)
+                after = events[-1].id
+            subscription.backlog = backlog
+        else:
+            subscription.reset = True
+        with self._lock:
+            self.counters["replayed"] += len(subscription.backlog)
+            self.counters["resets"] += int(subscription.reset)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+            data["subscribers"] = len(self._subscribers)
+            data["last_event_id"] = self._last_id
+        data["enabled"] = self.enabled
+        data["running"] = self._pid == os.getpid() and self._thread is not None
+        data["poll_interval"] = self.poll_interval
+        data["buffer_size"] = self.buffer_size
+        return data
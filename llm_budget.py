@@ -0,0 +1,108 @@
+"""
+Latency budget for the completion behind a voice turn.
+
+The primary model gets ``hedge_after`` seconds. If it has not answered by
+then (or has already failed), the same prompt goes to the faster fallback
+model as well and whichever answers first is spoken; the other is abandoned.
+Nothing waits past ``hard_cap`` seconds: the turn then fails with
+LLMUnavailable and the caller hears the language's fallback message instead
+of silence until Twilio's webhook timeout. The requests are not retried by
+the SDK (``max_retries=0``): a retry would land after the budget, and the
+hedge already covers a failed primary.
+
+Each answer comes with the path that served it:
+    primary   the primary model, with no hedge sent
+    hedged    the primary model, after the hedge was sent
+    fast      the fallback model
+and LLMUnavailable carries ``timeout`` (hard cap reached) or ``error`` (both failed).
+"""
+
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class LLMUnavailable(Exception):
+    """No completion within the budget; ``path`` is "timeout" or "error"."""
+
+    def __init__(self, path, cause=None):
+        super().__init__(f"{path}: {cause}" if cause else path)
+        self.path = path
+        self.cause = cause
+
+
+class LatencyBudget:
+    """Runs ``chat(**params)`` with hedging to ``fallback_model`` and a hard cap."""
+
+    def __init__(self, hedge_after=2.0, hard_cap=6.0, fallback_model=None, workers=32, enabled=True):
+        self.hedge_after = hedge_after
+        self.hard_cap = hard_cap
+        self.fallback_model = fallback_model
+        self.enabled = enabled
+        self._workers = workers
+        self._executor = None
+
+    def _hedge(self, params):
+        """Params of the hedge request, or None when there is no distinct fast model to send it to."""
+        if not self.fallback_model or self.fallback_model == params['model'] or self.hedge_after >= self.hard_cap:
+            return None
+        return dict(params, model=self.fallback_model)
+
+    def complete(self, chat, params):
+        """(completion, path); the requests run on a thread pool so this thread can stop waiting."""
+        if not self.enabled:
+            return chat(**params), 'primary'
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="llm")
+        deadline = time.monotonic() + self.hard_cap
+        params = dict(params, timeout=self.hard_cap, max_retries=0)
+        primary = self._executor.submit(chat, **params)
+        wait([primary], timeout=self.hedge_after)
+        if primary.done() and primary.exception() is None:
+            return primary.result(), 'primary'
+        hedge = self._hedge(params)
+        pending = {primary: 'primary' if hedge is None else 'hedged'}
+        if hedge is not None:
+            pending[self._executor.submit(chat, **hedge)] = 'fast'
+        error = None
+        while pending:
+            done, _ = wait(list(pending), timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise LLMUnavailable('timeout')
+            for future in done:
+                path = pending.pop(future)
+                if future.exception() is None:
+                    return future.result(), path
+                error = future.exception()
+        raise LLMUnavailable('error', error)
+
+    async def complete_async(self, chat, params):
+        """complete() for an async ``chat``; the losing request is cancelled."""
+        if not self.enabled:
+            return await chat(**params), 'primary'
+        deadline = time.monotonic() + self.hard_cap
+        params = dict(params, timeout=self.hard_cap, max_retries=0)
+        primary = asyncio.ensure_future(chat(**params))
+        await asyncio.wait([primary], timeout=self.hedge_after)
+        if primary.done() and primary.exception() is None:
+            return primary.result(), 'primary'
+        hedge = self._hedge(params)
+        pending = {primary: 'primary' if hedge is None else 'hedged'}
+        if hedge is not None:
+            pending[asyncio.ensure_future(chat(**hedge))] = 'fast'
+        error = None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(list(pending), timeout=max(0.0, deadline - time.monotonic()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise LLMUnavailable('timeout')
+                for task in done:
+                    path = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result(), path
+                    error = task.exception()
+            raise LLMUnavailable('error', error)
+        finally:
+            for task in pending:
+                task.cancel()
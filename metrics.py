@@ -0,0 +1,413 @@
+"""
+Prometheus metrics in the text exposition format, without extra dependencies.
+
+Counters, gauges and histograms are plain in-process objects: recording a
+sample is a dict lookup, a bisect over the bucket bounds and an increment
+under the metric's lock, cheap enough for every webhook, Groq call and query.
+
+Each gunicorn worker keeps its own values. With a ``snapshot_dir`` every
+worker also writes its values to ``<dir>/<pid>-<uuid>.json`` every few
+seconds and ``render()`` merges all the files, so whichever worker answers
+the scrape reports totals for the whole server. The uuid is new in every
+process, so a worker that reuses an exited worker's pid does not overwrite
+its file. Files of workers that have exited (pid gone, or now a different
+process) are folded into ``retired.json`` and deleted, under a lock file:
+their counters and histograms are kept (totals never go backwards), their
+gauges dropped.
+Gauges marked ``shared`` hold values that are the same from any worker (e.g.
+counted in the database) and are computed only by the worker being scraped.
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; retiring files is then unlocked
+    fcntl = None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; webhook handlers must answer Twilio well inside its 15 s timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values):
+        """The child for one combination of label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+                self._children[values] = child
+        return child
+
+    def samples(self):
+        """[(label values, value)] for this process."""
+        with self._lock:
+            seen = {}
+            for values, child in self._children.items():
+                seen.setdefault(id(child), (tuple(str(v) for v in values), child))
+            return [(values, child.value()) for values, child in seen.values()]
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; call labels() first")
+        return self.labels()
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value):
+        self._value = float(value)
+
+    def value(self):
+        return self._value
+
+
+class Counter(_Metric):
+    """Monotonic count; name it ``*_total``."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1.0):
+        self._unlabelled().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is read from ``function`` at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, function=None, shared=False):
+        self.function = function
+        self.shared = shared
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1.0):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount=1.0):
+        self._unlabelled().dec(amount)
+
+    def set(self, value):
+        self._unlabelled().set(value)
+
+    def samples(self):
+        if self.function is None:
+            return super().samples()
+        # {label values: value} for labelled gauges, a plain number otherwise
+        values = self.function()
+        if not isinstance(values, dict):
+            return [((), float(values))]
+        return [(tuple(str(v) for v in key), float(value)) for key, value in values.items()]
+
+
+class _HistogramValue:
+    def __init__(self, bounds):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+
+    def observe(self, value):
+        i = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def value(self):
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Timer:
+    """``with histogram.labels(...).time():`` observes the block's duration."""
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations (seconds, for latencies)."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+
+RETIRED_FILE = "retired.json"
+
+
+def _process_started(pid):
+    """Start time of ``pid`` in clock ticks since boot (Linux), or None if unknown."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return int(f.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _is_alive(snapshot):
+    try:
+        os.kill(snapshot["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # A recycled pid belongs to a process that started at another time
+    started = _process_started(snapshot["pid"])
+    return started is None or snapshot.get("started") in (None, started)
+
+
+class MetricsRegistry:
+    """The metrics of this process, optionally merged with other workers' snapshots."""
+
+    def __init__(self, snapshot_dir=None, snapshot_interval=5.0):
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_interval = snapshot_interval
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._snapshot_name = None
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def ensure_started(self):
+        # Start lazily, and again after a fork: threads do not survive fork().
+        if not self.snapshot_dir or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._snapshot_name = f"{self._pid}-{uuid.uuid4().hex}.json"
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            try:
+                self._retire_dead()
+            except OSError as e:
+                print(f"Metrics snapshot error: {e}")
+            self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+            self._thread.start()
+            atexit.register(self.write_snapshot)
+
+    def _run(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                print(f"Metrics snapshot error: {e}")
+
+    def _local_samples(self, include_shared=True):
+        collected = {}
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Gauge) and metric.shared and not include_shared:
+                continue
+            try:
+                collected[name] = metric.samples()
+            except Exception as e:
+                print(f"Metrics collect error ({name}): {e}")
+        return collected
+
+    def write_snapshot(self):
+        """Write this worker's values where the other workers' render() can read them."""
+        if not self.snapshot_dir or self._pid != os.getpid():
+            return
+        samples = {name: [[list(values), value] for values, value in rows]
+                   for name, rows in self._local_samples(include_shared=False).items()}
+        path = os.path.join(self.snapshot_dir, self._snapshot_name)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({"pid": self._pid, "started": _process_started(self._pid), "written_at": time.time(),
+                       "samples": samples}, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _snapshots(self):
+        """(file name, snapshot) of every other worker's file."""
+        for entry in os.listdir(self.snapshot_dir):
+            if not entry.endswith(".json") or entry in (self._snapshot_name, RETIRED_FILE):
+                continue
+            try:
+                with open(os.path.join(self.snapshot_dir, entry)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue  # being replaced, or not ours
+            if isinstance(snapshot, dict) and "pid" in snapshot and "samples" in snapshot:
+                yield entry, snapshot
+
+    def _merge(self, totals, samples, with_gauges):
+        for name, rows in samples.items():
+            metric = self._metrics.get(name)
+            if metric is None or (metric.kind == "gauge" and (metric.shared or not with_gauges)):
+                continue
+            merged = totals.setdefault(name, {})
+            for values, value in rows:
+                key = tuple(values)
+                if metric.kind == "histogram":
+                    counts, total = merged.get(key, ([0] * (len(metric.buckets) + 1), 0.0))
+                    if len(value[0]) == len(counts):
+                        merged[key] = ([a + b for a, b in zip(counts, value[0])], total + value[1])
+                else:
+                    merged[key] = merged.get(key, 0.0) + value
+
+    def _read_retired(self):
+        try:
+            with open(os.path.join(self.snapshot_dir, RETIRED_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"absorbed": [], "samples": {}}
+
+    def _retire_dead(self):
+        """Fold the files of exited workers into the retired totals and delete them."""
+        dead = [(entry, snapshot) for entry, snapshot in self._snapshots() if not _is_alive(snapshot)]
+        if not dead:
+            return
+        with open(os.path.join(self.snapshot_dir, "retired.lock"), "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            retired = self._read_retired()
+            # Names absorbed before a crash could delete their file are not counted twice
+            absorbed = set(retired["absorbed"])
+            present = set(os.listdir(self.snapshot_dir))
+            totals = {name: {tuple(values): value for values, value in rows}
+                      for name, rows in retired["samples"].items()}
+            for entry, snapshot in dead:
+                if entry in present and entry not in absorbed:
+                    self._merge(totals, snapshot["samples"], with_gauges=False)
+                    absorbed.add(entry)
+            samples = {name: [[list(values), value] for values, value in rows.items()]
+                       for name, rows in totals.items()}
+            path = os.path.join(self.snapshot_dir, RETIRED_FILE)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump({"absorbed": sorted(absorbed & present), "samples": samples}, f)
+            os.replace(f"{path}.tmp", path)
+            for entry, _ in dead:
+                try:
+                    os.remove(os.path.join(self.snapshot_dir, entry))
+                except FileNotFoundError:
+                    pass
+
+    def collect(self):
+        """{name: [(label values, value)]} for this process plus, with a snapshot dir, every other worker."""
+        collected = self._local_samples()
+        if not self.snapshot_dir or not os.path.isdir(self.snapshot_dir):
+            return collected
+        totals = {name: {values: value for values, value in rows} for name, rows in collected.items()}
+        try:
+            self._retire_dead()
+        except OSError as e:
+            print(f"Metrics snapshot error: {e}")
+        with open(os.path.join(self.snapshot_dir, "retired.lock"), "w") as lock:
+            # Not mid-retirement: a dead worker is counted in its file or in the retired totals, not both
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_SH)
+            retired = self._read_retired()
+            snapshots = list(self._snapshots())
+        self._merge(totals, retired["samples"], with_gauges=False)
+        absorbed = set(retired["absorbed"])
+        for entry, snapshot in snapshots:
+            if entry not in absorbed:
+                self._merge(totals, snapshot["samples"], with_gauges=_is_alive(snapshot))
+        return {name: sorted(rows.items()) for name, rows in totals.items()}
+
+    def render(self):
+        """All metrics in the Prometheus text format."""
+        lines = []
+        for name, rows in self.collect().items():
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for values, value in rows:
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{_label_text(metric.labelnames, values)} {_format_value(value)}")
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,), counts):
+                    cumulative += count
+                    le = ("le", _format_value(bound))
+                    lines.append(f"{name}_bucket{_label_text(metric.labelnames, values, le)} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(metric.labelnames, values)} {_format_value(total)}")
+                lines.append(f"{name}_count{_label_text(metric.labelnames, values)} {cumulative}")
+        return "\n".join(lines) + "\n"
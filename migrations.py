@@ -0,0 +1,521 @@
+"""
+Versioned schema migrations for PostgreSQL and SQLite.
+
+Each migration has a version number, a description and the steps for each
+backend (SQL strings, or callables taking a cursor for steps that need to
+inspect the schema first). Applied versions are recorded in
+``schema_migrations``; every migration runs in its own transaction, and
+concurrent runners are serialized (advisory lock on PostgreSQL,
+BEGIN IMMEDIATE on SQLite), so starting several workers at once is safe.
+
+Run at deploy time:
+    python migrations.py status
+    python migrations.py upgrade
+
+The app only checks the version on import and migrates if it is behind
+(unless DB_AUTO_MIGRATE=false).
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+
+Migration = namedtuple("Migration", "version description postgres sqlite transactional")
+Migration.__new__.__defaults__ = (True,)
+
+# Arbitrary constant for pg_advisory_lock
+ADVISORY_LOCK_ID = 4480211
+
+# Applied to every new SQLite connection (see SQLitePool). journal_mode=WAL is
+# persistent in the database file and set once by migration 7.
+SQLITE_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",     # safe with WAL; fsync at checkpoints, not every commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",      # 16 MB page cache per connection
+    "PRAGMA mmap_size=134217728",    # 128 MB memory-mapped reads
+)
+
+
+def add_column(table, column, definition):
+    """Step that adds ``column`` unless it exists (databases created by older init_db)."""
+    def step(c, backend):
+        if backend == "postgres":
+            c.execute("SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+                      (table, column))
+            exists = c.fetchone() is not None
+        else:
+            exists = column in [row[1] for row in c.execute(f"PRAGMA table_info({table})").fetchall()]
+        if not exists:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+
+CALL_SUMMARY_BACKFILL_SQL = """
+    UPDATE calls SET
+        turn_count = (SELECT COUNT(*) FROM transcripts t WHERE t.call_sid = calls.call_sid),
+        last_message = (SELECT message FROM transcripts t WHERE t.call_sid = calls.call_sid ORDER BY t.id DESC LIMIT 1)
+    WHERE turn_count = 0
+"""
+
+
+def epoch_backfill(table):
+    """Fill timestamp_ms from the local-time timestamp column."""
+    def step(c, backend):
+        if backend == "postgres":
+            c.execute(f"""
+                UPDATE {table} SET timestamp_ms = (EXTRACT(EPOCH FROM timestamp::timestamptz) * 1000)::BIGINT
+                WHERE timestamp_ms = 0 AND timestamp IS NOT NULL
+            """)
+        else:
+            c.execute(f"""
+                UPDATE {table}
+                SET timestamp_ms = COALESCE(CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER), 0)
+                WHERE timestamp_ms = 0 AND timestamp IS NOT NULL
+            """)
+    return step
+
+
+MIGRATIONS = [
+    Migration(1, "Baseline call, transcript, query and fraud tables",
+        postgres=[
+            """CREATE TABLE IF NOT EXISTS calls (
+                call_sid TEXT PRIMARY KEY,
+                from_number TEXT NOT NULL,
+                to_number TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                timestamp TIMESTAMP DEFAULT NOW(),
+                summary TEXT,
+                recording_url TEXT
+            )""",
+            """CREATE TABLE IF NOT EXISTS transcripts (
+                id SERIAL PRIMARY KEY,
+                call_sid TEXT NOT NULL REFERENCES calls(call_sid) ON DELETE CASCADE,
+                role TEXT NOT NULL,
+                message TEXT,
+                timestamp TIMESTAMP DEFAULT NOW()
+            )""",
+            """CREATE TABLE IF NOT EXISTS queries (
+                id SERIAL PRIMARY KEY,
+                timestamp TIMESTAMP DEFAULT NOW(),
+                user_name TEXT,
+                query TEXT,
+                status TEXT DEFAULT 'pending'
+            )""",
+            """CREATE TABLE IF NOT EXISTS suspicious_activity (
+                id SERIAL PRIMARY KEY,
+                call_sid TEXT,
+                phone_number TEXT,
+                reason TEXT,
+                timestamp TIMESTAMP DEFAULT NOW()
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_calls_timestamp ON calls(timestamp DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_transcripts_call_sid ON transcripts(call_sid)",
+        ],
+        sqlite=[
+            """CREATE TABLE IF NOT EXISTS calls
+               (call_sid TEXT PRIMARY KEY, from_number TEXT, to_number TEXT, direction TEXT, timestamp TEXT, summary TEXT, recording_url TEXT)""",
+            """CREATE TABLE IF NOT EXISTS transcripts
+               (id INTEGER PRIMARY KEY AUTOINCREMENT, call_sid TEXT, role TEXT, message TEXT, timestamp TEXT)""",
+            """CREATE TABLE IF NOT EXISTS queries
+               (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, user TEXT, query TEXT, status TEXT)""",
+            """CREATE TABLE IF NOT EXISTS suspicious_activity
+               (id INTEGER PRIMARY KEY AUTOINCREMENT, call_sid TEXT, phone_number TEXT, reason TEXT, timestamp TEXT)""",
+        ]),
+
+    Migration(2, "Server-side conversation state and answer cache",
+        postgres=[
+            """CREATE TABLE IF NOT EXISTS conversations (
+                call_sid TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                updated_at DOUBLE PRECISION NOT NULL
+            )""",
+            """CREATE TABLE IF NOT EXISTS answer_cache (
+                cache_key TEXT PRIMARY KEY,
+                lang_id TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                created_at DOUBLE PRECISION NOT NULL
+            )""",
+        ],
+        sqlite=[
+            """CREATE TABLE IF NOT EXISTS conversations
+               (call_sid TEXT PRIMARY KEY, version INTEGER NOT NULL, state TEXT NOT NULL, updated_at REAL NOT NULL)""",
+            """CREATE TABLE IF NOT EXISTS answer_cache
+               (cache_key TEXT PRIMARY KEY, lang_id TEXT NOT NULL, answer TEXT NOT NULL, created_at REAL NOT NULL)""",
+        ]),
+
+    Migration(3, "Outbound batches and campaigns",
+        postgres=[
+            """CREATE TABLE IF NOT EXISTS outbound_batches (
+                batch_id TEXT PRIMARY KEY,
+                webhook_url TEXT,
+                total INTEGER NOT NULL,
+                created_at DOUBLE PRECISION NOT NULL
+            )""",
+            """CREATE TABLE IF NOT EXISTS outbound_batch_calls (
+                batch_id TEXT NOT NULL REFERENCES outbound_batches(batch_id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                to_number TEXT NOT NULL,
+                status TEXT NOT NULL,
+                call_sid TEXT,
+                error TEXT,
+                updated_at DOUBLE PRECISION NOT NULL,
+                PRIMARY KEY (batch_id, position)
+            )""",
+            """CREATE TABLE IF NOT EXISTS campaigns (
+                campaign_id TEXT PRIMARY KEY,
+                name TEXT,
+                webhook_url TEXT NOT NULL,
+                status_callback TEXT,
+                status TEXT NOT NULL,
+                window_start TEXT NOT NULL,
+                window_end TEXT NOT NULL,
+                timezone TEXT NOT NULL,
+                max_concurrent INTEGER NOT NULL,
+                max_attempts INTEGER NOT NULL,
+                retry_delay DOUBLE PRECISION NOT NULL,
+                total INTEGER NOT NULL,
+                created_at DOUBLE PRECISION NOT NULL,
+                lease_owner TEXT,
+                lease_until DOUBLE PRECISION
+            )""",
+            """CREATE TABLE IF NOT EXISTS campaign_numbers (
+                campaign_id TEXT NOT NULL REFERENCES campaigns(campaign_id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                to_number TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                next_attempt_at DOUBLE PRECISION NOT NULL,
+                call_sid TEXT,
+                last_result TEXT,
+                updated_at DOUBLE PRECISION NOT NULL,
+                PRIMARY KEY (campaign_id, position)
+            )""",
+            """CREATE TABLE IF NOT EXISTS campaign_attempts (
+                call_sid TEXT PRIMARY KEY,
+                campaign_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                attempt INTEGER NOT NULL,
+                started_at DOUBLE PRECISION NOT NULL,
+                ended_at DOUBLE PRECISION,
+                result TEXT
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_campaign_numbers_due ON campaign_numbers(campaign_id, status, next_attempt_at)",
+        ],
+        sqlite=[
+            """CREATE TABLE IF NOT EXISTS outbound_batches
+               (batch_id TEXT PRIMARY KEY, webhook_url TEXT, total INTEGER NOT NULL, created_at REAL NOT NULL)""",
+            """CREATE TABLE IF NOT EXISTS outbound_batch_calls
+               (batch_id TEXT NOT NULL, position INTEGER NOT NULL, to_number TEXT NOT NULL, status TEXT NOT NULL, call_sid TEXT, error TEXT, updated_at REAL NOT NULL, PRIMARY KEY (batch_id, position))""",
+            """CREATE TABLE IF NOT EXISTS campaigns
+               (campaign_id TEXT PRIMARY KEY, name TEXT, webhook_url TEXT NOT NULL, status_callback TEXT, status TEXT NOT NULL, window_start TEXT NOT NULL, window_end TEXT NOT NULL, timezone TEXT NOT NULL, max_concurrent INTEGER NOT NULL, max_attempts INTEGER NOT NULL, retry_delay REAL NOT NULL, total INTEGER NOT NULL, created_at REAL NOT NULL, lease_owner TEXT, lease_until REAL)""",
+            """CREATE TABLE IF NOT EXISTS campaign_numbers
+               (campaign_id TEXT NOT NULL, position INTEGER NOT NULL, to_number TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, next_attempt_at REAL NOT NULL, call_sid TEXT, last_result TEXT, updated_at REAL NOT NULL, PRIMARY KEY (campaign_id, position))""",
+            """CREATE TABLE IF NOT EXISTS campaign_attempts
+               (call_sid TEXT PRIMARY KEY, campaign_id TEXT NOT NULL, position INTEGER NOT NULL, attempt INTEGER NOT NULL, started_at REAL NOT NULL, ended_at REAL, result TEXT)""",
+            "CREATE INDEX IF NOT EXISTS idx_campaign_numbers_due ON campaign_numbers(campaign_id, status, next_attempt_at)",
+        ]),
+
+    Migration(4, "Denormalized last_message / turn_count on calls",
+        postgres=[
+            add_column("calls", "last_message", "TEXT"),
+            add_column("calls", "turn_count", "INTEGER NOT NULL DEFAULT 0"),
+            CALL_SUMMARY_BACKFILL_SQL,
+        ],
+        sqlite=[
+            add_column("calls", "last_message", "TEXT"),
+            add_column("calls", "turn_count", "INTEGER NOT NULL DEFAULT 0"),
+            # Without it the backfill's per-call subqueries scan all transcripts for every call
+            "CREATE INDEX IF NOT EXISTS idx_transcripts_call_sid ON transcripts(call_sid)",
+            CALL_SUMMARY_BACKFILL_SQL,
+        ]),
+
+    Migration(5, "Integer epoch (ms) timestamps on event tables",
+        postgres=[
+            add_column("calls", "timestamp_ms", "BIGINT NOT NULL DEFAULT 0"),
+            add_column("transcripts", "timestamp_ms", "BIGINT NOT NULL DEFAULT 0"),
+            add_column("suspicious_activity", "timestamp_ms", "BIGINT NOT NULL DEFAULT 0"),
+            epoch_backfill("calls"),
+            epoch_backfill("transcripts"),
+            epoch_backfill("suspicious_activity"),
+        ],
+        sqlite=[
+            add_column("calls", "timestamp_ms", "INTEGER NOT NULL DEFAULT 0"),
+            add_column("transcripts", "timestamp_ms", "INTEGER NOT NULL DEFAULT 0"),
+            add_column("suspicious_activity", "timestamp_ms", "INTEGER NOT NULL DEFAULT 0"),
+            epoch_backfill("calls"),
+            epoch_backfill("transcripts"),
+            epoch_backfill("suspicious_activity"),
+        ]),
+
+    Migration(6, "Indexes for call list, export and fraud lookups",
+        postgres=[
+            # Text-timestamp keyset indexes created by earlier init_db versions
+            "DROP INDEX IF EXISTS idx_calls_timestamp_sid",
+            "DROP INDEX IF EXISTS idx_calls_direction_timestamp",
+            "DROP INDEX IF EXISTS idx_calls_from_timestamp",
+            "DROP INDEX IF EXISTS idx_calls_to_timestamp",
+            "CREATE INDEX IF NOT EXISTS idx_calls_ts_sid ON calls(timestamp_ms DESC, call_sid DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_calls_direction_ts ON calls(direction, timestamp_ms DESC, call_sid DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_calls_from_ts ON calls(from_number, timestamp_ms DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_calls_to_ts ON calls(to_number, timestamp_ms DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_suspicious_call_sid ON suspicious_activity(call_sid)",
+            "CREATE INDEX IF NOT EXISTS idx_suspicious_ts ON suspicious_activity(timestamp_ms DESC)",
+        ],
+        sqlite=[
+            "DROP INDEX IF EXISTS idx_calls_timestamp_sid",
+            "DROP INDEX IF EXISTS idx_calls_direction_timestamp",
+            "DROP INDEX IF EXISTS idx_calls_from_timestamp",
+            "DROP INDEX IF EXISTS idx_calls_to_timestamp",
+            # SQLite walks these backwards for DESC
+            "CREATE INDEX IF NOT EXISTS idx_calls_ts_sid ON calls(timestamp_ms, call_sid)",
+            "CREATE INDEX IF NOT EXISTS idx_calls_direction_ts ON calls(direction, timestamp_ms, call_sid)",
+            "CREATE INDEX IF NOT EXISTS idx_calls_from_ts ON calls(from_number, timestamp_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_calls_to_ts ON calls(to_number, timestamp_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_suspicious_call_sid ON suspicious_activity(call_sid)",
+            "CREATE INDEX IF NOT EXISTS idx_suspicious_ts ON suspicious_activity(timestamp_ms)",
+            "ANALYZE",
+        ]),
+
+    Migration(7, "SQLite write-ahead log",
+        postgres=[],
+        # WAL lets readers run alongside the writer instead of failing with
+        # "database is locked"; the setting is stored in the database file.
+        sqlite=["PRAGMA journal_mode=WAL"],
+        transactional=False),
+
+    Migration(8, "Live event feed",
+        postgres=[
+            """CREATE TABLE IF NOT EXISTS live_events (
+                id BIGSERIAL PRIMARY KEY,
+                kind TEXT NOT NULL,
+                call_sid TEXT,
+                payload TEXT NOT NULL,
+                created_ms BIGINT NOT NULL
+            )""",
+        ],
+        sqlite=[
+            # AUTOINCREMENT: ids are never reused after pruning, so Last-Event-ID stays meaningful
+            """CREATE TABLE IF NOT EXISTS live_events
+               (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, call_sid TEXT, payload TEXT NOT NULL, created_ms INTEGER NOT NULL)""",
+        ]),
+
+    Migration(9, "Per-turn latency breakdown",
+        postgres=[
+            """CREATE TABLE IF NOT EXISTS turn_latencies (
+                id BIGSERIAL PRIMARY KEY,
+                call_sid TEXT NOT NULL,
+                turn INTEGER NOT NULL,
+                lang_id TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                db_ms REAL NOT NULL,
+                groq_ms REAL NOT NULL,
+                post_ms REAL NOT NULL,
+                twiml_ms REAL NOT NULL,
+                total_ms REAL NOT NULL,
+                day TEXT NOT NULL,
+                created_ms BIGINT NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_turn_latencies_day ON turn_latencies(day, lang_id)",
+            "CREATE INDEX IF NOT EXISTS idx_turn_latencies_call_sid ON turn_latencies(call_sid)",
+        ],
+        sqlite=[
+            """CREATE TABLE IF NOT EXISTS turn_latencies
+               (id INTEGER PRIMARY KEY AUTOINCREMENT, call_sid TEXT NOT NULL, turn INTEGER NOT NULL, lang_id TEXT NOT NULL, mode TEXT NOT NULL, db_ms REAL NOT NULL, groq_ms REAL NOT NULL, post_ms REAL NOT NULL, twiml_ms REAL NOT NULL, total_ms REAL NOT NULL, day TEXT NOT NULL, created_ms INTEGER NOT NULL)""",
+            "CREATE INDEX IF NOT EXISTS idx_turn_latencies_day ON turn_latencies(day, lang_id)",
+            "CREATE INDEX IF NOT EXISTS idx_turn_latencies_call_sid ON turn_latencies(call_sid)",
+        ]),
+
+    Migration(10, "Which LLM path served each turn",
+        # primary / hedged / fast / stream / cache / timeout / error (see llm_budget.py)
+        postgres=[add_column("turn_latencies", "llm_path", "TEXT")],
+        sqlite=[add_column("turn_latencies", "llm_path", "TEXT")]),
+
+    Migration(11, "Model, routing reason and token counts per turn",
+        postgres=[
+            add_column("turn_latencies", "model", "TEXT"),
+            add_column("turn_latencies", "route", "TEXT"),
+            add_column("turn_latencies", "prompt_tokens", "INTEGER"),
+            add_column("turn_latencies", "completion_tokens", "INTEGER"),
+        ],
+        sqlite=[
+            add_column("turn_latencies", "model", "TEXT"),
+            add_column("turn_latencies", "route", "TEXT"),
+            add_column("turn_latencies", "prompt_tokens", "INTEGER"),
+            add_column("turn_latencies", "completion_tokens", "INTEGER"),
+        ]),
+
+    Migration(12, "Outbox for Google Sheets sync of submitted queries",
+        postgres=[
+            """CREATE TABLE IF NOT EXISTS sheets_outbox (
+                id BIGSERIAL PRIMARY KEY,
+                query_id INTEGER,
+                row_values TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_ms BIGINT NOT NULL,
+                claimed_by TEXT,
+                claimed_until_ms BIGINT,
+                last_error TEXT,
+                created_ms BIGINT NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_sheets_outbox_due ON sheets_outbox(next_attempt_ms, id) WHERE status = 'pending'",
+            "CREATE INDEX IF NOT EXISTS idx_sheets_outbox_claim ON sheets_outbox(claimed_by)",
+        ],
+        sqlite=[
+            """CREATE TABLE IF NOT EXISTS sheets_outbox
+               (id INTEGER PRIMARY KEY AUTOINCREMENT, query_id INTEGER, row_values TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_ms INTEGER NOT NULL, claimed_by TEXT, claimed_until_ms INTEGER, last_error TEXT,
+                created_ms INTEGER NOT NULL)""",
+            "CREATE INDEX IF NOT EXISTS idx_sheets_outbox_due ON sheets_outbox(next_attempt_ms, id) WHERE status = 'pending'",
+            "CREATE INDEX IF NOT EXISTS idx_sheets_outbox_claim ON sheets_outbox(claimed_by)",
+        ]),
+
+    Migration(13, "Campaign status callbacks that arrive before the dial is recorded",
+        postgres=[
+            """CREATE TABLE IF NOT EXISTS campaign_early_callbacks (
+                call_sid TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                received_at DOUBLE PRECISION NOT NULL
+            )""",
+        ],
+        sqlite=[
+            """CREATE TABLE IF NOT EXISTS campaign_early_callbacks
+               (call_sid TEXT PRIMARY KEY, result TEXT NOT NULL, received_at REAL NOT NULL)""",
+        ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _ensure_table(c, backend):
+    applied_at = "DOUBLE PRECISION" if backend == "postgres" else "REAL"
+    c.execute(f"""CREATE TABLE IF NOT EXISTS schema_migrations
+                  (version INTEGER PRIMARY KEY, description TEXT, applied_at {applied_at} NOT NULL)""")
+
+
+def current_version(conn, backend):
+    """Highest applied version, or 0 for a database that has never been migrated."""
+    c = conn.cursor()
+    if backend == "postgres":
+        c.execute("SELECT to_regclass('schema_migrations')")
+        exists = c.fetchone()[0] is not None
+    else:
+        c.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'")
+        exists = c.fetchone() is not None
+    if not exists:
+        return 0
+    c.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    version = c.fetchone()[0]
+    conn.commit()
+    return version
+
+
+def _apply(conn, backend, migration):
+    """Apply one migration unless another runner got there first. Returns seconds taken, or None."""
+    p = "%s" if backend == "postgres" else "?"
+    c = conn.cursor()
+    start = time.perf_counter()
+    if backend == "sqlite" and migration.transactional:
+        c.execute("BEGIN IMMEDIATE")
+    c.execute(f"SELECT 1 FROM schema_migrations WHERE version = {p}", (migration.version,))
+    if c.fetchone():
+        conn.rollback()
+        return None
+    if backend == "sqlite" and not migration.transactional:
+        conn.commit()
+    for step in getattr(migration, backend):
+        if callable(step):
+            step(c, backend)
+        else:
+            c.execute(step)
+    c.execute(f"INSERT INTO schema_migrations (version, description, applied_at) VALUES ({p}, {p}, {p})",
+              (migration.version, migration.description, time.time()))
+    conn.commit()
+    return time.perf_counter() - start
+
+
+def upgrade(get_connection, backend, target=None, log=print):
+    """Apply every migration above the current version (up to ``target``). Returns applied versions."""
+    target = LATEST_VERSION if target is None else target
+    applied = []
+    with get_connection() as conn:
+        c = conn.cursor()
+        _ensure_table(c, backend)
+        conn.commit()
+        if backend == "postgres":
+            c.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_ID,))
+        try:
+            for migration in MIGRATIONS:
+                if migration.version > target or migration.version <= current_version(conn, backend):
+                    continue
+                elapsed = _apply(conn, backend, migration)
+                if elapsed is not None:
+                    applied.append(migration.version)
+                    log(f"Applied migration {migration.version}: {migration.description} ({elapsed:.2f}s)")
+        finally:
+            if backend == "postgres":
+                c.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_ID,))
+                conn.commit()
+    return applied
+
+
+def connect_from_env():
+    """(get_connection, backend) using the same environment variables as app.py."""
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+    if os.environ.get("DB_TYPE", "sqlite").lower() == "postgres":
+        import psycopg2
+        params = dict(
+            host=os.environ.get("DB_HOST", "localhost"),
+            port=int(os.environ.get("DB_PORT", 5432)),
+            user=os.environ.get("DB_USER", "hack4delhi_user"),
+            password=os.environ.get("DB_PASSWORD", ""),
+            database=os.environ.get("DB_NAME", "hack4delhi_db"),
+        )
+        return (lambda: _Closing(psycopg2.connect(**params))), "postgres"
+    import sqlite3
+    return (lambda: _Closing(sqlite3.connect("voice_agent.db", timeout=30))), "sqlite"
+
+
+class _Closing:
+    """Context manager that closes a raw DB-API connection (pooled ones are released instead)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.conn.rollback()
+        self.conn.close()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    args = parser.parse_args()
+
+    get_connection, backend = connect_from_env()
+    with get_connection() as conn:
+        version = current_version(conn, backend)
+    print(f"{backend}: schema version {version}, latest {LATEST_VERSION}")
+    if args.command == "status":
+        for migration in MIGRATIONS:
+            mark = "applied" if migration.version <= version else "pending"
+            print(f"  {migration.version:>3}  {mark:<8} {migration.description}")
+        return 0 if version >= LATEST_VERSION else 1
+    applied = upgrade(get_connection, backend, target=args.target)
+    print(f"Applied {len(applied)} migration(s)" if applied else "Nothing to do")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Routes each voice turn to a small or a large model.
+
+A few cheap features decide. Conversational turns ("hello", "haan ji",
+"repeat that", "dhanyavad") and other short turns without a scheme,
+eligibility, document, money or how-to word go to the small model. Anything
+with such a keyword, and anything longer than ``max_simple_words``, stays on
+the large one. Words are matched per language (the ``code`` in LANG_CONFIG)
+plus English, which callers mix in. A decision is a few set lookups.
+"""
+
+import threading
+
+PUNCTUATION = ".,!?।|'\"-:;()"
+
+SIMPLE_PHRASES = {
+    'en-IN': [
+        "hello", "hi", "hey", "yes", "yeah", "no", "ok", "okay", "right", "sure", "fine", "hmm",
+        "thank you", "thanks", "bye", "goodbye", "sorry", "pardon", "what", "got it", "i see",
+        "repeat", "repeat that", "please repeat", "say that again", "one more time", "can you repeat",
+        "are you there", "can you hear me", "good morning", "good evening", "that's all", "nothing else",
+    ],
+    'hi-IN': [
+        "haan", "han", "ha", "ji", "haan ji", "ji haan", "nahi", "nahin", "theek hai", "thik hai", "achha",
+        "accha", "dhanyavad", "dhanyawad", "shukriya", "namaste", "namaskar", "phir se", "dobara",
+        "dobara boliye", "phir se boliye", "suniye", "hello", "ok", "bas", "bas itna hi",
+        "हाँ", "हां", "जी", "हाँ जी", "नहीं", "ठीक है", "अच्छा", "धन्यवाद", "शुक्रिया", "नमस्ते",
+        "नमस्कार", "फिर से", "दोबारा", "दोबारा बोलिए", "सुनिए", "बस", "हेलो",
+    ],
+}
+
+COMPLEX_KEYWORDS = {
+    'en-IN': [
+        "scheme", "yojana", "eligible", "eligibility", "qualify", "apply", "application", "document",
+        "documents", "card", "aadhaar", "aadhar", "pension", "subsidy", "loan", "kisan", "ayushman",
+        "awas", "pmay", "ration", "installment", "instalment", "money", "rupees", "amount", "register",
+        "registration", "status", "form", "certificate", "income", "ujjwala", "mudra", "insurance",
+        "scholarship", "benefit", "benefits", "fraud", "otp", "bank", "account", "refund", "complaint",
+        "how", "why", "when", "where", "which", "who",
+    ],
+    'hi-IN': [
+        "yojana", "yojna", "patrata", "patra", "aavedan", "avedan", "dastavez", "dastavej", "kagaz",
+        "card", "aadhaar", "aadhar", "pension", "subsidy", "loan", "kisan", "ayushman", "awas", "ration",
+        "kist", "kisht", "paisa", "paise", "rupaye", "rupay", "panjikaran", "sthiti", "form", "praman",
+        "aay", "bima", "chhatravritti", "labh", "khata", "bank", "shikayat", "dhokha",
+        "kaise", "kyon", "kyun", "kab", "kahan", "kitna", "kitne", "kaun", "kaunsa",
+        "योजना", "पात्र", "पात्रता", "आवेदन", "दस्तावेज", "कागज", "कार्ड", "आधार", "पेंशन", "सब्सिडी",
+        "लोन", "ऋण", "किसान", "आयुष्मान", "आवास", "राशन", "किस्त", "पैसे", "पैसा", "रुपये", "पंजीकरण",
+        "स्थिति", "फॉर्म", "प्रमाण", "आय", "बीमा", "छात्रवृत्ति", "लाभ", "खाता", "बैंक", "शिकायत",
+        "धोखा", "कैसे", "क्यों", "कब", "कहाँ", "कहां", "कितना", "कितने", "कौन", "कौनसा",
+    ],
+}
+
+
+def words(text):
+    return [word.strip(PUNCTUATION) for word in text.lower().split() if word.strip(PUNCTUATION)]
+
+
+class ModelRouter:
+    """Chooses ``small_model`` or ``large_model`` for a turn and counts the decisions."""
+
+    def __init__(self, small_model, large_model, max_simple_words=4, extra_simple=(), extra_complex=(),
+                 enabled=True):
+        self.small_model = small_model
+        self.large_model = large_model
+        self.max_simple_words = max_simple_words
+        self.enabled = enabled
+        english_phrases, english_keywords = SIMPLE_PHRASES['en-IN'], COMPLEX_KEYWORDS['en-IN']
+        self._phrases, self._simple_words, self._keywords = {}, {}, {}
+        for code in set(SIMPLE_PHRASES) | set(COMPLEX_KEYWORDS):
+            phrases = {' '.join(words(p)) for p in SIMPLE_PHRASES.get(code, []) + english_phrases + list(extra_simple)}
+            self._phrases[code] = phrases
+            self._simple_words[code] = {word for phrase in phrases for word in phrase.split()}
+            self._keywords[code] = {k.lower() for k in COMPLEX_KEYWORDS.get(code, []) + english_keywords
+                                    + list(extra_complex)}
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def classify(self, text, language='en-IN'):
+        """(model, reason); reason is conversational, keyword, length or short."""
+        tokens = words(text or '')
+        code = language if language in self._keywords else 'en-IN'
+        keywords = self._keywords[code]
+        if ' '.join(tokens) in self._phrases[code] or (
+                tokens and len(tokens) <= self.max_simple_words * 2
+                and all(token in self._simple_words[code] for token in tokens)):
+            return self.small_model, 'conversational'
+        if any(token in keywords or token.rstrip('s') in keywords for token in tokens):
+            return self.large_model, 'keyword'
+        if len(tokens) > self.max_simple_words:
+            return self.large_model, 'length'
+        return self.small_model, 'short'
+
+    def route(self, text, language='en-IN'):
+        """classify(), or the large model when routing is off; the decision is counted."""
+        model, reason = self.classify(text, language) if self.enabled else (self.large_model, 'disabled')
+        with self._lock:
+            self._counts[(model, reason)] = self._counts.get((model, reason), 0) + 1
+        return model, reason
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "enabled": self.enabled,
+            "small_model": self.small_model,
+            "large_model": self.large_model,
+            "max_simple_words": self.max_simple_words,
+            "decisions": [{"model": model, "reason": reason, "turns": turns}
+                          for (model, reason), turns in sorted(counts.items())],
+        }
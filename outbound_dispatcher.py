@@ -0,0 +1,122 @@
+"""
+Parallel, rate-limited dispatch of outbound calls.
+
+A TokenBucket caps calls.create requests at the account's calls-per-second
+allowance, and a bounded thread pool overlaps the HTTP round trips. Each
+dialed number is reported through ``record_result`` so batch progress can be
+persisted and served by any worker.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, up to ``capacity`` banked."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Take one token, sleeping until one is available. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class OutboundDispatcher:
+    """Dials numbers concurrently under a shared rate limit.
+
+    ``place_call(number, payload)`` must return the Twilio call SID or raise.
+    ``record_result(batch_id, position, number, status, call_sid, error)`` is
+    called once per number with status ``initiated`` or ``failed``.
+    Rate-limit responses (HTTP 429) are retried with backoff.
+    """
+
+    def __init__(self, place_call, record_result, calls_per_second=1.0, workers=8, burst=1,
+                 max_retries=3):
+        self.place_call = place_call
+        self.record_result = record_result
+        self.bucket = TokenBucket(calls_per_second, burst)
+        self.workers = workers
+        self.max_retries = max_retries
+        self._executor = None
+        self._lock = threading.Lock()
+        self.counters = {"queued": 0, "initiated": 0, "failed": 0, "retried": 0, "in_flight": 0}
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dialer")
+            return self._executor
+
+    def submit(self, numbers, payload, batch_id=None):
+        """Queue every number for dialing and return the batch id immediately."""
+        batch_id = batch_id or uuid.uuid4().hex
+        pool = self._pool()
+        with self._lock:
+            self.counters["queued"] += len(numbers)
+        for position, number in enumerate(numbers):
+            pool.submit(self._dial, batch_id, position, number, payload)
+        return batch_id
+
+    def _dial(self, batch_id, position, number, payload):
+        with self._lock:
+            self.counters["in_flight"] += 1
+        try:
+            delay = 1.0
+            for attempt in range(self.max_retries + 1):
+                self.bucket.acquire()
+                try:
+                    call_sid = self.place_call(number, payload)
+                except Exception as e:
+                    if getattr(e, 'status', None) == 429 and attempt < self.max_retries:
+                        with self._lock:
+                            self.counters["retried"] += 1
+                        time.sleep(delay)
+                        delay *= 2
+                        continue
+                    print(f"Failed to call {number}: {e}")
+                    with self._lock:
+                        self.counters["failed"] += 1
+                    self._safe_record(batch_id, position, number, 'failed', None, str(e))
+                    return
+                with self._lock:
+                    self.counters["initiated"] += 1
+                self._safe_record(batch_id, position, number, 'initiated', call_sid, None)
+                return
+        finally:
+            with self._lock:
+                self.counters["in_flight"] -= 1
+
+    def _safe_record(self, *args):
+        try:
+            self.record_result(*args)
+        except Exception as e:
+            print(f"DB Error (Outbound Batch): {e}")
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+        data["calls_per_second"] = self.bucket.rate
+        data["workers"] = self.workers
+        return data
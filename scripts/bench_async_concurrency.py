@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent in-flight calls one process handles, sync Flask vs async.
+
+Starts the fake Groq server (scripts/fake_groq.py) with a fixed latency, then
+one gunicorn process per mode against a throwaway SQLite database:
+
+    sync   gunicorn -w 1 -k gthread --threads N app:app
+    async  gunicorn -w 1 -k aiohttp.GunicornWebWorker async_app:app
+
+First it replays a scripted call (language menu, questions, silences, an
+invalid key, a wrong method) against both and checks the TwiML is identical.
+Then, per --concurrency level, that many calls pick a language and ask a
+question at the same moment, --rounds times. It reports /handle-input
+latency, the turns answered within Twilio's 15 s webhook timeout, and the
+peak number of Groq requests the fake saw at once: the calls the process
+actually had in flight.
+
+Usage:
+    python scripts/bench_async_concurrency.py --concurrency 16,64,256 --threads 16 --groq-latency-ms 1000
+"""
+
+import argparse
+import asyncio
+import time
+from argparse import Namespace
+
+import aiohttp
+
+from fake_groq import FakeGroqServer, REPLY_MARKER
+from fake_twilio import FakeTwilioServer
+from load_test import TWILIO_TIMEOUT, percentile, start_app, stop_app
+
+SCRIPT = [
+    ("POST", "/voice?custom_message=Namaste%20from%20the%20helpline", {}),
+    ("POST", "/set-language", {"Digits": "7"}),
+    ("GET", "/set-language", {}),
+    ("POST", "/set-language", {"Digits": "1"}),
+    ("POST", "/handle-input", {"SpeechResult": "PM kisan ki agli kist kab aayegi"}),
+    ("POST", "/listen", {}),
+    ("POST", "/handle-input", {}),
+    ("POST", "/handle-input", {"SpeechResult": "Iske liye kaun se documents chahiye"}),
+    ("GET", "/continue-response", {}),
+    ("POST", "/set-language", {"Digits": "2"}),
+    ("POST", "/handle-input", {"SpeechResult": "How do I apply for PM Awas Yojana"}),
+]
+
+
+async def replay(session, base_url):
+    transcript = []
+    for method, path, data in SCRIPT:
+        form = dict(data, CallSid="CAPARITY0001", From="+919800000001", To="+911800110001")
+        async with session.request(method, base_url + path, data=form) as response:
+            transcript.append((method, path, response.status, await response.text()))
+    return transcript
+
+
+async def replay_script(base_url):
+    async with aiohttp.ClientSession() as session:
+        return await replay(session, base_url)
+
+
+async def one_call(session, base_url, call_sid, question, start):
+    form = {"CallSid": call_sid, "From": "+919800000000", "To": "+911800110001"}
+    timeout = aiohttp.ClientTimeout(total=TWILIO_TIMEOUT)
+    try:
+        async with session.post(f"{base_url}/set-language", data=dict(form, Digits="1"), timeout=timeout) as response:
+            await response.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass  # the turn then gets the default language
+    await start.wait()
+    started = time.perf_counter()
+    try:
+        async with session.post(f"{base_url}/handle-input", data=dict(form, SpeechResult=question),
+                                timeout=timeout) as response:
+            body = await response.text()
+        # A streamed turn speaks its first sentence and continues at /continue-response
+        answered = response.status == 200 and (REPLY_MARKER in body or "/continue-response" in body)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        answered = False
+    return (time.perf_counter() - started) * 1000, answered
+
+
+async def burst(base_url, concurrency, rounds, tag):
+    """Latencies (ms) and answered count for ``rounds`` bursts of ``concurrency`` simultaneous turns."""
+    latencies, answered = [], 0
+    # A connection per request, as Twilio's webhooks arrive
+    connector = aiohttp.TCPConnector(limit=0, force_close=True)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for r in range(rounds):
+            start = asyncio.Event()
+            # A new question per round and call, so the answer cache does not short-cut Groq
+            calls = [asyncio.ensure_future(one_call(session, base_url, f"CA{tag}{r:02d}{n:05d}",
+                                                    f"Scheme question {tag} {r} {n}", start))
+                     for n in range(concurrency)]
+            await asyncio.sleep(0.5 + concurrency / 200)  # every call has picked its language
+            start.set()
+            for ms, ok in await asyncio.gather(*calls):
+                latencies.append(ms)
+                answered += ok
+    return latencies, answered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="16,64,256", help="comma-separated simultaneous calls")
+    parser.add_argument("--rounds", type=int, default=3, help="bursts per concurrency level")
+    parser.add_argument("--threads", type=int, default=16, help="gthread threads of the sync process")
+    parser.add_argument("--groq-latency-ms", type=float, default=1000.0)
+    parser.add_argument("--port", type=int, default=8795)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE")
+    args = parser.parse_args()
+    levels = [int(n) for n in args.concurrency.split(",") if n.strip()]
+
+    groq = FakeGroqServer(latency_ms=args.groq_latency_ms).start()
+    twilio = FakeTwilioServer().start()
+    app_env = ["ANSWER_CACHE_ENABLED=false", "DB_POOL_MAX=10", "CALLER_GUARD_ENABLED=false"] + args.app_env
+    results, transcripts = {}, {}
+    try:
+        for mode in ("sync", "async"):
+            proc, base_url, _ = start_app(Namespace(
+                server=mode, workers=1, threads=args.threads, port=args.port, app_env=app_env), groq, twilio)
+            try:
+                transcripts[mode] = asyncio.run(replay_script(base_url))
+                for concurrency in levels:
+                    groq.counters["peak_in_flight"] = 0
+                    latencies, answered = asyncio.run(burst(base_url, concurrency, args.rounds, mode[0].upper()))
+                    results[mode, concurrency] = (latencies, answered, groq.counters["peak_in_flight"])
+            finally:
+                stop_app(proc)
+    finally:
+        groq.stop()
+        twilio.stop()
+
+    same = transcripts["sync"] == transcripts["async"]
+    print(f"TwiML parity over {len(SCRIPT)} scripted requests: {'identical' if same else 'DIFFERENT'}")
+    if not same:
+        for sync_step, async_step in zip(transcripts["sync"], transcripts["async"]):
+            if sync_step != async_step:
+                print(f"  sync:  {sync_step}\n  async: {async_step}")
+
+    print(f"\nGroq latency {args.groq_latency_ms:g} ms, one process each; sync = gthread --threads {args.threads}")
+    print(f"{'mode':<7}{'calls':>7}{'answered':>10}{'peak Groq':>11}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for concurrency in levels:
+        for mode in ("sync", "async"):
+            latencies, answered, peak = results[mode, concurrency]
+            print(f"{mode:<7}{concurrency:>7}{answered / len(latencies):>10.0%}{peak:>11}"
+                  f"{percentile(latencies, 50):>10.0f}{percentile(latencies, 95):>10.0f}{max(latencies):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the caller guard at /voice (caller_guard.py).
+
+Drives /voice through the Flask test client and reports:
+  - a number calling --repeat times in a row: calls admitted and rejected,
+    rows written to ``calls`` for each, and /voice latency for both,
+  - a number flagged in suspicious_activity BLOCK_AFTER_FLAGS times: its
+    next call is rejected,
+  - two workers sharing the database (CALLER_GUARD_STORE=db): calls admitted
+    by one count against the limit in the other after a sync,
+  - CallerGuard.check cost with --callers distinct numbers tracked.
+
+Usage:
+    python scripts/bench_caller_guard.py --repeat 50 --callers 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from caller_guard import CallerGuard, SQLCallerGuardBackend  # noqa: E402
+from load_test import percentile  # noqa: E402
+
+
+def call_rows(app_module, number):
+    app_module.write_behind.flush()
+    with app_module.get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT COUNT(*) FROM calls WHERE from_number = ?", (number,))
+        return c.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="calls from one number")
+    parser.add_argument("--callers", type=int, default=100000, help="distinct numbers for the check() timing")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_caller_guard_"))
+    os.environ.update({"GROQ_API_KEY": "bench", "DB_TYPE": "sqlite", "CAMPAIGN_SCHEDULER_ENABLED": "false",
+                       "CALLER_GUARD_ENABLED": "true", "CALLER_GUARD_STORE": "memory"})
+    import app as app_module
+
+    guard = app_module.caller_guard
+    client = app_module.app.test_client()
+    number = "+919812345678"
+    admitted, rejected = [], []
+    for i in range(args.repeat):
+        started = time.perf_counter()
+        body = client.post("/voice", data={"CallSid": f"CAREPEAT{i:05d}", "From": number,
+                                           "To": "+911800110001"}).get_data(as_text=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        (rejected if "<Reject" in body else admitted).append(elapsed)
+    print(f"One number calling {args.repeat} times (limit {guard.caller_calls} per {guard._callers.window:.0f}s): "
+          f"{len(admitted)} admitted, {len(rejected)} rejected, {call_rows(app_module, number)} rows in calls")
+    print(f"{'/voice':<12}{'calls':>7}{'p50 ms':>9}{'p99 ms':>9}")
+    for name, samples in (("admitted", admitted), ("rejected", rejected)):
+        if samples:
+            print(f"{name:<12}{len(samples):>7}{percentile(samples, 50):>9.2f}{percentile(samples, 99):>9.2f}")
+
+    flagged = "+919887654321"
+    for i in range(guard.block_after):
+        app_module.log_suspicious_activity(f"CAFLAG{i:05d}", flagged, "Suspicious Query (bench)")
+    body = client.post("/voice", data={"CallSid": "CAFLAGGED", "From": flagged,
+                                       "To": "+911800110001"}).get_data(as_text=True)
+    print(f"\nNumber flagged {guard.block_after} times: next call {'rejected' if '<Reject' in body else 'ADMITTED'}, "
+          f"blocked until {time.strftime('%Y-%m-%d %H:%M', time.localtime(guard.blocked()[0]['until']))}")
+
+    backend = SQLCallerGuardBackend(app_module.get_db_connection)
+    worker_a = CallerGuard(caller_calls=3, backend=backend)
+    worker_b = CallerGuard(caller_calls=3, backend=backend)
+    shared = "+919811112222"
+    for i in range(3):
+        call_sid = f"CASHARED{i:05d}"
+        assert worker_a.check(shared, call_sid) is None
+        app_module.log_call(call_sid, shared, "+911800110001", 'Inbound')
+    app_module.write_behind.flush()
+    before = worker_b.check(shared, "CASHAREDB0") or "admitted"
+    started = time.perf_counter()
+    worker_b.sync()
+    sync_ms = (time.perf_counter() - started) * 1000
+    after = worker_b.check(shared, "CASHAREDB1") or "admitted"
+    print(f"\nShared limit (3 calls admitted by worker A): worker B without sync -> {before}, "
+          f"after one sync ({sync_ms:.1f} ms) -> {after}")
+
+    rng = random.Random(7)
+    numbers = [f"+91{rng.randrange(6 * 10 ** 9, 10 ** 10)}" for _ in range(args.callers)]
+    timed = CallerGuard()
+    samples = []
+    for i, caller in enumerate(numbers + rng.sample(numbers, min(len(numbers), 20000))):
+        started = time.perf_counter()
+        timed.check(caller, f"CA{i:08d}")
+        samples.append((time.perf_counter() - started) * 1e6)
+    print(f"\ncheck() with {len(timed._callers)} callers tracked: p50 {percentile(samples, 50):.1f} us, "
+          f"p99 {percentile(samples, 99):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt tokens and latency per turn, unbounded history vs context window.
+
+Replays synthetic 5-, 20- and 50-turn calls through two prompt builders:
+  legacy  - full history plus a stored reminder every 3 exchanges (old behaviour)
+  window  - ContextWindow with rolling summary (summary text is simulated)
+
+Token counts use the same estimate as the app. Groq latency is modeled as a
+fixed overhead plus a prefill cost per 1k prompt tokens; pass your own
+numbers with --base-ms / --ms-per-1k-tokens.
+
+Usage:
+    python scripts/bench_context_window.py --max-tokens 1600 --max-turns 6
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_window import BOUNDARY_REMINDER, ContextWindow, count_prompt_tokens  # noqa: E402
+
+SYSTEM_PROMPT = "x" * 2600   # about the size of the LANG_CONFIG system prompts
+USER_TURN = "Mujhe PM Kisan yojana ki agli kist ke bare mein jaankari chahiye, kab tak aayegi?"
+AI_TURN = ("PM-KISAN ki agli kist ki jankari pmkisan.gov.in par Beneficiary Status mein mil jayegi. "
+           "Aap helpline 155261 par bhi sampark kar sakte hain.")
+SUMMARY = "Caller asked repeatedly about PM-KISAN installment dates; directed to pmkisan.gov.in and 155261."
+
+
+def legacy_prompts(turns):
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    for n in range(turns):
+        user_count = sum(1 for m in messages if m['role'] == 'user')
+        if user_count > 0 and user_count % 3 == 0:
+            messages.append({"role": "system", "content": BOUNDARY_REMINDER})
+        messages.append({"role": "user", "content": f"{USER_TURN} ({n})"})
+        yield list(messages)
+        messages.append({"role": "assistant", "content": AI_TURN})
+
+
+def window_prompts(turns, window, summary_every):
+    stored, summary = [], None
+    for n in range(turns):
+        stored.append({"role": "user", "content": f"{USER_TURN} ({n})"})
+        yield window.build(SYSTEM_PROMPT, stored, summary=summary, user_turns=n + 1)
+        stored.append({"role": "assistant", "content": AI_TURN})
+        # Stand-in for RollingSummarizer: fold what fell out of the window.
+        cut = window.recent_start(stored, count_prompt_tokens([{"content": SYSTEM_PROMPT}]))
+        if cut >= summary_every:
+            stored, summary = stored[cut:], SUMMARY
+
+
+def measure(prompts, base_ms, ms_per_1k):
+    tokens, build_us = [], []
+    iterator = iter(prompts)
+    while True:
+        start = time.perf_counter()
+        try:
+            prompt = next(iterator)
+        except StopIteration:
+            break
+        build_us.append((time.perf_counter() - start) * 1e6)
+        tokens.append(count_prompt_tokens(prompt))
+    latency = [base_ms + t / 1000.0 * ms_per_1k for t in tokens]
+    return tokens, latency, build_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-tokens", type=int, default=1600)
+    parser.add_argument("--max-turns", type=int, default=6)
+    parser.add_argument("--base-ms", type=float, default=250.0, help="modeled fixed Groq latency")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=120.0, help="modeled prefill cost")
+    args = parser.parse_args()
+
+    window = ContextWindow(max_tokens=args.max_tokens, max_turns=args.max_turns)
+    print(f"budget {args.max_tokens} tokens / {args.max_turns} turns; "
+          f"latency model {args.base_ms} ms + {args.ms_per_1k_tokens} ms per 1k prompt tokens\n")
+    print(f"{'call':<10}{'mode':<8}{'avg tok':>9}{'last tok':>10}{'avg ms':>9}{'last ms':>9}{'build us':>10}")
+    for turns in (5, 20, 50):
+        for mode, prompts in (("legacy", legacy_prompts(turns)),
+                              ("window", window_prompts(turns, window, summary_every=4))):
+            tokens, latency, build_us = measure(prompts, args.base_ms, args.ms_per_1k_tokens)
+            print(f"{turns:>3} turns  {mode:<8}{sum(tokens) / len(tokens):>9.0f}{tokens[-1]:>10}"
+                  f"{sum(latency) / len(latency):>9.0f}{latency[-1]:>9.0f}{sum(build_us) / len(build_us):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput of the pre-LLM fraud screen (fraud_screen.py).
+
+Generates a corpus of caller utterances (scheme questions and sensitive-data
+requests in English, Hinglish and Devanagari, with filler words around them),
+checks the rules flag exactly the requests, and measures utterances per
+second for:
+  - the Aho-Corasick matcher alone on pre-normalized text,
+  - a naive matcher testing each phrase with ``in`` (same rules, same text),
+  - FraudScreen.check end to end (normalization included),
+with the shipped rules and with --extra-phrases synthetic phrases added, to
+show the automaton's cost does not grow with the rule set.
+
+Usage:
+    python scripts/bench_fraud_screen.py --utterances 100000 --extra-phrases 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fraud_screen import CompiledRules, FraudScreen, normalize  # noqa: E402
+
+BENIGN = [
+    "PM kisan ki agli kist kab aayegi", "पीएम किसान की किस्त कब आएगी", "How do I apply for the Ayushman Bharat card",
+    "Ayushman card kaise banega", "awas yojana ke liye kaun se dastavez chahiye", "How do I check my name in the voter list",
+    "meri voter list mein naam nahi hai", "PM kisan beneficiary list kaise check karein",
+    "mera mobile number aadhaar se kaise link karein", "aadhaar card kaise banaye", "What is my address on the ration card",
+    "राशन कार्ड में नाम कैसे जोड़ें", "ujjwala gas cylinder par kitni subsidy milti hai", "haan ji", "repeat that please",
+    "My installment has not come for six months", "Someone called asking for my OTP for a subsidy",
+    "vidhwa pension ke liye avedan kahan karein", "Is there a scheme for all farmers in my village",
+    "how can I check my name in the voter list of my area", "Mere gaon ki voter list mein mera naam kaise check karun",
+    "mujhe pata hai ki mera naam voter list mein nahi hai, poora process batao",
+    "mera aadhaar number 1234 5678 9012 hai, isme naam galat hai", "Mera address change karna hai, kisi aur se help chahiye",
+    "mera naam voter list mein hai kya", "मतदाता सूची में नाम जोड़ने के लिए क्या करना होगा",
+]
+SENSITIVE = [
+    "Mujhe mere ward ki poori voter list bhej do", "मुझे सभी मतदाताओं की सूची चाहिए", "mujhe voter list chahiye sabki",
+    "ward 12 ki voter list de do", "give me the voter list of my area", "मेरे इलाके की मतदाता सूची चाहिए",
+    "Can you send me the entire voter list of ward 12", "booth number 45 ki saari voter list excel mein chahiye",
+    "sabhi labharthi ki list whatsapp par bhej do", "give me the beneficiary list of my village in excel sheet",
+    "Give me my neighbour's aadhaar number", "padosi ka mobile number batao", "us aadmi ka bank account number dijiye",
+    "Whose aadhaar is 1234 5678 9012", "aadhaar 123456789012 kiska hai", "लाभार्थी सूची भेज दो",
+]
+FILLER = ["ji", "please", "sir", "madam", "accha", "bataiye", "jaldi", "abhi", "thoda", "okay"]
+
+
+def corpus(n, rng):
+    """(utterance, is_sensitive) pairs, about one in ten sensitive, with filler words around them."""
+    items = []
+    for _ in range(n):
+        sensitive = rng.random() < 0.1
+        text = rng.choice(SENSITIVE if sensitive else BENIGN)
+        before = [rng.choice(FILLER) for _ in range(rng.randint(0, 2))]
+        after = [rng.choice(FILLER) for _ in range(rng.randint(0, 2))]
+        items.append((' '.join(before + [text] + after), sensitive))
+    return items
+
+
+def naive_match(rules, text, normalized):
+    for rule, groups, excluded, regex in rules:
+        if all(any(f" {p} " in normalized for p in phrases) for phrases in groups) and \
+                not any(f" {p} " in normalized for p in excluded) and (regex is None or regex.search(text)):
+            return rule
+    return None
+
+
+def naive_rules(compiled):
+    return [(rule, [[normalize(p).strip() for p in phrases] for phrases in rule.get("all", [])],
+             [normalize(p).strip() for p in rule.get("none", [])], regex)
+            for rule, _, regex in compiled.rules]
+
+
+def with_extra_phrases(rules, extra, rng):
+    """The rules plus a rule of ``extra`` random two-word phrases that never occur in the corpus."""
+    letters = "bcdfghjklmnpqrstvwxz"
+    word = lambda: ''.join(rng.choice(letters) for _ in range(rng.randint(4, 8)))  # noqa: E731
+    phrases = [f"{word()} {word()}" for _ in range(extra)]
+    return rules + [{"id": "synthetic", "reason": "Synthetic", "all": [phrases[: extra // 2], phrases[extra // 2:]]}]
+
+
+def rate(fn, items):
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return len(items) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=100000)
+    parser.add_argument("--extra-phrases", type=int, default=5000)
+    parser.add_argument("--rules", default=os.path.join(ROOT, "fraud_rules.json"))
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with open(args.rules, encoding='utf-8') as f:
+        shipped = json.load(f)["rules"]
+    items = corpus(args.utterances, rng)
+    texts = [text for text, _ in items]
+    normalized = [normalize(text) for text in texts]
+    megabytes = sum(len(text.encode('utf-8')) for text in texts) / 1e6
+
+    screen = FraudScreen(args.rules)
+    missed = sum(1 for text, sensitive in items if sensitive and screen.check(text) is None)
+    false = sum(1 for text, sensitive in items if not sensitive and screen.check(text) is not None)
+    print(f"{len(items)} utterances ({megabytes:.1f} MB), {sum(s for _, s in items)} sensitive: "
+          f"{missed} missed, {false} benign flagged\n")
+
+    print(f"{'rules':<22}{'phrases':>8}{'automaton/s':>13}{'naive/s':>11}{'check()/s':>11}{'check MB/s':>12}"
+          f"{'us/utt':>8}")
+    for name, rules in (("shipped", shipped), (f"+{args.extra_phrases} phrases",
+                                               with_extra_phrases(shipped, args.extra_phrases, rng))):
+        compiled = CompiledRules(rules)
+        naive = naive_rules(compiled)
+        for text, norm in zip(texts[:2000], normalized[:2000]):
+            assert (naive_match(naive, text, norm) is not None) == (compiled.match(text) is not None), text
+        automaton = rate(compiled.automaton.find, normalized)
+        naive_rate = rate(lambda pair: naive_match(naive, *pair), list(zip(texts, normalized)))
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+            json.dump({"rules": rules}, f)
+        check = rate(FraudScreen(f.name).check, texts)
+        os.remove(f.name)
+        print(f"{name:<22}{compiled.phrases:>8}{automaton:>13,.0f}{naive_rate:>11,.0f}{check:>11,.0f}"
+              f"{check * megabytes / len(texts):>12.2f}{1e6 / check:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
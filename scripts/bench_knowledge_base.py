@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: knowledge base retrieval versus inlining it in the system prompt.
+
+For a set of caller questions (English, Hinglish, Devanagari) labelled with
+the passage that answers them, reports:
+  - whether that passage is retrieved (top 1 / top k),
+  - prompt tokens of the first turn with RECENT_GOV_INFO inlined (today),
+    with every passage inlined (what adding the scheme details would cost),
+    and with the retrieved passages only,
+  - retrieval latency per turn on the shipped passages and on a corpus
+    --scale times larger, and the time to build or load the index.
+
+Usage:
+    python scripts/bench_knowledge_base.py --scale 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from context_window import count_prompt_tokens  # noqa: E402
+from knowledge_base import KnowledgeBase  # noqa: E402
+from load_test import percentile  # noqa: E402
+
+QUESTIONS = [
+    ("1", "PM kisan ki agli kist kab aayegi", "pm-kisan-status"),
+    ("1", "पीएम किसान की किस्त कब आएगी", "pm-kisan-status"),
+    ("2", "Am I eligible for PM Kisan if I am a government employee", "pm-kisan-eligibility"),
+    ("1", "kisan yojana mein registration kaise karein", "pm-kisan-apply"),
+    ("1", "Ayushman card kaise banega", "ayushman-card"),
+    ("2", "How much treatment does Ayushman Bharat cover", "ayushman-bharat"),
+    ("1", "mere pitaji 72 saal ke hain kya unko ayushman milega", "ayushman-vay-vandana"),
+    ("1", "gaon mein pakka ghar banane ke liye awas yojana", "pmay-gramin"),
+    ("2", "PMAY urban assistance for buying a house in the city", "pmay-urban"),
+    ("1", "ujjwala gas cylinder par kitni subsidy milti hai", "ujjwala"),
+    ("1", "राशन कार्ड में नाम कैसे जोड़ें", "ration-card"),
+    ("2", "How many kg of free ration do we get per person", "free-ration"),
+    ("2", "What is the monthly pension under Atal Pension Yojana", "atal-pension"),
+    ("1", "vidhwa pension ke liye avedan kahan karein", "social-pension"),
+    ("2", "life insurance for 436 rupees a year", "jeevan-jyoti"),
+    ("1", "beti ke liye bachat yojana", "sukanya"),
+    ("1", "ghar par solar lagwane par muft bijli", "surya-ghar"),
+    ("2", "loan for a tailor under Vishwakarma", "vishwakarma"),
+    ("1", "chhota vyapar shuru karne ke liye mudra loan", "mudra"),
+    ("2", "Where do I apply for a scholarship", "scholarship"),
+    ("1", "aadhaar mein pata kaise badle", "aadhaar"),
+    ("2", "Someone called and asked for my OTP to release my subsidy", "fraud-safety"),
+    ("1", "jan seva kendra kahan hai", "csc"),
+    ("2", "skill training courses for young people", "skill-india"),
+]
+
+
+def scaled_passages(passages, scale):
+    """``scale`` copies of the corpus with distinct ids, so term statistics stay realistic."""
+    return [dict(p, id=f"{p['id']}-{n}", title=f"{p['title']} ({n})") for n in range(scale) for p in passages]
+
+
+def time_searches(kb, k, rounds):
+    samples = []
+    for _ in range(rounds):
+        for _, question, _ in QUESTIONS:
+            started = time.perf_counter()
+            kb.search(question, k)
+            samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=50, help="corpus multiplier for the latency test")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_knowledge_base_"))
+    os.environ.update({"GROQ_API_KEY": "bench", "DB_TYPE": "sqlite", "CAMPAIGN_SCHEDULER_ENABLED": "false",
+                       "KNOWLEDGE_TOP_K": str(args.k)})
+    import app as app_module
+
+    kb = app_module.knowledge_base
+    top1 = topk = 0
+    for _, question, expected in QUESTIONS:
+        ids = [p['id'] for p in kb.search(question, args.k)]
+        top1 += bool(ids) and ids[0] == expected
+        topk += expected in ids
+    print(f"Retrieval over {len(kb.passages)} passages: {top1}/{len(QUESTIONS)} answered by the top passage, "
+          f"{topk}/{len(QUESTIONS)} within the top {args.k}\n")
+
+    everything = "\n".join(f"- {p['title']}: {p['text']}" for p in kb.passages)
+    tokens = {"RECENT_GOV_INFO inline": [], "all passages inline": [], "retrieved": []}
+    for lang_id, question, _ in QUESTIONS:
+        state = dict(app_module.new_conversation(lang_id), user_turns=1,
+                     messages=[{"role": "user", "content": question}])
+        retrieval_prompt = app_module.LANG_CONFIG[lang_id]['system_prompt']
+        for name, prompt, knowledge in (
+                ("RECENT_GOV_INFO inline",
+                 retrieval_prompt.replace(app_module.PROMPT_KNOWLEDGE, app_module.RECENT_GOV_INFO), None),
+                ("all passages inline", retrieval_prompt.replace(app_module.PROMPT_KNOWLEDGE, everything), None),
+                ("retrieved", retrieval_prompt, app_module.retrieve_knowledge(state))):
+            messages = app_module.context_window.build(prompt, state['messages'], user_turns=1, knowledge=knowledge)
+            tokens[name].append(count_prompt_tokens(messages))
+    print(f"{'prompt':<26}{'mean tokens':>12}{'max':>8}")
+    for name, counts in tokens.items():
+        print(f"{name:<26}{sum(counts) / len(counts):>12.0f}{max(counts):>8}")
+
+    print(f"\n{'corpus':<26}{'passages':>9}{'build ms':>10}{'load ms':>9}{'p50 us':>9}{'p99 us':>9}{'max us':>9}")
+    for name, passages in (("shipped", kb.passages), (f"x{args.scale}", scaled_passages(kb.passages, args.scale))):
+        started = time.perf_counter()
+        built = KnowledgeBase(passages)
+        build_ms = (time.perf_counter() - started) * 1000
+        built.save("index.json")
+        started = time.perf_counter()
+        loaded = KnowledgeBase.from_file("index.json")
+        load_ms = (time.perf_counter() - started) * 1000
+        samples = time_searches(loaded, args.k, args.rounds)
+        print(f"{name:<26}{len(passages):>9}{build_ms:>10.1f}{load_ms:>9.1f}{percentile(samples, 50):>9.1f}"
+              f"{percentile(samples, 99):>9.1f}{max(samples):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
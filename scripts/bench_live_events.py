@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dashboards polling /api/logs vs subscribed to /api/events.
+
+Serves the app from a throwaway SQLite database on a local port, logs
+--rate calls per second (two transcript lines each) for --duration seconds,
+and runs --clients simulated dashboards in one of two modes:
+  poll  - GET /api/logs every --poll-interval seconds, like the old frontend
+  sse   - one EventSource-style connection to /api/events per dashboard
+Reports database connection checkouts per second (the writer's own share is
+measured with no clients and listed separately) and how long a new call took
+to reach a dashboard.
+
+Usage:
+    python scripts/bench_live_events.py --clients 50 --duration 30 --poll-interval 10
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+
+def poll_client(base_url, interval, stop, seen, latencies, lock):
+    while not stop.is_set():
+        with urllib.request.urlopen(f"{base_url}/api/logs") as resp:
+            rows = json.loads(resp.read())
+        now_ms = time.time() * 1000
+        with lock:
+            for row in rows:
+                if row["call_sid"].startswith("CABENCH") and row["call_sid"] not in seen:
+                    seen.add(row["call_sid"])
+                    latencies.append(now_ms - row["timestamp_ms"])
+        stop.wait(interval)
+
+
+def sse_client(base_url, stop, latencies, lock, connected):
+    with urllib.request.urlopen(f"{base_url}/api/events") as resp:
+        connected.release()
+        kind = None
+        while not stop.is_set():
+            line = resp.readline().decode().rstrip("\n")
+            if line.startswith("event: "):
+                kind = line[7:]
+            elif line.startswith("data: ") and kind == "call":
+                data = json.loads(line[6:])
+                with lock:
+                    latencies.append(time.time() * 1000 - data["timestamp_ms"])
+
+
+def run(app_module, base_url, mode, clients, duration, rate, poll_interval):
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies = []
+    threads = []
+    connected = threading.Semaphore(0)
+    for _ in range(clients):
+        if mode == "poll":
+            target, args = poll_client, (base_url, poll_interval, stop, set(), latencies, lock)
+        else:
+            target, args = sse_client, (base_url, stop, latencies, lock, connected)
+        threads.append(threading.Thread(target=target, args=args, daemon=True))
+        threads[-1].start()
+    if mode == "sse":
+        for _ in range(clients):
+            connected.acquire()
+    time.sleep(0.5)
+
+    before = app_module.db_pool.stats()["acquired"]
+    start = time.monotonic()
+    n = 0
+    while time.monotonic() - start < duration:
+        call_sid = f"CABENCH{mode}{clients}-{n}"
+        app_module.log_call(call_sid, "+919800000000", "+911100000000", "Inbound")
+        app_module.log_transcript(call_sid, "user", "PM-KISAN ki kist kab aayegi?")
+        app_module.log_transcript(call_sid, "ai", "Agli kist agle mahine aayegi.")
+        n += 1
+        time.sleep(max(0.0, start + n / rate - time.monotonic()))
+    app_module.write_behind.flush()
+    time.sleep(poll_interval if mode == "poll" else 1.0)
+    elapsed = time.monotonic() - start
+    acquired = app_module.db_pool.stats()["acquired"] - before
+    stop.set()
+    return acquired / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--rate", type=float, default=2.0, help="new calls per second")
+    parser.add_argument("--poll-interval", type=float, default=10.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_events_")
+    os.chdir(workdir)
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["CAMPAIGN_SCHEDULER_ENABLED"] = "false"
+    os.environ["LIVE_EVENTS_MAX_SUBSCRIBERS"] = str(max(100, args.clients))
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    writer_rate, _ = run(app_module, base_url, "sse", 0, min(args.duration, 10.0), args.rate, args.poll_interval)
+    print(f"{args.clients} dashboards, {args.rate:g} calls/s for {args.duration:g} s "
+          f"(writer alone: {writer_rate:.1f} DB checkouts/s)\n")
+    print(f"{'mode':<8}{'DB checkouts/s':>16}{'reads/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode in ("poll", "sse"):
+        rate, latencies = run(app_module, base_url, mode, args.clients, args.duration, args.rate, args.poll_interval)
+        print(f"{mode:<8}{rate:>16.1f}{rate - writer_rate:>10.1f}"
+              f"{percentile(latencies, 50):>10.0f}{percentile(latencies, 99):>10.0f}")
+    print(f"\nPer-worker hub: {app_module.event_hub.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /handle-input tail latency with and without the LLM latency budget.
+
+Starts the fake Groq server (scripts/fake_groq.py) with a heavy-tailed
+primary model (median --latency-ms, p99 --p99-ms) and a faster small model
+(median --fast-ms, same spread), points the real Groq SDK at it and drives
+/handle-input turns through the Flask test client against a throwaway SQLite
+database, in blocks that alternate the budget off and on so drift affects
+both equally. Reports turn latency percentiles, the turns answered within
+Twilio's 15 s webhook timeout, and the paths that served them.
+
+Usage:
+    python scripts/bench_llm_budget.py --turns 200 --latency-ms 900 --p99-ms 12000 --fast-ms 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+from fake_groq import FakeGroqServer, REPLY_MARKER  # noqa: E402
+from load_test import TWILIO_TIMEOUT, percentile  # noqa: E402
+
+
+def run_block(client, tag, turns, concurrency):
+    """(latency ms, answered) for ``turns`` turns spread over ``concurrency`` threads."""
+    results = []
+    lock = threading.Lock()
+
+    def caller(n):
+        for i in range(n, turns, concurrency):
+            form = {"CallSid": f"CA{tag}{i:05d}", "From": "+919800000000", "To": "+911800110001"}
+            client.post("/set-language", data=dict(form, Digits="1"))
+            started = time.perf_counter()
+            body = client.post("/handle-input", data=dict(form, SpeechResult=f"Yojana question {tag} {i}")).get_data(
+                as_text=True)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                results.append((elapsed, REPLY_MARKER in body and elapsed <= TWILIO_TIMEOUT * 1000))
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="turns per mode")
+    parser.add_argument("--blocks", type=int, default=4, help="alternating off / on blocks per mode")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=900.0, help="primary model median")
+    parser.add_argument("--p99-ms", type=float, default=12000.0, help="primary model p99")
+    parser.add_argument("--fast-ms", type=float, default=200.0, help="fallback model median")
+    parser.add_argument("--hedge-after", type=float, default=2.5)
+    parser.add_argument("--hard-cap", type=float, default=7.0)
+    args = parser.parse_args()
+
+    fast_model = "llama-3.1-8b-instant"
+    groq = FakeGroqServer(latency_ms=args.latency_ms, p99_ms=args.p99_ms,
+                          model_latency_ms={fast_model: args.fast_ms}).start()
+    os.chdir(tempfile.mkdtemp(prefix="bench_llm_budget_"))
+    os.environ.update({
+        "GROQ_API_KEY": "bench", "GROQ_BASE_URL": groq.base_url, "DB_TYPE": "sqlite",
+        "CAMPAIGN_SCHEDULER_ENABLED": "false", "ANSWER_CACHE_ENABLED": "false", "CONTEXT_SUMMARIZE": "false",
+        "LLM_HEDGE_AFTER": str(args.hedge_after), "LLM_HARD_CAP": str(args.hard_cap),
+        "LLM_FALLBACK_MODEL": fast_model,
+    })
+    sys.path.insert(0, os.path.dirname(ROOT))
+    import app as app_module
+
+    client = app_module.app.test_client()
+    samples = {False: [], True: []}
+    paths = {False: {}, True: {}}
+    per_block = max(1, args.turns // args.blocks)
+    try:
+        for block in range(args.blocks):
+            for enabled in (block % 2 == 0, block % 2 == 1):
+                app_module.llm_budget.enabled = enabled
+                before = dict(app_module.LLM_TURNS.samples())
+                samples[enabled].extend(run_block(client, f"{int(enabled)}{block:02d}", per_block, args.concurrency))
+                for values, count in app_module.LLM_TURNS.samples():
+                    delta = count - before.get(values, 0.0)
+                    if delta:
+                        paths[enabled][values[0]] = paths[enabled].get(values[0], 0) + int(delta)
+    finally:
+        app_module.write_behind.flush(timeout=30)
+        groq.stop()
+
+    print(f"Primary median {args.latency_ms:g} ms / p99 {args.p99_ms:g} ms, {fast_model} median {args.fast_ms:g} ms; "
+          f"hedge after {args.hedge_after:g} s, hard cap {args.hard_cap:g} s, {args.concurrency} concurrent turns\n")
+    print(f"{'budget':<8}{'turns':>7}{'answered':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  paths")
+    for enabled in (False, True):
+        latencies = [ms for ms, _ in samples[enabled]]
+        answered = sum(ok for _, ok in samples[enabled])
+        print(f"{'on' if enabled else 'off':<8}{len(latencies):>7}{answered / len(latencies):>10.1%}"
+              f"{percentile(latencies, 50):>10.0f}{percentile(latencies, 95):>10.0f}"
+              f"{percentile(latencies, 99):>10.0f}{max(latencies):>10.0f}  "
+              + ", ".join(f"{path} {count}" for path, count in sorted(paths[enabled].items())))
+    print(f"\nFake Groq: {groq.counters}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/logs page latency, OFFSET + correlated subquery vs keyset.
+
+Fills a throwaway SQLite database with --calls calls and --turns transcript
+rows per call, then times fetching page 1 and pages deep into the history:
+  offset  - the old query shape: ORDER BY the text timestamp LIMIT 50 OFFSET n,
+            with a per-row subquery on transcripts for last_message
+  keyset  - GET /api/logs?cursor=... through the Flask test client, reading
+            the denormalized last_message / turn_count columns
+
+Usage:
+    python scripts/bench_logs_pagination.py --calls 1000000 --turns 20
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEGACY_SQL = """
+    SELECT c.*,
+    (SELECT message FROM transcripts t WHERE t.call_sid = c.call_sid ORDER BY t.id DESC LIMIT 1) as last_message
+    FROM calls c
+    ORDER BY c.timestamp DESC LIMIT 50 OFFSET ?
+"""
+
+
+def populate(path, calls, turns):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    base = datetime(2025, 1, 1)
+
+    def call_rows():
+        for i in range(calls):
+            ts = base + timedelta(seconds=i * 7)
+            yield (f"CA{i:010d}", "+919800000000", "+911100000000", "Inbound" if i % 2 else "Outbound",
+                   ts.isoformat(), int(ts.timestamp() * 1000), f"reply {turns - 1}", turns)
+
+    def transcript_rows():
+        for i in range(calls):
+            for n in range(turns):
+                yield (f"CA{i:010d}", "user" if n % 2 == 0 else "ai", f"reply {n}", "")
+
+    start = time.perf_counter()
+    conn.executemany("INSERT INTO calls (call_sid, from_number, to_number, direction, timestamp, timestamp_ms, "
+                     "last_message, turn_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", call_rows())
+    conn.commit()
+    conn.executemany("INSERT INTO transcripts (call_sid, role, message, timestamp) VALUES (?, ?, ?, ?)",
+                     transcript_rows())
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return time.perf_counter() - start
+
+
+def timed(fn, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1000000)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_logs_")
+    os.chdir(workdir)
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["CAMPAIGN_SCHEDULER_ENABLED"] = "false"
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    path = os.path.join(workdir, app_module.DB_NAME)
+    print(f"Populating {args.calls} calls / {args.calls * args.turns} transcripts in {path} ...")
+    print(f"  took {populate(path, args.calls, args.turns):.0f} s\n")
+
+    client = app_module.app.test_client()
+    raw = sqlite3.connect(path)
+    print(f"{'page':>8}{'offset ms':>12}{'keyset ms':>12}")
+    for page in (1, 100, 1000, 10000):
+        offset = (page - 1) * 50
+        if offset >= args.calls:
+            break
+        legacy_ms = timed(lambda: raw.execute(LEGACY_SQL, (offset,)).fetchall())
+        cursor = None
+        if offset:
+            ts, call_sid = raw.execute("SELECT timestamp_ms, call_sid FROM calls ORDER BY timestamp_ms DESC, "
+                                       "call_sid DESC LIMIT 1 OFFSET ?", (offset - 1,)).fetchone()
+            cursor = app_module.encode_logs_cursor(ts, call_sid)
+        url = "/api/logs" + (f"?cursor={cursor}" if cursor else "")
+        keyset_ms = timed(lambda: client.get(url).get_json())
+        print(f"{page:>8}{legacy_ms:>12.2f}{keyset_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
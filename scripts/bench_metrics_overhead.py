@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the Prometheus instrumentation on the webhook path.
+
+Drives /voice, /set-language, /handle-input and /listen through the Flask
+test client against a throwaway SQLite database (Groq replaced by a canned
+reply), alternating calls with metrics on and off so drift affects both
+equally. Also reports the raw cost of one histogram observation and how long
+a /metrics scrape takes once the series exist.
+
+Usage:
+    python scripts/bench_metrics_overhead.py --calls 300 --turns 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_webhook_latency import FakeGroq, percentile  # noqa: E402
+
+
+def one_call(client, call_sid, turns):
+    """Per-request latencies (ms) for one simulated call."""
+    form = {"CallSid": call_sid, "From": "+919800000000", "To": "+911100000000"}
+    requests = [("/voice", form), ("/set-language", dict(form, Digits="1"))]
+    for turn in range(turns):
+        requests.append(("/handle-input", dict(form, SpeechResult=f"PM kisan ki kist kab aayegi {turn}")))
+        requests.append(("/listen", form))
+    samples = []
+    for path, data in requests:
+        start = time.perf_counter()
+        client.post(path, data=data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def set_metrics(app_module, enabled):
+    app_module.METRICS_ENABLED = enabled
+    app_module.db_pool.observer = app_module.observe_db_operation if enabled else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300, help="calls per mode")
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_metrics_"))
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["CAMPAIGN_SCHEDULER_ENABLED"] = "false"
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    os.environ["CALLER_GUARD_ENABLED"] = "false"  # every call is from one number
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    from metrics import Histogram
+
+    app_module.groq_client = FakeGroq(0)
+    client = app_module.app.test_client()
+    one_call(client, "CAWARMUP", args.turns)
+
+    samples = {False: [], True: []}
+    for n in range(args.calls):
+        for enabled in (n % 2 == 0, n % 2 == 1):
+            set_metrics(app_module, enabled)
+            samples[enabled].extend(one_call(client, f"CA{int(enabled)}{n:06d}", args.turns))
+    set_metrics(app_module, True)
+    app_module.write_behind.flush(timeout=30)
+
+    requests = len(samples[True])
+    print(f"{args.calls} calls x ({args.turns} turns + 2) webhooks per mode, {requests} requests each\n")
+    print(f"{'metrics':<10}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for enabled in (False, True):
+        data = samples[enabled]
+        print(f"{'on' if enabled else 'off':<10}{sum(data) / len(data):>10.3f}"
+              f"{percentile(data, 50):>10.3f}{percentile(data, 99):>10.3f}")
+    added = (sum(samples[True]) - sum(samples[False])) / requests * 1000
+    print(f"\nadded per request: {added:.1f} us (route histogram + counter, DB helper timings)")
+
+    histogram = Histogram("bench_seconds", "bench", ["route"])
+    child = histogram.labels("/handle-input")
+    n = 200000
+    start = time.perf_counter()
+    for _ in range(n):
+        histogram.labels("/handle-input").observe(0.0123)
+    labelled = (time.perf_counter() - start) / n * 1e9
+    start = time.perf_counter()
+    for _ in range(n):
+        child.observe(0.0123)
+    print(f"histogram observe: {labelled:.0f} ns with labels() lookup, "
+          f"{(time.perf_counter() - start) / n * 1e9:.0f} ns on a bound child")
+
+    start = time.perf_counter()
+    body = client.get("/metrics").data
+    elapsed = time.perf_counter() - start
+    print(f"/metrics scrape: {elapsed * 1000:.1f} ms, {len(body.splitlines())} lines, {len(body) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
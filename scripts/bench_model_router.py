@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the query-complexity router (model_router.py).
+
+1. Classifies a labelled set of caller turns (English, romanized Hindi and
+   Devanagari) and reports agreement with the labels and the cost per turn.
+2. Runs scripted calls through the Flask test client against the fake Groq
+   server (scripts/fake_groq.py), where the small model answers faster than
+   the large one, alternating calls with the router off and on. Reports
+   /handle-input latency, the share of turns sent to the small model, and
+   tokens per turn by model as reported in the completions' usage.
+
+Usage:
+    python scripts/bench_model_router.py --calls 40 --large-ms 900 --small-ms 250
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_groq import FakeGroqServer  # noqa: E402
+from load_test import percentile  # noqa: E402
+from model_router import ModelRouter  # noqa: E402
+
+LABELLED = [
+    ("en-IN", "hello", "small"), ("en-IN", "yes", "small"), ("en-IN", "repeat that", "small"),
+    ("en-IN", "thank you so much", "small"), ("en-IN", "okay got it", "small"), ("en-IN", "are you there", "small"),
+    ("en-IN", "bye", "small"), ("en-IN", "sorry, say that again", "small"), ("en-IN", "nothing else, thanks", "small"),
+    ("en-IN", "that is helpful", "small"),
+    ("en-IN", "How do I apply for the Ayushman Bharat card", "large"),
+    ("en-IN", "Am I eligible for PM Kisan if I own two acres", "large"),
+    ("en-IN", "What documents do I need for PM Awas Yojana", "large"),
+    ("en-IN", "My installment has not come for six months", "large"),
+    ("en-IN", "When will the next PM Kisan money come", "large"),
+    ("en-IN", "Someone called asking for my OTP for a subsidy", "large"),
+    ("en-IN", "I want to know about the widow pension in Delhi", "large"),
+    ("en-IN", "my name is missing from the list what should I do", "large"),
+    ("hi-IN", "haan ji", "small"), ("hi-IN", "theek hai", "small"), ("hi-IN", "dhanyavad", "small"),
+    ("hi-IN", "phir se boliye", "small"), ("hi-IN", "namaste", "small"), ("hi-IN", "achha", "small"),
+    ("hi-IN", "हाँ जी", "small"), ("hi-IN", "धन्यवाद", "small"), ("hi-IN", "दोबारा बोलिए", "small"),
+    ("hi-IN", "ठीक है", "small"),
+    ("hi-IN", "PM kisan ki agli kist kab aayegi", "large"),
+    ("hi-IN", "Ayushman card kaise banega", "large"),
+    ("hi-IN", "awas yojana ke liye kaun se dastavez chahiye", "large"),
+    ("hi-IN", "mera naam list mein nahi hai kya karun", "large"),
+    ("hi-IN", "पीएम किसान की किस्त कब आएगी", "large"),
+    ("hi-IN", "आयुष्मान कार्ड के लिए आवेदन कैसे करें", "large"),
+    ("hi-IN", "राशन कार्ड में नाम कैसे जोड़ें", "large"),
+    ("hi-IN", "क्या मैं इस योजना के लिए पात्र हूं", "large"),
+]
+
+CALL_SCRIPT = {
+    "1": ["namaste", "PM kisan ki agli kist kab aayegi", "haan ji", "iske liye kaun se dastavez chahiye",
+          "phir se boliye", "dhanyavad"],
+    "2": ["hello", "How do I apply for the Ayushman Bharat card", "okay", "What documents do I need",
+          "repeat that", "thank you"],
+}
+
+
+def classify_report():
+    router = ModelRouter("small", "large")
+    wrong = [(code, text, label) for code, text, label in LABELLED if router.classify(text, code)[0] != label]
+    print(f"Classifier: {len(LABELLED) - len(wrong)}/{len(LABELLED)} turns routed as labelled")
+    for code, text, label in wrong:
+        print(f"  expected {label}: [{code}] {text!r} -> {router.classify(text, code)}")
+    n = 20000
+    started = time.perf_counter()
+    for i in range(n):
+        code, text, _ = LABELLED[i % len(LABELLED)]
+        router.classify(text, code)
+    print(f"  {(time.perf_counter() - started) / n * 1e6:.1f} us per turn\n")
+
+
+def one_call(client, call_sid, lang_id):
+    form = {"CallSid": call_sid, "From": "+919800000000", "To": "+911800110001"}
+    client.post("/set-language", data=dict(form, Digits=lang_id))
+    samples = []
+    for text in CALL_SCRIPT[lang_id]:
+        started = time.perf_counter()
+        client.post("/handle-input", data=dict(form, SpeechResult=text))
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def counter_totals(metric):
+    return {values: value for values, value in metric.samples()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40, help="calls per mode")
+    parser.add_argument("--large-ms", type=float, default=900.0, help="large model median latency")
+    parser.add_argument("--small-ms", type=float, default=250.0, help="small model median latency")
+    args = parser.parse_args()
+
+    classify_report()
+
+    small_model = "llama-3.1-8b-instant"
+    groq = FakeGroqServer(latency_ms=args.large_ms, p99_ms=args.large_ms * 2,
+                          model_latency_ms={small_model: args.small_ms}).start()
+    os.chdir(tempfile.mkdtemp(prefix="bench_model_router_"))
+    os.environ.update({
+        "GROQ_API_KEY": "bench", "GROQ_BASE_URL": groq.base_url, "DB_TYPE": "sqlite",
+        "CAMPAIGN_SCHEDULER_ENABLED": "false", "ANSWER_CACHE_ENABLED": "false", "CONTEXT_SUMMARIZE": "false",
+        "ROUTER_SMALL_MODEL": small_model,
+    })
+    import app as app_module
+
+    client = app_module.app.test_client()
+    samples = {False: [], True: []}
+    routes = {False: {}, True: {}}
+    tokens = {False: {}, True: {}}
+    try:
+        for n in range(args.calls):
+            for enabled in (n % 2 == 0, n % 2 == 1):
+                app_module.model_router.enabled = enabled
+                routes_before = counter_totals(app_module.LLM_ROUTES)
+                tokens_before = counter_totals(app_module.LLM_TOKENS)
+                samples[enabled].extend(one_call(client, f"CA{int(enabled)}{n:05d}", "1" if n % 4 < 2 else "2"))
+                for values, count in counter_totals(app_module.LLM_ROUTES).items():
+                    routes[enabled][values[0]] = routes[enabled].get(values[0], 0) + count - routes_before.get(values, 0)
+                for values, count in counter_totals(app_module.LLM_TOKENS).items():
+                    tokens[enabled][values[0]] = tokens[enabled].get(values[0], 0) + count - tokens_before.get(values, 0)
+    finally:
+        app_module.write_behind.flush(timeout=30)
+        groq.stop()
+
+    print(f"{args.calls} calls x {len(CALL_SCRIPT['1'])} turns per mode; large model median {args.large_ms:g} ms, "
+          f"{small_model} median {args.small_ms:g} ms\n")
+    print(f"{'router':<8}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'small':>8}  tokens per turn by model")
+    for enabled in (False, True):
+        data = samples[enabled]
+        small = routes[enabled].get(small_model, 0) / max(1, sum(routes[enabled].values()))
+        per_turn = ", ".join(f"{model} {count / len(data):.0f}" for model, count in sorted(tokens[enabled].items()))
+        print(f"{'on' if enabled else 'off':<8}{sum(data) / len(data):>9.0f}{percentile(data, 50):>9.0f}"
+              f"{percentile(data, 95):>9.0f}{small:>8.0%}  {per_turn}")
+
+
+if __name__ == "__main__":
+    main()
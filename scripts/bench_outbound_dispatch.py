@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bulk /make-call, serial dialing vs the parallel rate-limited dispatcher.
+
+Starts scripts/fake_twilio.py in-process (with latency and a CPS limit that
+answers 429 like the real API), points the app's Twilio client at it, and
+measures how long a batch takes to be fully dialed:
+  serial      - one calls.create after another (the old request loop)
+  dispatcher  - POST /make-call, then poll /api/make-call/<batch_id> until done
+
+Also reports how long /make-call itself took to respond and whether the fake
+server ever saw more calls per second than allowed.
+
+Usage:
+    python scripts/bench_outbound_dispatch.py --numbers 50 --latency-ms 300 --cps 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scripts.fake_twilio import FakeTwilioServer  # noqa: E402
+
+
+def peak_cps(calls):
+    times = sorted(t for t, _ in calls)
+    peak, start = 0, 0
+    for end in range(len(times)):
+        while times[end] - times[start] >= 1.0:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--numbers", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--cps", type=float, default=5.0, help="account calls-per-second allowance")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    server = FakeTwilioServer(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 6, cps=args.cps).start()
+    workdir = tempfile.mkdtemp(prefix="bench_outbound_")
+    os.chdir(workdir)
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "AC" + "0" * 32)
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "bench")
+    os.environ["TWILIO_PHONE_NUMBER"] = "+911100000000"
+    os.environ["TWILIO_API_BASE_URL"] = server.base_url
+    os.environ["TWILIO_CALLS_PER_SECOND"] = str(args.cps)
+    os.environ["OUTBOUND_WORKERS"] = str(args.workers)
+    os.environ["DB_TYPE"] = "sqlite"
+    import app as app_module
+
+    numbers = [f"+9198{n:08d}" for n in range(args.numbers)]
+    webhook = "https://example.invalid/voice"
+    print(f"{args.numbers} numbers, fake Twilio latency {args.latency_ms} ms, limit {args.cps} calls/s, "
+          f"{args.workers} workers\n")
+    print(f"{'mode':<12}{'respond ms':>12}{'batch s':>10}{'ok':>6}{'failed':>8}{'peak cps':>10}")
+
+    # Serial baseline: the old loop inside the request.
+    server.calls.clear()
+    failed = 0
+    start = time.perf_counter()
+    for number in numbers:
+        try:
+            app_module.place_outbound_call(number, {"webhook_url": webhook})
+        except Exception:
+            failed += 1
+    elapsed = time.perf_counter() - start
+    app_module.write_behind.flush(timeout=30)
+    print(f"{'serial':<12}{elapsed * 1000:>12.0f}{elapsed:>10.2f}{args.numbers - failed:>6}{failed:>8}"
+          f"{peak_cps(server.calls):>10}")
+
+    # Dispatcher: the request returns at once, progress is polled.
+    server.calls.clear()
+    time.sleep(1.0)
+    client = app_module.app.test_client()
+    start = time.perf_counter()
+    response = client.post("/make-call", data={"to_number": ",".join(numbers), "webhook_url": webhook})
+    respond_ms = (time.perf_counter() - start) * 1000
+    status_url = response.get_json()["status_url"]
+    while True:
+        status = client.get(status_url).get_json()
+        if status["done"]:
+            break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    print(f"{'dispatcher':<12}{respond_ms:>12.0f}{elapsed:>10.2f}{len(status['successful']):>6}"
+          f"{len(status['failed']):>8}{peak_cps(server.calls):>10}")
+    print(f"\n429 responses from fake Twilio: {server.rejected}")
+    print(f"Dispatcher stats: {app_module.outbound_dispatcher.stats()}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
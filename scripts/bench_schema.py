@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SQLite query timings and write contention before and after migrations.
+
+Builds a throwaway database at schema version 1 (the original tables: no
+indexes, text timestamps, rollback journal), fills it, and times the queries
+the app has always run. Then applies the remaining migrations and times the
+same operations in their current form. Finally runs --writers processes doing
+single-row inserts while another process streams the CSV export, and counts
+"database is locked" errors in each journal mode.
+
+Usage:
+    python scripts/bench_schema.py --calls 20000 --turns 20 --writers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import migrations  # noqa: E402
+
+BEFORE = {
+    "call list (50)": """
+        SELECT c.*, (SELECT message FROM transcripts t WHERE t.call_sid = c.call_sid ORDER BY t.id DESC LIMIT 1)
+        FROM calls c ORDER BY c.timestamp DESC LIMIT 50""",
+    "transcript of one call": "SELECT role, message FROM transcripts WHERE call_sid = 'CA0000012345' ORDER BY id",
+    "fraud rows of one call": "SELECT reason FROM suspicious_activity WHERE call_sid = 'CA0000012345'",
+    "export one hour": """
+        SELECT c.timestamp, c.direction, c.from_number, c.to_number, t.role, t.message
+        FROM transcripts t JOIN calls c ON t.call_sid = c.call_sid
+        WHERE c.timestamp >= '2025-01-01T12:00' AND c.timestamp < '2025-01-01T13:00' ORDER BY c.timestamp DESC, t.id""",
+}
+# What the reader process streams during the contention test
+FULL_EXPORT = """
+    SELECT c.timestamp, c.direction, c.from_number, c.to_number, t.role, t.message
+    FROM transcripts t JOIN calls c ON t.call_sid = c.call_sid"""
+AFTER = dict(BEFORE)
+AFTER["call list (50)"] = """
+    SELECT c.* FROM calls c ORDER BY c.timestamp_ms DESC, c.call_sid DESC LIMIT 50"""
+AFTER["export one hour"] = """
+    SELECT c.timestamp, c.direction, c.from_number, c.to_number, t.role, t.message
+    FROM transcripts t JOIN calls c ON t.call_sid = c.call_sid
+    WHERE c.timestamp_ms >= {start} AND c.timestamp_ms < {end} ORDER BY c.timestamp_ms DESC, t.id"""
+
+
+def connect(path):
+    return migrations._Closing(sqlite3.connect(path, timeout=5))
+
+
+def populate(path, calls, turns):
+    conn = sqlite3.connect(path)
+    base = datetime(2025, 1, 1)
+    conn.executemany("INSERT INTO calls (call_sid, from_number, to_number, direction, timestamp) VALUES (?, ?, ?, ?, ?)",
+                     ((f"CA{i:010d}", "+919800000000", "+911100000000", "Inbound" if i % 2 else "Outbound",
+                       (base + timedelta(seconds=i * 7)).isoformat()) for i in range(calls)))
+    conn.executemany("INSERT INTO transcripts (call_sid, role, message, timestamp) VALUES (?, ?, ?, ?)",
+                     ((f"CA{i // turns:010d}", "user" if i % 2 == 0 else "ai", f"message {i}", "")
+                      for i in range(calls * turns)))
+    conn.executemany("INSERT INTO suspicious_activity (call_sid, phone_number, reason, timestamp) VALUES (?, ?, ?, ?)",
+                     ((f"CA{i * 50:010d}", "+919800000000", "Suspicious Query", "") for i in range(calls // 50)))
+    conn.commit()
+    conn.close()
+
+
+def time_queries(path, queries, repeat=1):
+    conn = sqlite3.connect(path)
+    for pragma in migrations.SQLITE_CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    results = {}
+    for name, sql in queries.items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = sorted(samples)[len(samples) // 2]
+    conn.close()
+    return results
+
+
+def writer(path, rows, results):
+    conn = sqlite3.connect(path, timeout=0.5)
+    locked = 0
+    for n in range(rows):
+        try:
+            conn.execute("INSERT INTO transcripts (call_sid, role, message, timestamp) VALUES (?, 'user', 'x', '')",
+                         (f"CA{n:010d}",))
+            conn.commit()
+        except sqlite3.OperationalError:
+            locked += 1
+            conn.rollback()
+    results.append(locked)
+
+
+def reader(path, stop):
+    conn = sqlite3.connect(path, timeout=0.5)
+    while not stop.is_set():
+        try:
+            for _ in conn.execute(FULL_EXPORT):
+                pass
+        except sqlite3.OperationalError:
+            pass
+
+
+def contention(path, writers, rows):
+    manager = multiprocessing.Manager()
+    results, stop = manager.list(), manager.Event()
+    read = multiprocessing.Process(target=reader, args=(path, stop))
+    read.start()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    procs = [multiprocessing.Process(target=writer, args=(path, rows, results)) for _ in range(writers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    read.join()
+    return sum(results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=100, help="inserts per writer process")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_schema_"), "voice_agent.db")
+    quiet = lambda *a: None  # noqa: E731
+    migrations.upgrade(lambda: connect(path), "sqlite", target=1, log=quiet)
+    populate(path, args.calls, args.turns)
+    print(f"{args.calls} calls / {args.calls * args.turns} transcripts in {path}\n")
+
+    before = time_queries(path, BEFORE)
+    locked_before, elapsed_before = contention(path, args.writers, args.rows)
+
+    start = time.perf_counter()
+    migrations.upgrade(lambda: connect(path), "sqlite", log=print)
+    print(f"  migrations took {time.perf_counter() - start:.1f} s\n")
+    hour = datetime(2025, 1, 1, 12)
+    AFTER["export one hour"] = AFTER["export one hour"].format(
+        start=int(hour.timestamp() * 1000), end=int((hour + timedelta(hours=1)).timestamp() * 1000))
+    after = time_queries(path, AFTER)
+    locked_after, elapsed_after = contention(path, args.writers, args.rows)
+
+    print(f"{'query':<26}{'before ms':>12}{'after ms':>12}")
+    for name in BEFORE:
+        print(f"{name:<26}{before[name]:>12.2f}{after[name]:>12.2f}")
+    total = args.writers * args.rows
+    print(f"\n{args.writers} writers x {args.rows} inserts while exporting:")
+    print(f"  rollback journal: {locked_before}/{total} 'database is locked', {elapsed_before:.1f} s")
+    print(f"  WAL:              {locked_after}/{total} 'database is locked', {elapsed_after:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/submit-query with the Google Sheets outbox (sheets_outbox.py).
+
+Runs the app against the local Sheets stand-in (scripts/fake_sheets.py) and
+reports:
+  - the cost of the old path, one append per submission on a fresh session,
+  - /api/submit-query latency from --threads concurrent clients, which now
+    only insert the query and its outbox row,
+  - how the outbox drained: append calls made for --submissions rows, failed
+    appends retried (with --error-rate), and whether every row reached the
+    sheet exactly once.
+
+Usage:
+    python scripts/bench_sheets_outbox.py --submissions 500 --threads 8 --error-rate 0.2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_sheets import FakeSheetsServer  # noqa: E402
+from load_test import percentile  # noqa: E402
+from sheets_outbox import SheetsClient  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="fake Sheets append latency")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="share of appends failing with HTTP 503")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the outbox to drain")
+    args = parser.parse_args()
+
+    sheets = FakeSheetsServer(latency_ms=args.latency_ms).start()
+    os.chdir(tempfile.mkdtemp(prefix="bench_sheets_outbox_"))
+    os.environ.update({"GROQ_API_KEY": "bench", "DB_TYPE": "sqlite", "CAMPAIGN_SCHEDULER_ENABLED": "false",
+                       "GOOGLE_SHEETS_SHEET_ID": "bench-sheet", "GOOGLE_SHEETS_API_URL": sheets.base_url,
+                       "SHEETS_SYNC_INTERVAL": "0.5", "SHEETS_RETRY_BASE": "0.25", "SHEETS_RETRY_MAX": "2"})
+    os.environ.pop("GOOGLE_SHEETS_CREDENTIALS_JSON", None)
+    import app as app_module
+
+    inline = []
+    for i in range(20):
+        started = time.perf_counter()
+        SheetsClient("bench-sheet", api_url=sheets.base_url).append([["", "inline", f"inline {i}", "Submitted"]])
+        inline.append((time.perf_counter() - started) * 1000)
+    sheets.rows.clear()
+    sheets.appends = 0
+    sheets.error_rate = args.error_rate
+
+    def submit(i):
+        client = app_module.app.test_client()
+        started = time.perf_counter()
+        response = client.post("/api/submit-query", json={"user": f"bench-{i % 7}", "query": f"query {i}"})
+        elapsed = (time.perf_counter() - started) * 1000
+        assert response.status_code == 200 and response.get_json()["google_sheets"] == "Queued for Google Sheets"
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        latencies = list(pool.map(submit, range(args.submissions)))
+    submitted_s = time.perf_counter() - started
+
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline and app_module.sheets_outbox_backend.counts():
+        time.sleep(0.1)
+    drained_s = time.perf_counter() - started
+    left = app_module.sheets_outbox_backend.counts()
+
+    print(f"{'path':<34}{'p50 ms':>9}{'p99 ms':>9}")
+    print(f"{'inline append (before)':<34}{percentile(inline, 50):>9.1f}{percentile(inline, 99):>9.1f}")
+    print(f"{'/api/submit-query with outbox':<34}{percentile(latencies, 50):>9.1f}{percentile(latencies, 99):>9.1f}")
+
+    sent = [row[2] for row in sheets.rows]
+    expected = {f"query {i}" for i in range(args.submissions)}
+    print(f"\n{args.submissions} submissions in {submitted_s:.1f}s from {args.threads} threads; outbox "
+          f"{'drained' if not left else f'NOT drained ({left})'} after {drained_s:.1f}s")
+    print(f"Sheets append calls: {sheets.appends} succeeded, {sheets.failures} failed and retried "
+          f"(error rate {args.error_rate:.0%}); {sheets.appends + sheets.failures} calls instead of "
+          f"{args.submissions}")
+    print(f"Rows in the sheet: {len(sent)}, distinct {len(set(sent))}, missing {len(expected - set(sent))}")
+    print(f"Outbox counters: {app_module.sheets_outbox.stats()}")
+    sheets.stop()
+
+
+if __name__ == "__main__":
+    main()
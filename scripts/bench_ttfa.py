@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time-to-first-audio for /handle-input, streaming vs non-streaming.
+
+Groq is replaced by a local stand-in that emits a canned multi-sentence
+reply token by token with a fixed delay, so the numbers reflect how early
+each mode can hand TwiML back to Twilio. The in-app recorder
+(GET /api/latency) reports the same ttfa.* keys from real traffic.
+
+Usage:
+    python scripts/bench_ttfa.py --turns 20 --first-token-ms 250 --token-ms 15
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REPLY = ("PM-KISAN yojana ke tehat kisanon ko saal mein chhe hazaar rupaye milte hain. "
+         "Yeh rashi teen kishton mein seedhe bank khate mein bheji jaati hai. "
+         "Apni kisht ki sthiti pmkisan.gov.in par ya helpline 155261 par jaanch sakte hain.")
+
+
+def _obj(**kwargs):
+    return type("Obj", (), kwargs)
+
+
+class FakeStream:
+    def __init__(self, tokens, first_delay, token_delay):
+        self.tokens = tokens
+        self.first_delay = first_delay
+        self.token_delay = token_delay
+        self.closed = False
+
+    def __iter__(self):
+        time.sleep(self.first_delay)
+        for token in self.tokens:
+            if self.closed:
+                return
+            time.sleep(self.token_delay)
+            yield _obj(choices=[_obj(delta=_obj(content=token))])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    def __init__(self, first_delay, token_delay):
+        self.first_delay = first_delay
+        self.token_delay = token_delay
+
+    def create(self, stream=False, **kwargs):
+        tokens = [word + " " for word in REPLY.split(" ")]
+        if stream:
+            return FakeStream(tokens, self.first_delay, self.token_delay)
+        time.sleep(self.first_delay + self.token_delay * len(tokens))
+        return _obj(choices=[_obj(message=_obj(content=REPLY))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=250.0)
+    parser.add_argument("--token-ms", type=float, default=15.0)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_ttfa_"))
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ["DB_TYPE"] = "sqlite"
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    app_module.groq_client = _obj(chat=_obj(completions=FakeCompletions(
+        args.first_token_ms / 1000.0, args.token_ms / 1000.0)))
+    app_module.groq_client.with_options = lambda **options: app_module.groq_client
+    client = app_module.app.test_client()
+
+    for streaming in (False, True):
+        app_module.STREAM_RESPONSES = streaming
+        for n in range(args.turns):
+            form = {"CallSid": f"CA{int(streaming)}{n:05d}", "From": "+919800000000", "To": "+911100000000"}
+            client.post("/set-language", data=dict(form, Digits="1"))
+            client.post("/handle-input", data=dict(form, SpeechResult="PM kisan ki kist kab aayegi"))
+            if streaming:
+                client.post("/continue-response", data=form)
+
+    summary = app_module.latency_stats.summary("ttfa.")
+    print(f"{args.turns} turns, first token {args.first_token_ms} ms, {args.token_ms} ms/token\n")
+    print(f"{'mode':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for key in ("ttfa.full", "ttfa.streaming"):
+        row = summary.get(key)
+        if row:
+            print(f"{key:<18}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
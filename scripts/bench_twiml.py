@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU cost of the static call-flow webhooks with and without the TwiML cache.
+
+Calls the handlers behind /voice (with and without a custom_message),
+/set-language with an invalid digit and /listen (Hindi and English calls)
+directly, against a throwaway SQLite database, first checking that the
+cached documents match the ones built per request. Reports CPU and wall
+time per request with the cache off and on, alternating rounds so drift
+affects both equally. Call logging goes through the write-behind queue,
+as in production.
+
+Usage:
+    python scripts/bench_twiml.py --requests 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="requests per route and mode")
+    parser.add_argument("--rounds", type=int, default=4, help="alternating off / on rounds")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_twiml_"))
+    os.environ.update({"GROQ_API_KEY": "bench", "DB_TYPE": "sqlite", "CAMPAIGN_SCHEDULER_ENABLED": "false",
+                       "CALLER_GUARD_ENABLED": "false",  # every request is from one number
+                       "WRITE_BEHIND_MAX_QUEUE": str(args.requests * args.rounds * 2 + 1000)})
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    form = {"From": "+919800000000", "To": "+911100000000"}
+    for lang_id in ("1", "2"):
+        app_module.set_language_twiml(dict(form, CallSid=f"CABENCH{lang_id}", Digits=lang_id))
+    routes = {
+        "/voice": (app_module.voice_twiml, dict(form, CallSid="CABENCH1")),
+        "/voice custom_message": (app_module.voice_twiml, dict(
+            form, CallSid="CABENCH1", custom_message="Namaste! Aapki PM Kisan kist jaari ho gayi hai & more")),
+        "/set-language invalid": (app_module.set_language_twiml, dict(form, CallSid="CABENCH1", Digits="9")),
+        "/listen hi-IN": (app_module.listen_twiml, dict(form, CallSid="CABENCH1")),
+        "/listen en-IN": (app_module.listen_twiml, dict(form, CallSid="CABENCH2")),
+    }
+
+    for name, (handler, values) in routes.items():
+        app_module.twiml_cache.enabled = False
+        built = handler(values)
+        app_module.twiml_cache.enabled = True
+        if handler(values) != built or handler(values) != built:
+            sys.exit(f"Cached TwiML differs from the built document for {name}")
+    print(f"TwiML parity over {len(routes)} routes: identical\n")
+
+    per_round = max(1, args.requests // args.rounds)
+    cost = {(name, enabled): [0.0, 0.0] for name in routes for enabled in (False, True)}
+    for block in range(args.rounds):
+        for enabled in (block % 2 == 0, block % 2 == 1):
+            app_module.twiml_cache.enabled = enabled
+            for name, (handler, values) in routes.items():
+                cpu, wall = time.process_time(), time.perf_counter()
+                for _ in range(per_round):
+                    handler(values)
+                cost[(name, enabled)][0] += time.process_time() - cpu
+                cost[(name, enabled)][1] += time.perf_counter() - wall
+    app_module.write_behind.flush(timeout=60)
+
+    n = per_round * args.rounds
+    print(f"{n} requests per route and mode (the background writer's CPU included)\n")
+    print(f"{'route':<24}{'off cpu us':>12}{'on cpu us':>11}{'off wall us':>13}{'on wall us':>12}{'speedup':>9}")
+    for name in routes:
+        (off_cpu, off_wall), (on_cpu, on_wall) = cost[(name, False)], cost[(name, True)]
+        print(f"{name:<24}{off_cpu / n * 1e6:>12.1f}{on_cpu / n * 1e6:>11.1f}{off_wall / n * 1e6:>13.1f}"
+              f"{on_wall / n * 1e6:>12.1f}{off_wall / on_wall:>8.1f}x")
+    print(f"\nTwiML cache: {app_module.twiml_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
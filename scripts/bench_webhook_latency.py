@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /handle-input webhook latency with the write-behind logger on and off.
+
+Runs simulated calls through the Flask test client against a throwaway SQLite
+database, with Groq replaced by a canned reply so only our own request path
+is measured. Use --db-delay-ms to add a per-transaction delay that mimics the
+round trip to a remote PostgreSQL server.
+
+Usage:
+    python scripts/bench_webhook_latency.py --calls 20 --turns 5 --db-delay-ms 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class FakeCompletions:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def create(self, **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        message = type("Message", (), {"content": "PM-KISAN ki jankari pmkisan.gov.in par milegi."})
+        choice = type("Choice", (), {"message": message})
+        return type("Completion", (), {"choices": [choice]})
+
+
+class FakeGroq:
+    def __init__(self, delay):
+        self.chat = type("Chat", (), {"completions": FakeCompletions(delay)})()
+
+    def with_options(self, **options):
+        return self
+
+
+def run(app_module, calls, turns, label):
+    client = app_module.app.test_client()
+    samples = []
+    for n in range(calls):
+        call_sid = f"CA{label}{n:06d}"
+        form = {"CallSid": call_sid, "From": "+919800000000", "To": "+911100000000"}
+        client.post("/voice", data=form)
+        client.post("/set-language", data=dict(form, Digits="1"))
+        for turn in range(turns):
+            start = time.perf_counter()
+            client.post("/handle-input", data=dict(form, SpeechResult=f"PM kisan ki kist kab aayegi {turn}"))
+            samples.append((time.perf_counter() - start) * 1000)
+    app_module.write_behind.flush(timeout=30)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--db-delay-ms", type=float, default=0.0,
+                        help="extra delay per DB transaction (simulated network round trip)")
+    parser.add_argument("--llm-delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_webhook_")
+    os.chdir(workdir)
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["CALLER_GUARD_ENABLED"] = "false"  # every call is from one number
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    app_module.groq_client = FakeGroq(args.llm_delay_ms / 1000.0)
+    if args.db_delay_ms:
+        real_write = app_module.write_log_rows
+
+        def delayed_write(events):
+            time.sleep(args.db_delay_ms / 1000.0)
+            real_write(events)
+
+        app_module.write_behind.flush_fn = delayed_write
+        app_module.write_log_rows = delayed_write
+
+    print(f"Database: {os.path.join(workdir, app_module.DB_NAME)}")
+    print(f"{args.calls} calls x {args.turns} turns, db delay {args.db_delay_ms} ms, llm delay {args.llm_delay_ms} ms\n")
+    print(f"{'mode':<16}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, enabled in (("sync", False), ("write-behind", True)):
+        app_module.write_behind.enabled = enabled
+        samples = run(app_module, args.calls, args.turns, label)
+        print(f"{label:<16}{percentile(samples, 50):>10.2f}{percentile(samples, 99):>10.2f}{max(samples):>10.2f}")
+    print(f"\nWrite-behind stats: {app_module.write_behind.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Synthesize the fixed prompts (app.fixed_prompts) into AUDIO_CACHE_DIR.
+
+Run it after changing a prompt, a voice or LANG_CONFIG, then restart the
+workers; prompts that already have a file are skipped unless --force.
+Upload the directory to a CDN and set AUDIO_BASE_URL to serve it from there.
+
+Usage:
+    python scripts/build_audio_cache.py --synthesizer polly --region ap-south-1
+    python scripts/build_audio_cache.py --synthesizer local   # offline stand-in
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CAMPAIGN_SCHEDULER_ENABLED", "false")
+
+from audio_cache import SYNTHESIZERS  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthesizer", choices=sorted(SYNTHESIZERS), default="polly")
+    parser.add_argument("--region", default=os.environ.get("AWS_REGION"), help="Polly region")
+    parser.add_argument("--default-voice", default="Raveena", help="Polly voice for prompts said without one")
+    parser.add_argument("--force", action="store_true", help="re-synthesize prompts that already have a file")
+    args = parser.parse_args()
+
+    if args.synthesizer == "polly":
+        synthesizer = SYNTHESIZERS["polly"](region=args.region, default_voice=args.default_voice)
+    else:
+        synthesizer = SYNTHESIZERS[args.synthesizer]()
+
+    import app as app_module
+
+    prompts = app_module.fixed_prompts()
+    started = time.perf_counter()
+    built, skipped = app_module.audio_cache.build(prompts, synthesizer, force=args.force)
+    print(f"{built} prompts synthesized, {skipped} already cached, into {os.path.abspath(app_module.audio_cache.directory)} "
+          f"({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
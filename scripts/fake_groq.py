@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Groq chat completions API, for load tests offline.
+
+Accepts POST /openai/v1/chat/completions (plain and ``stream: true``) and
+answers with a canned reply after a lognormal latency: ``latency_ms`` is the
+median and ``p99_ms`` the 99th percentile. Streamed replies send the first
+chunk after that latency and one word every ``token_ms``. ``error_rate`` of
+requests get HTTP 500 and ``rate_limit_rate`` get HTTP 429, which the Groq
+SDK retries like the real ones. The reply is picked by the last message, so
+the same question always gets the same answer. ``model_latency_ms`` gives
+some models their own median (same spread), e.g. a faster small model.
+
+Point the app at it with:
+    GROQ_BASE_URL=http://127.0.0.1:8766 python app.py
+
+Usage:
+    python scripts/fake_groq.py --port 8766 --latency-ms 400 --p99-ms 1500
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Every canned reply ends with this, so a load test can tell real answers from fallbacks
+REPLY_MARKER = "helpline 155261"
+REPLIES = [
+    "PM-KISAN yojana mein kisanon ko saal mein chhe hazaar rupaye teen kishton mein milte hain. "
+    f"Kisht ki sthiti pmkisan.gov.in par dekhein ya {REPLY_MARKER} par call karein.",
+    "Ayushman Bharat card se parivaar ko saal mein paanch lakh rupaye tak ka muft ilaaj milta hai. "
+    f"Apni patrata beneficiary.nha.gov.in par jaanchein ya {REPLY_MARKER} par call karein.",
+    "PM Awas Yojana ke liye aavedan pmaymis.gov.in par ya najdeeki CSC kendra se kar sakte hain. "
+    f"Adhik jaankari ke liye {REPLY_MARKER} par call karein.",
+]
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # concurrency tests open hundreds of connections at once
+
+
+class FakeGroqServer:
+    """Threaded fake of the chat completions endpoint, with request counters."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=400.0, p99_ms=None, token_ms=15.0,
+                 error_rate=0.0, rate_limit_rate=0.0, model_latency_ms=None):
+        self.latency_ms = latency_ms
+        self.p99_ms = p99_ms or latency_ms
+        self.model_latency_ms = dict(model_latency_ms or {})
+        self.token_ms = token_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.counters = {"requests": 0, "streamed": 0, "errors": 0, "rate_limited": 0, "peak_in_flight": 0}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def latency(self, model=None):
+        """Seconds before the first byte: lognormal with the configured median and p99."""
+        sigma = math.log(max(self.p99_ms, self.latency_ms) / self.latency_ms) / 2.326 if self.latency_ms > 0 else 0.0
+        median = self.model_latency_ms.get(model, self.latency_ms)
+        return median * math.exp(random.gauss(0.0, sigma)) / 1000.0 if median > 0 else 0.0
+
+    def _count(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def _enter(self):
+        with self._lock:
+            self._in_flight += 1
+            self.counters["peak_in_flight"] = max(self.counters["peak_in_flight"], self._in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out and gave up
+
+            def _chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                # Model list (the /readyz Groq check)
+                if not self.path.endswith("/models"):
+                    return self._send(404, {"error": {"message": "Not found"}})
+                self._send(200, {"object": "list", "data": [{"id": "llama-3.3-70b-versatile", "object": "model"}]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    return self._send(404, {"error": {"message": "Not found"}})
+                server._count("requests")
+                server._enter()
+                try:
+                    self._complete(body)
+                finally:
+                    server._leave()
+
+            def _complete(self, body):
+                time.sleep(server.latency(body.get("model")))
+                roll = random.random()
+                if roll < server.error_rate:
+                    server._count("errors")
+                    return self._send(500, {"error": {"message": "Internal server error", "type": "internal_error"}})
+                if roll < server.error_rate + server.rate_limit_rate:
+                    server._count("rate_limited")
+                    return self._send(429, {"error": {"message": "Rate limit reached", "type": "tokens"}})
+
+                messages = body.get("messages") or [{}]
+                reply = REPLIES[zlib.crc32(str(messages[-1].get("content", "")).encode()) % len(REPLIES)]
+                model = body.get("model", "llama-3.3-70b-versatile")
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                created = int(time.time())
+                if not body.get("stream"):
+                    # Rough token counts (4 characters a token) so prompt size shows up in usage
+                    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+                    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(reply) // 4,
+                             "total_tokens": prompt_tokens + len(reply) // 4}
+                    return self._send(200, {
+                        "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": reply}}],
+                        "usage": usage,
+                    })
+
+                server._count("streamed")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for i, word in enumerate(reply.split(" ")):
+                        if i:
+                            time.sleep(server.token_ms / 1000.0)
+                        chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                                 "model": model, "choices": [{"index": 0, "delta": {"content": word + " "},
+                                                              "finish_reason": None}]}
+                        self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self._chunk(b"data: [DONE]\n\n")
+                    self._chunk(b"")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the app cancelled the stream
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="median time to first byte")
+    parser.add_argument("--p99-ms", type=float, default=None, help="99th percentile time to first byte")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="delay between streamed words")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction answered with HTTP 429")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=MS",
+                        help="median for one model, e.g. llama-3.1-8b-instant=150")
+    args = parser.parse_args()
+
+    model_latency = {model: float(ms) for model, _, ms in (item.partition("=") for item in args.model_latency)}
+    server = FakeGroqServer(args.host, args.port, args.latency_ms, args.p99_ms, args.token_ms,
+                            args.error_rate, args.rate_limit_rate, model_latency)
+    print(f"Fake Groq listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Google Sheets values:append API, for exercising the
+/api/submit-query outbox offline.
+
+Accepts POST /v4/spreadsheets/<id>/values/<range>:append with a JSON body
+{"values": [[...], ...]}, waits a configurable latency, and answers like the
+real API. With --error-rate a share of requests fail with HTTP 503 before
+any row is stored, as a transient Google error would.
+
+Point the app at it with (no credentials needed):
+    GOOGLE_SHEETS_SHEET_ID=fake GOOGLE_SHEETS_API_URL=http://127.0.0.1:8766 python app.py
+
+Usage:
+    python scripts/fake_sheets.py --port 8766 --latency-ms 400 --error-rate 0.2
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+
+class FakeSheetsServer:
+    """Threaded fake of values:append. ``rows`` holds every stored row in order; ``appends`` the
+    number of accepted calls and ``failures`` the ones answered with an error."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=400.0, jitter_ms=50.0, error_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rows = []
+        self.appends = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                path = urlsplit(self.path).path
+                parts = path.split("/")
+                if len(parts) != 6 or parts[1:3] != ["v4", "spreadsheets"] or not path.endswith(":append"):
+                    return self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                sheet_id, range_ = unquote(parts[3]), unquote(parts[5][:-len(":append")])
+                try:
+                    values = json.loads(body)["values"]
+                except (ValueError, KeyError):
+                    return self._send(400, {"error": {"code": 400, "message": "Invalid JSON payload",
+                                                      "status": "INVALID_ARGUMENT"}})
+                delay = max(0.0, server.latency_ms + random.uniform(-server.jitter_ms, server.jitter_ms))
+                time.sleep(delay / 1000.0)
+                if random.random() < server.error_rate:
+                    with server._lock:
+                        server.failures += 1
+                    return self._send(503, {"error": {"code": 503, "message": "The service is currently unavailable.",
+                                                      "status": "UNAVAILABLE"}})
+                with server._lock:
+                    start = len(server.rows) + 2  # row 1 holds the headers
+                    server.rows.extend(values)
+                    server.appends += 1
+                sheet = range_.split("!")[0]
+                self._send(200, {"spreadsheetId": sheet_id, "tableRange": f"{sheet}!A1:D{start - 1}", "updates": {
+                    "spreadsheetId": sheet_id, "updatedRange": f"{sheet}!A{start}:D{start + len(values) - 1}",
+                    "updatedRows": len(values), "updatedCells": sum(len(row) for row in values)}})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeSheetsServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Fake Sheets listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Twilio Calls API, for exercising bulk dialing offline.
+
+Accepts POST /2010-04-01/Accounts/<sid>/Calls.json, waits a configurable
+latency, and answers with a JSON call resource. Requests above the
+calls-per-second allowance get HTTP 429 like the real API.
+
+Point the app at it with:
+    TWILIO_API_BASE_URL=http://127.0.0.1:8765 python app.py
+
+Usage:
+    python scripts/fake_twilio.py --port 8765 --latency-ms 300 --cps 5
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeTwilioServer:
+    """Threaded fake of the Calls endpoint. ``calls`` records (admitted at, to) for every accepted call."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=300.0, jitter_ms=50.0, error_rate=0.0, cps=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.cps = cps
+        self.calls = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _admit(self, to_number):
+        """Record the call if it fits in the rolling one-second CPS window."""
+        with self._lock:
+            now = time.monotonic()
+            if self.cps:
+                recent = [t for t, _ in self.calls if now - t < 1.0]
+                if len(recent) >= self.cps:
+                    self.rejected += 1
+                    return False
+            self.calls.append((now, to_number))
+            return True
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                # Account lookup (the /readyz Twilio check)
+                if "/Accounts/" not in self.path or not self.path.endswith(".json"):
+                    return self._send(404, {"code": 20404, "message": "Not found", "status": 404})
+                sid = self.path.rsplit("/", 1)[-1][:-len(".json")]
+                self._send(200, {"sid": sid, "status": "active", "friendly_name": "Fake Twilio"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode())
+                if not self.path.endswith("/Calls.json"):
+                    return self._send(404, {"code": 20404, "message": "Not found", "status": 404})
+                to_number = form.get("To", [""])[0]
+                if not server._admit(to_number):
+                    return self._send(429, {"code": 20429, "message": "Too Many Requests", "status": 429})
+                delay = max(0.0, server.latency_ms + random.uniform(-server.jitter_ms, server.jitter_ms))
+                time.sleep(delay / 1000.0)
+                if random.random() < server.error_rate:
+                    return self._send(400, {"code": 21211, "message": "Invalid 'To' Phone Number", "status": 400})
+                self._send(201, {
+                    "sid": "CA" + uuid.uuid4().hex,
+                    "to": to_number,
+                    "from": form.get("From", [""])[0],
+                    "status": "queued",
+                })
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cps", type=float, default=None, help="reject calls above this rate with HTTP 429")
+    args = parser.parse_args()
+
+    server = FakeTwilioServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.cps)
+    print(f"Fake Twilio listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Offline load test: simulated Twilio callers against the Flask app.
+
+Starts the fake Groq and Twilio servers (scripts/fake_groq.py,
+scripts/fake_twilio.py) and the app under gunicorn, pointed at them and at a
+throwaway SQLite database, then runs stages of --concurrency simulated
+callers for --duration seconds each. Every caller places calls back to back
+and behaves like Twilio: it follows the TwiML it gets back (keypad choice
+at a digit <Gather>, speech at a speech <Gather>, silence now and then,
+which follows the <Redirect> to /listen, and any other <Redirect>). Each call
+keeps its own cookie session. A call hangs up after --turns answers.
+
+A turn counts as failed when a request errors or takes longer than Twilio's
+15 s webhook timeout, or when the caller hears the fallback message instead of
+an answer (the fake replies all end in a known phrase). A stage passes when
+/handle-input p95 is within --slo-ms and failed turns stay under
+--max-error-rate. The report gives the largest passing stage: the number of
+concurrent calls the server sustains.
+
+No network access is needed. Set DB_TYPE=postgres and DB_* to test against
+PostgreSQL instead. --server async runs async_app.py (aiohttp workers) instead
+of the sync gthread workers. Use --target to load a server that is already running; the
+fake servers' URLs are printed so it can be pointed at them.
+
+Usage:
+    python scripts/load_test.py --concurrency 10,25,50,100 --duration 60 --workers 1 --threads 32
+    python scripts/load_test.py --server async --concurrency 100,200,400
+    python scripts/load_test.py --groq-latency-ms 600 --groq-p99-ms 3000 --groq-error-rate 0.02 \\
+        --app-env STREAM_RESPONSES=true
+"""
+
+import argparse
+import os
+import random
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from datetime import date
+from urllib.parse import urlsplit
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_groq import FakeGroqServer, REPLY_MARKER  # noqa: E402
+from fake_twilio import FakeTwilioServer  # noqa: E402
+
+TWILIO_TIMEOUT = 15.0
+OPENING_QUESTIONS = [
+    "PM kisan ki agli kist kab aayegi",
+    "Ayushman card kaise banega",
+    "PM awas yojana ke liye kaise apply karein",
+    "What documents do I need for the Ayushman Bharat card",
+]
+FOLLOW_UPS = [
+    "Iske liye kaun se documents chahiye",
+    "Kya main online apply kar sakta hoon",
+    "Mera naam list mein nahi hai, kya karun",
+    "How long does it take to get the money",
+    "Where is the nearest CSC centre",
+    "Is there a helpline number",
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(-(-pct * len(ordered) // 100)) - 1))]
+
+
+class StageStats:
+    """Counters and latency samples shared by the callers of one stage."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}     # endpoint -> [ms]
+        self.requests = 0
+        self.http_errors = 0
+        self.timeouts = 0
+        self.bad_twiml = 0
+        self.calls = 0
+        self.turns = 0
+        self.fallbacks = 0
+        self.failed_turns = 0
+
+    def request(self, endpoint, ms, ok, timed_out=False, bad_twiml=False):
+        with self.lock:
+            self.requests += 1
+            self.latencies.setdefault(endpoint, []).append(ms)
+            self.http_errors += int(not ok and not timed_out)
+            self.timeouts += int(timed_out)
+            self.bad_twiml += int(bad_twiml)
+
+    def turn(self, answered, failed):
+        with self.lock:
+            self.turns += 1
+            self.fallbacks += int(not answered and not failed)
+            self.failed_turns += int(failed or not answered)
+
+    def call(self):
+        with self.lock:
+            self.calls += 1
+
+
+class Caller:
+    """One simulated phone line: places calls back to back until stopped."""
+
+    def __init__(self, base_url, args, stats, stop, seed):
+        self.base_url = base_url
+        self.args = args
+        self.stats = stats
+        self.stop = stop
+        self.rng = random.Random(seed)
+
+    def think(self, seconds):
+        # Caller speaking (or Twilio waiting out a silent <Gather>); ends early at stage end
+        self.stop.wait(seconds)
+
+    def post(self, session, url, data):
+        """POST a webhook; returns the parsed TwiML root, or None when the call should drop."""
+        endpoint = urlsplit(url).path
+        started = time.perf_counter()
+        try:
+            response = session.post(self.base_url + url, data=data, timeout=TWILIO_TIMEOUT)
+        except requests.Timeout:
+            self.stats.request(endpoint, TWILIO_TIMEOUT * 1000, False, timed_out=True)
+            return None
+        except requests.RequestException:
+            self.stats.request(endpoint, (time.perf_counter() - started) * 1000, False)
+            return None
+        ms = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            self.stats.request(endpoint, ms, False)
+            return None
+        try:
+            root = ET.fromstring(response.content)
+        except ET.ParseError:
+            self.stats.request(endpoint, ms, False, bad_twiml=True)
+            return None
+        self.stats.request(endpoint, ms, True)
+        return root
+
+    def make_call(self, session, to_number):
+        started = time.perf_counter()
+        try:
+            response = session.post(f"{self.base_url}/make-call", timeout=TWILIO_TIMEOUT,
+                                    data={"to_number": to_number, "webhook_url": f"{self.base_url}/voice"})
+            ok = response.status_code == 202
+        except requests.RequestException:
+            ok = False
+        self.stats.request("/make-call", (time.perf_counter() - started) * 1000, ok)
+
+    def run(self):
+        while not self.stop.is_set():
+            self.one_call()
+
+    def one_call(self):
+        args, rng = self.args, self.rng
+        session = requests.Session()
+        caller = f"+9198{rng.randrange(10 ** 8):08d}"
+        helpline = "+911800110001"
+        outbound = rng.random() < args.outbound_fraction
+        if outbound:
+            self.make_call(session, caller)
+        params = {
+            "CallSid": f"CA{uuid.uuid4().hex}",
+            "AccountSid": "AC" + "0" * 32,
+            "From": helpline if outbound else caller,
+            "To": caller if outbound else helpline,
+            "Direction": "outbound-api" if outbound else "inbound",
+            "CallStatus": "in-progress",
+        }
+        url, data = "/voice", dict(params)
+        answers = 0
+        heard = []          # what the caller heard since asking the current question
+        asking = False
+        for _ in range(args.turns * 6 + 10):
+            root = self.post(session, url, data)
+            if asking and root is None:
+                self.stats.turn(answered=False, failed=True)
+            if root is None:
+                break
+            heard.extend(say.text or "" for say in root.iter("Say"))
+            gather = root.find("Gather")
+            redirect = root.find("Redirect")
+            if asking and gather is not None and "speech" in (gather.get("input") or ""):
+                # Turn over: the reply was spoken and we are listening again
+                self.stats.turn(answered=any(REPLY_MARKER in text for text in heard), failed=False)
+                asking = False
+                answers += 1
+            if gather is not None and "speech" in (gather.get("input") or ""):
+                if answers >= args.turns or self.stop.is_set():
+                    break  # hang up
+                self.think(rng.uniform(0.5, 1.5) * args.think_ms / 1000.0)
+                if rng.random() < args.silence_rate and redirect is not None:
+                    url, data = redirect.text, dict(params)
+                    continue
+                question = rng.choice(OPENING_QUESTIONS if answers == 0 else FOLLOW_UPS)
+                url = gather.get("action", "/handle-input")
+                data = dict(params, SpeechResult=question, Confidence="0.91")
+                heard, asking = [], True
+            elif gather is not None:
+                self.think(rng.uniform(0.5, 1.5))  # finding the keypad
+                url = gather.get("action")
+                data = dict(params, Digits=rng.choice(("1", "2")))
+            elif redirect is not None:
+                url, data = redirect.text, dict(params)
+            else:
+                break
+        self.stats.call()
+
+
+def run_stage(base_url, args, concurrency, seed):
+    stats = StageStats()
+    stop = threading.Event()
+    callers = [Caller(base_url, args, stats, stop, seed * 100003 + n) for n in range(concurrency)]
+    threads = [threading.Thread(target=caller.run, daemon=True) for caller in callers]
+    started = time.monotonic()
+    for n, thread in enumerate(threads):
+        thread.start()
+        # Spread call starts over the first think interval instead of a thundering herd
+        time.sleep(min(args.think_ms / 1000.0, 2.0) / concurrency)
+    time.sleep(max(0.0, started + args.duration - time.monotonic()))
+    stop.set()
+    for thread in threads:
+        thread.join(TWILIO_TIMEOUT + 5)
+    return stats, time.monotonic() - started
+
+
+def report_stage(concurrency, stats, elapsed, args):
+    handle = stats.latencies.get("/handle-input", [])
+    p95 = percentile(handle, 95)
+    error_rate = stats.failed_turns / stats.turns if stats.turns else 1.0
+    passed = bool(handle) and p95 <= args.slo_ms and error_rate <= args.max_error_rate
+    print(f"\n== {concurrency} concurrent calls, {elapsed:.0f} s: {'PASS' if passed else 'FAIL'} ==")
+    print(f"calls {stats.calls} ({stats.calls / elapsed:.2f}/s), turns {stats.turns} ({stats.turns / elapsed:.2f}/s), "
+          f"requests {stats.requests} ({stats.requests / elapsed:.1f}/s)")
+    print(f"failed turns {stats.failed_turns} ({error_rate:.1%}): fallback replies {stats.fallbacks}, "
+          f"HTTP errors {stats.http_errors}, timeouts {stats.timeouts}, bad TwiML {stats.bad_twiml}")
+    print(f"{'endpoint':<20}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, samples in sorted(stats.latencies.items()):
+        print(f"{endpoint:<20}{len(samples):>8}{percentile(samples, 50):>10.1f}{percentile(samples, 95):>10.1f}"
+              f"{percentile(samples, 99):>10.1f}{max(samples):>10.1f}")
+    return passed
+
+
+def server_breakdown(base_url):
+    """Server-side phase percentiles for today's turns (GET /api/turn-latency)."""
+    try:
+        groups = requests.get(f"{base_url}/api/turn-latency", params={"start": date.today().isoformat()},
+                              timeout=30).json()
+    except (requests.RequestException, ValueError):
+        return
+    print("\nServer-side /handle-input phases, all stages (p50 / p95 ms):")
+    for group in groups:
+        phases = "  ".join(f"{phase} {group[phase]['p50_ms']:.1f}/{group[phase]['p95_ms']:.1f}"
+                           for phase in ("db", "groq", "post", "twiml", "total"))
+        print(f"  {group['day']} lang {group['lang_id']} ({group['turns']} turns): {phases}")
+
+
+def start_app(args, groq, twilio):
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")])),
+        "GROQ_API_KEY": "load-test",
+        "GROQ_BASE_URL": groq.base_url,
+        "TWILIO_API_BASE_URL": twilio.base_url,
+        "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+        "TWILIO_AUTH_TOKEN": "load-test",
+        "TWILIO_PHONE_NUMBER": "+911800110001",
+        "CAMPAIGN_SCHEDULER_ENABLED": "false",
+    })
+    env.setdefault("DB_TYPE", "sqlite")
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    port = args.port
+    command = [shutil.which("gunicorn") or "gunicorn", "-w", str(args.workers), "-b", f"127.0.0.1:{port}",
+               "--chdir", workdir, "--timeout", "60", "--log-level", "warning"]
+    if args.server == "async":
+        command += ["-k", "aiohttp.GunicornWebWorker", "async_app:app"]
+    else:
+        command += ["-k", "gthread", "--threads", str(args.threads), "app:app"]
+    log = open(os.path.join(workdir, "server.log"), "w")
+    proc = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"App exited with {proc.returncode}; see {log.name}")
+        try:
+            if requests.get(f"{base_url}/readyz", timeout=2).status_code == 200:
+                return proc, base_url, workdir
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    stop_app(proc)
+    raise SystemExit(f"App did not become ready; see {log.name}")
+
+
+def stop_app(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(20)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)  # open keep-alive connections can hold workers
+        proc.wait()
+    except ProcessLookupError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="5,10,25,50", help="comma-separated concurrent calls per stage")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per stage")
+    parser.add_argument("--turns", type=int, default=4, help="questions per call")
+    parser.add_argument("--think-ms", type=float, default=3000.0, help="mean time the caller speaks per question")
+    parser.add_argument("--silence-rate", type=float, default=0.1, help="fraction of prompts the caller stays silent at")
+    parser.add_argument("--outbound-fraction", type=float, default=0.0, help="calls started through /make-call")
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="/handle-input p95 a passing stage stays within")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="failed-turn fraction a passing stage stays within")
+    parser.add_argument("--keep-going", action="store_true", help="run the remaining stages after one fails")
+    parser.add_argument("--seed", type=int, default=1)
+    server = parser.add_argument_group("app server")
+    server.add_argument("--target", help="load this running server instead of starting one")
+    server.add_argument("--server", choices=("sync", "async"), default="sync",
+                        help="sync: gthread workers running app.py; async: aiohttp workers running async_app.py")
+    server.add_argument("--workers", type=int, default=1)
+    server.add_argument("--threads", type=int, default=32)
+    server.add_argument("--port", type=int, default=8790)
+    server.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the app, e.g. STREAM_RESPONSES=true")
+    fakes = parser.add_argument_group("stand-ins")
+    fakes.add_argument("--groq-latency-ms", type=float, default=400.0, help="median Groq time to first byte")
+    fakes.add_argument("--groq-p99-ms", type=float, default=1500.0)
+    fakes.add_argument("--groq-token-ms", type=float, default=15.0)
+    fakes.add_argument("--groq-error-rate", type=float, default=0.0, help="fraction of HTTP 500s")
+    fakes.add_argument("--groq-429-rate", type=float, default=0.0, help="fraction of HTTP 429s")
+    fakes.add_argument("--twilio-latency-ms", type=float, default=300.0)
+    fakes.add_argument("--twilio-jitter-ms", type=float, default=100.0)
+    fakes.add_argument("--twilio-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    stages = [int(n) for n in args.concurrency.split(",") if n.strip()]
+
+    groq = FakeGroqServer(latency_ms=args.groq_latency_ms, p99_ms=args.groq_p99_ms, token_ms=args.groq_token_ms,
+                          error_rate=args.groq_error_rate, rate_limit_rate=args.groq_429_rate).start()
+    twilio = FakeTwilioServer(latency_ms=args.twilio_latency_ms, jitter_ms=args.twilio_jitter_ms,
+                              error_rate=args.twilio_error_rate).start()
+    print(f"Fake Groq at {groq.base_url} (GROQ_BASE_URL), fake Twilio at {twilio.base_url} (TWILIO_API_BASE_URL)")
+
+    proc = None
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        proc, base_url, workdir = start_app(args, groq, twilio)
+        print(f"App: gunicorn -w {args.workers} " + (
+            "async_app:app (aiohttp)" if args.server == "async" else f"--threads {args.threads}") + f" in {workdir}")
+    print(f"Stages {stages}, {args.duration:g} s each, {args.turns} questions per call, "
+          f"think {args.think_ms:g} ms, Groq median {args.groq_latency_ms:g} ms / p99 {args.groq_p99_ms:g} ms")
+
+    sustained = 0
+    try:
+        for n, concurrency in enumerate(stages):
+            stats, elapsed = run_stage(base_url, args, concurrency, args.seed + n)
+            if report_stage(concurrency, stats, elapsed, args):
+                sustained = max(sustained, concurrency)
+            elif not args.keep_going:
+                break
+        server_breakdown(base_url)
+    finally:
+        if proc is not None:
+            stop_app(proc)
+        groq.stop()
+        twilio.stop()
+    print(f"\nFake Groq: {groq.counters}; fake Twilio: {len(twilio.calls)} calls created")
+    print(f"Sustained: {sustained} concurrent calls (/handle-input p95 <= {args.slo_ms:g} ms, "
+          f"failed turns <= {args.max_error_rate:.1%})" if sustained else "Sustained: no stage passed")
+
+
+if __name__ == "__main__":
+    main()
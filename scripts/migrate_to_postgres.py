@@ -1,19 +1,43 @@
 #!/usr/bin/env python3
 """
 Migration script: SQLite to PostgreSQL
-Safely migrates call logs, transcripts, and queries from SQLite to PostgreSQL
+Bulk-copies calls, transcripts, queries and suspicious activity from SQLite to PostgreSQL
+
+SQLite is read in rowid order, --batch-size rows at a time, and each batch
+is loaded with COPY. The last copied rowid of every table is checkpointed in
+PostgreSQL (sqlite_import_progress) in the same transaction as the batch, so
+an interrupted run resumes where it stopped and a later run only copies rows
+added since. --sync keeps doing that every --interval seconds until Ctrl-C,
+which lets the app keep running on SQLite until the moment of cutover.
+
+Usage:
+    python scripts/migrate_to_postgres.py                  # copy everything, or resume
+    python scripts/migrate_to_postgres.py --parallel 3     # load tables concurrently
+    python scripts/migrate_to_postgres.py --sync --interval 10
 """
 
+import argparse
+import io
+import os
+import queue
 import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
 import psycopg2
+from psycopg2 import errors
 from dotenv import load_dotenv
-import os
-from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import migrations  # noqa: E402
 
 load_dotenv()
 
 # SQLite connection
-SQLITE_DB = "voice_agent.db"
+SQLITE_DB = os.environ.get("SQLITE_DB", "voice_agent.db")
 
 # PostgreSQL connection details
 PG_HOST = os.environ.get("DB_HOST", "localhost")
@@ -22,151 +46,385 @@ PG_USER = os.environ.get("DB_USER", "hack4delhi_user")
 PG_PASSWORD = os.environ.get("DB_PASSWORD", "")
 PG_NAME = os.environ.get("DB_NAME", "hack4delhi_db")
 
+# Tables to copy, each with the table it references (it starts once that one is done)
+TABLES = {
+    "calls": None,
+    "transcripts": "calls",
+    "queries": None,
+    "suspicious_activity": None,
+    "turn_latencies": None,
+}
+
+# SQLite column names that differ in PostgreSQL
+RENAMED = {"queries": {"user": "user_name"}}
+
+# Serial ids are assigned by PostgreSQL; call summaries are recomputed after loading
+SKIPPED_COLUMNS = {"id", "last_message", "turn_count"}
+
+# Bytes handed to COPY per write (psycopg2 defaults to 8 KB)
+COPY_CHUNK = 1 << 20
+
+# Rows must satisfy this to be kept (SQLite has transcripts of calls it never logged)
+ORPHAN_FILTERS = {"transcripts": "EXISTS (SELECT 1 FROM calls WHERE calls.call_sid = s.call_sid)"}
+
+PROGRESS_DDL = """
+    CREATE TABLE IF NOT EXISTS sqlite_import_progress (
+        table_name TEXT PRIMARY KEY,
+        last_rowid BIGINT NOT NULL DEFAULT 0,
+        rows_copied BIGINT NOT NULL DEFAULT 0,
+        rows_skipped BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT NOW()
+    )
+"""
+
+# Foreign keys and secondary indexes dropped for the initial load, recreated once it finishes
+DEFERRED_DDL = """
+    CREATE TABLE IF NOT EXISTS sqlite_import_deferred (
+        name TEXT PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        ddl TEXT NOT NULL
+    )
+"""
+
+# Recomputes calls.last_message / turn_count for calls with transcripts in (low, high]
+SUMMARY_SQL = """
+    UPDATE calls SET turn_count = s.turns, last_message = s.last_message
+    FROM (
+        SELECT call_sid, COUNT(*) AS turns, (ARRAY_AGG(message ORDER BY id DESC))[1] AS last_message
+        FROM transcripts
+        WHERE call_sid IN (SELECT call_sid FROM transcripts WHERE id > %s AND id <= %s)
+        GROUP BY call_sid
+    ) s
+    WHERE calls.call_sid = s.call_sid
+"""
+
+print_lock = threading.Lock()
+
+
+def log(message):
+    with print_lock:
+        print(message, flush=True)
+
+
+def pg_connect():
+    return psycopg2.connect(host=PG_HOST, port=PG_PORT, user=PG_USER, password=PG_PASSWORD, database=PG_NAME)
+
+
+def sqlite_connect():
+    # Read-only, so the app can keep writing to the file during a --sync cutover
+    return sqlite3.connect(f"file:{SQLITE_DB}?mode=ro", uri=True, timeout=30)
+
+
+def epoch_ms(timestamp):
+    """Same value app.log_timestamp() stores for a local ISO timestamp, or 0."""
+    try:
+        return int(datetime.fromisoformat(timestamp).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return 0
+
+
+def copy_value(value):
+    """One field in COPY text format."""
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def plan_columns(table, source_columns, target_columns):
+    """(SQLite columns to select, PostgreSQL columns to fill, whether to derive timestamp_ms)."""
+    renamed = RENAMED.get(table, {})
+    select, columns = [], []
+    for name in source_columns:
+        target = renamed.get(name, name)
+        if target in target_columns and target not in SKIPPED_COLUMNS:
+            select.append(name)
+            columns.append(target)
+    derive_ms = "timestamp_ms" in target_columns and "timestamp_ms" not in columns and "timestamp" in select
+    if derive_ms:
+        columns.append("timestamp_ms")
+    return select, columns, derive_ms
+
+
+def encode_batch(rows, select, derive_ms):
+    """COPY text for SQLite rows (rowid first)."""
+    ts = select.index("timestamp") if "timestamp" in select else None
+    buf = io.StringIO()
+    for row in rows:
+        values = list(row[1:])
+        if ts is not None and not values[ts]:
+            values[ts] = None  # '' is not a valid PostgreSQL TIMESTAMP
+        if derive_ms:
+            values.append(epoch_ms(values[ts]))
+        buf.write("\t".join(copy_value(v) for v in values))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+def load_batch(c, table, columns, buf, count):
+    """COPY a batch straight into the table; if it conflicts, go through a staging table
+    and drop the rows that cannot be inserted. Returns the number of rows inserted."""
+    cols = ", ".join(columns)
+    c.execute("SAVEPOINT batch")
+    try:
+        c.copy_expert(f"COPY {table} ({cols}) FROM STDIN", buf, size=COPY_CHUNK)
+        c.execute("RELEASE SAVEPOINT batch")
+        return count
+    except (errors.UniqueViolation, errors.ForeignKeyViolation):
+        c.execute("ROLLBACK TO SAVEPOINT batch")
+    buf.seek(0)
+    c.execute(f"CREATE TEMP TABLE IF NOT EXISTS staging_{table} AS SELECT {cols} FROM {table} WITH NO DATA")
+    c.execute(f"TRUNCATE staging_{table}")
+    c.copy_expert(f"COPY staging_{table} ({cols}) FROM STDIN", buf, size=COPY_CHUNK)
+    where = f"WHERE {ORPHAN_FILTERS[table]}" if table in ORPHAN_FILTERS else ""
+    c.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM staging_{table} s {where} ON CONFLICT DO NOTHING")
+    return c.rowcount
+
+
+def defer_constraints(c, table):
+    """Drop the foreign keys and secondary indexes of an empty table, so COPY does not
+    check and maintain them row by row. They are recorded to be recreated later."""
+    c.execute("""
+        SELECT conname, 'ALTER TABLE ' || conrelid::regclass || ' ADD CONSTRAINT ' || conname || ' ' || pg_get_constraintdef(oid)
+        FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'
+    """, (table,))
+    foreign_keys = c.fetchall()
+    c.execute("""
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = %s
+        AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)
+    """, (table, table))
+    indexes = c.fetchall()
+    for kind, items in (("constraint", foreign_keys), ("index", indexes)):
+        for name, ddl in items:
+            c.execute("INSERT INTO sqlite_import_deferred (name, table_name, kind, ddl) VALUES (%s, %s, %s, %s) "
+                      "ON CONFLICT DO NOTHING", (name, table, kind, ddl))
+    for name, _ in foreign_keys:
+        c.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+    for name, _ in indexes:
+        c.execute(f"DROP INDEX {name}")
+
+
+def restore_constraints(c, table):
+    """Recreate what defer_constraints dropped, first deleting rows that would violate a
+    foreign key. Returns the number of rows deleted."""
+    c.execute("SELECT kind, ddl FROM sqlite_import_deferred WHERE table_name = %s ORDER BY kind DESC", (table,))
+    deferred = c.fetchall()
+    if not deferred:
+        return 0
+    removed = 0
+    if table in ORPHAN_FILTERS and any(kind == "constraint" for kind, _ in deferred):
+        c.execute(f"DELETE FROM {table} s WHERE NOT ({ORPHAN_FILTERS[table]})")
+        removed = c.rowcount
+    for _, ddl in deferred:  # indexes first, so validating the foreign key can use them
+        c.execute(ddl)
+    c.execute("DELETE FROM sqlite_import_deferred WHERE table_name = %s", (table,))
+    c.execute("""
+        UPDATE sqlite_import_progress SET rows_copied = rows_copied - %s, rows_skipped = rows_skipped + %s
+        WHERE table_name = %s
+    """, (removed, removed, table))
+    return removed
+
+
+def read_batches(table, select, derive_ms, last_rowid, max_rowid, batch_size, out, stop):
+    """Producer thread: puts (last rowid, row count, COPY buffer) for each batch, then None,
+    so reading and encoding the next batch overlaps the COPY of this one."""
+    src = sqlite_connect()
+    query = f"SELECT rowid, {', '.join(select)} FROM {table} WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?"
+    try:
+        while not stop.is_set():
+            rows = src.execute(query, (last_rowid, max_rowid, batch_size)).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            out.put((last_rowid, len(rows), encode_batch(rows, select, derive_ms)))
+        out.put(None)
+    except Exception as e:
+        out.put(e)
+    finally:
+        src.close()
+
+
+def copy_table(table, batch_size, max_rowid):
+    """Copy the rows of one table past its checkpoint, up to max_rowid.
+    Returns (rows copied, rows skipped, seconds)."""
+    start = time.perf_counter()
+    src = sqlite_connect()
+    try:
+        source_columns = [row[1] for row in src.execute(f"PRAGMA table_info({table})")]
+    finally:
+        src.close()
+    if not source_columns:
+        log(f"   ⚠ '{table}' table not found in SQLite")
+        return 0, 0, 0.0
+
+    pg = pg_connect()
+    stop = threading.Event()
+    try:
+        c = pg.cursor()
+        c.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s", (table,))
+        select, columns, derive_ms = plan_columns(table, source_columns, {row[0] for row in c.fetchall()})
+
+        c.execute("INSERT INTO sqlite_import_progress (table_name) VALUES (%s) ON CONFLICT DO NOTHING", (table,))
+        c.execute("SELECT last_rowid FROM sqlite_import_progress WHERE table_name = %s", (table,))
+        last_rowid = c.fetchone()[0]
+        c.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+        if last_rowid == 0 and not c.fetchone()[0] and max_rowid > 0:
+            defer_constraints(c, table)
+        pg.commit()
+
+        batches = queue.Queue(maxsize=2)
+        threading.Thread(target=read_batches, daemon=True, args=(
+            table, select, derive_ms, last_rowid, max_rowid, batch_size, batches, stop)).start()
+        copied = skipped = 0
+        reported = start
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            last_rowid, count, buf = batch
+            inserted = load_batch(c, table, columns, buf, count)
+            c.execute("""
+                UPDATE sqlite_import_progress
+                SET last_rowid = %s, rows_copied = rows_copied + %s, rows_skipped = rows_skipped + %s, updated_at = NOW()
+                WHERE table_name = %s
+            """, (last_rowid, inserted, count - inserted, table))
+            pg.commit()
+            copied += inserted
+            skipped += count - inserted
+            if time.perf_counter() - reported >= 5:
+                reported = time.perf_counter()
+                log(f"     {table}: {copied:,} rows ({copied / (reported - start):,.0f} rows/s)")
+
+        removed = restore_constraints(c, table)
+        pg.commit()
+        return copied - removed, skipped + removed, time.perf_counter() - start
+    except Exception:
+        pg.rollback()
+        raise
+    finally:
+        stop.set()
+        pg.close()
+
+
+def refresh_call_summaries():
+    """Recompute last_message / turn_count for calls that got transcripts since the last run."""
+    pg = pg_connect()
+    try:
+        c = pg.cursor()
+        c.execute("INSERT INTO sqlite_import_progress (table_name) VALUES ('calls.summary') ON CONFLICT DO NOTHING")
+        c.execute("SELECT last_rowid FROM sqlite_import_progress WHERE table_name = 'calls.summary'")
+        low = c.fetchone()[0]
+        c.execute("SELECT COALESCE(MAX(id), 0) FROM transcripts")
+        high = c.fetchone()[0]
+        updated = 0
+        if high > low:
+            c.execute(SUMMARY_SQL, (low, high))
+            updated = c.rowcount
+            c.execute("UPDATE sqlite_import_progress SET last_rowid = %s, updated_at = NOW() WHERE table_name = 'calls.summary'",
+                      (high,))
+        pg.commit()
+        return updated
+    finally:
+        pg.close()
+
+
+def run_pass(batch_size, parallel):
+    """Copy new rows of every table, returns {table: (copied, skipped, seconds)}."""
+    done = {table: threading.Event() for table in TABLES}
+    # Snapshot first: every transcript in the snapshot then has its call row in SQLite
+    # by the time the calls loader reads it, so rows written mid-pass wait for the next pass
+    src = sqlite_connect()
+    try:
+        limits = {}
+        for table in TABLES:
+            try:
+                limits[table] = src.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+            except sqlite3.OperationalError:
+                limits[table] = 0
+    finally:
+        src.close()
+
+    def load(table):
+        if TABLES[table]:
+            done[TABLES[table]].wait()
+        try:
+            return table, copy_table(table, batch_size, limits[table])
+        finally:
+            done[table].set()
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        results = dict(pool.map(load, TABLES))
+    for table, (copied, skipped, seconds) in results.items():
+        rate = f" ({copied / seconds:,.0f} rows/s)" if copied and seconds else ""
+        note = f", skipped {skipped:,} duplicate/orphan rows" if skipped else ""
+        log(f"   ✓ {table}: {copied:,} new rows in {seconds:.1f}s{rate}{note}")
+    return results
+
+
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=20000, help="rows per SQLite read / COPY")
+    parser.add_argument("--parallel", type=int, default=1, help="tables loaded at once")
+    parser.add_argument("--sync", action="store_true", help="keep copying new rows until interrupted")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between --sync passes")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("SQLite to PostgreSQL Migration")
     print("=" * 60)
-    
+
     # Check if SQLite file exists
     if not os.path.exists(SQLITE_DB):
         print(f"Error: SQLite database '{SQLITE_DB}' not found!")
         return False
-    
+
     try:
-        # SQLite connection
-        print("\n1. Connecting to SQLite...")
-        sqlite_conn = sqlite3.connect(SQLITE_DB)
-        sqlite_conn.row_factory = sqlite3.Row
-        sqlite_cursor = sqlite_conn.cursor()
-        print("   ✓ SQLite connection successful")
-        
-        # PostgreSQL connection
-        print("\n2. Connecting to PostgreSQL...")
-        pg_conn = psycopg2.connect(
-            host=PG_HOST,
-            port=PG_PORT,
-            user=PG_USER,
-            password=PG_PASSWORD,
-            database=PG_NAME
-        )
-        pg_cursor = pg_conn.cursor()
-        print("   ✓ PostgreSQL connection successful")
-        
-        # Migrate calls table
-        print("\n3. Migrating 'calls' table...")
-        try:
-            sqlite_cursor.execute("SELECT * FROM calls")
-            calls = sqlite_cursor.fetchall()
-            
-            if calls:
-                for call in calls:
-                    pg_cursor.execute("""
-                        INSERT INTO calls (call_sid, from_number, to_number, direction, timestamp)
-                        VALUES (%s, %s, %s, %s, %s)
-                        ON CONFLICT (call_sid) DO NOTHING
-                    """, (call['call_sid'], call['from_number'], call['to_number'], 
-                          call['direction'], call['timestamp']))
-                
-                pg_conn.commit()
-                print(f"   ✓ Migrated {len(calls)} calls")
-            else:
-                print("   ✓ No calls to migrate")
-        except sqlite3.OperationalError:
-            print("   ⚠ 'calls' table not found in SQLite")
-        except Exception as e:
-            print(f"   ✗ Error migrating calls: {e}")
-            pg_conn.rollback()
-            raise
-        
-        # Migrate transcripts table
-        print("\n4. Migrating 'transcripts' table...")
-        try:
-            sqlite_cursor.execute("SELECT * FROM transcripts")
-            transcripts = sqlite_cursor.fetchall()
-            
-            if transcripts:
-                for transcript in transcripts:
-                    pg_cursor.execute("""
-                        INSERT INTO transcripts (call_sid, role, message, timestamp)
-                        VALUES (%s, %s, %s, %s)
-                    """, (transcript['call_sid'], transcript['role'], 
-                          transcript['message'], transcript['timestamp']))
-                
-                pg_conn.commit()
-                print(f"   ✓ Migrated {len(transcripts)} transcripts")
-            else:
-                print("   ✓ No transcripts to migrate")
-        except sqlite3.OperationalError:
-            print("   ⚠ 'transcripts' table not found in SQLite")
-        except Exception as e:
-            print(f"   ✗ Error migrating transcripts: {e}")
-            pg_conn.rollback()
-            raise
-        
-        # Migrate queries table
-        print("\n5. Migrating 'queries' table...")
-        try:
-            sqlite_cursor.execute("SELECT * FROM queries")
-            queries = sqlite_cursor.fetchall()
-            
-            if queries:
-                for query in queries:
-                    # Handle different column names (SQLite uses 'user', PostgreSQL uses 'user_name')
-                    user_val = query.get('user') or query.get('user_name', 'Unknown User')
-                    pg_cursor.execute("""
-                        INSERT INTO queries (timestamp, user_name, query, status)
-                        VALUES (%s, %s, %s, %s)
-                    """, (query['timestamp'], user_val, query['query'], query['status']))
-                
-                pg_conn.commit()
-                print(f"   ✓ Migrated {len(queries)} queries")
-            else:
-                print("   ✓ No queries to migrate")
-        except sqlite3.OperationalError:
-            print("   ⚠ 'queries' table not found in SQLite")
-        except Exception as e:
-            print(f"   ✗ Error migrating queries: {e}")
-            pg_conn.rollback()
-            raise
-        
-        # Verify migration
-        print("\n6. Verifying migration...")
-        pg_cursor.execute("SELECT COUNT(*) FROM calls")
-        calls_count = pg_cursor.fetchone()[0]
-        
-        pg_cursor.execute("SELECT COUNT(*) FROM transcripts")
-        transcripts_count = pg_cursor.fetchone()[0]
-        
-        pg_cursor.execute("SELECT COUNT(*) FROM queries")
-        queries_count = pg_cursor.fetchone()[0]
-        
-        print(f"   ✓ PostgreSQL now contains:")
-        print(f"     - {calls_count} calls")
-        print(f"     - {transcripts_count} transcripts")
-        print(f"     - {queries_count} queries")
-        
-        # Cleanup
-        sqlite_cursor.close()
-        sqlite_conn.close()
-        pg_cursor.close()
-        pg_conn.close()
-        
-        print("\n" + "=" * 60)
-        print("✓ Migration completed successfully!")
-        print("=" * 60)
-        print("\nNext steps:")
-        print("1. Update .env: Set DB_TYPE=postgres")
-        print("2. Restart Flask: python app.py")
-        print("3. Test API: curl http://localhost:8000/api/logs")
-        print("4. Backup: Rename or backup voice_agent.db (optional)")
-        print("\n")
-        
-        return True
-        
+        print("\n1. Preparing PostgreSQL schema...")
+        migrations.upgrade(lambda: migrations._Closing(pg_connect()), "postgres", log=lambda m: print(f"   {m}"))
+        with migrations._Closing(pg_connect()) as pg:
+            pg.cursor().execute(PROGRESS_DDL)
+            pg.cursor().execute(DEFERRED_DDL)
+            pg.commit()
+        print("   ✓ PostgreSQL schema is current")
+
+        print(f"\n2. Copying tables (batch {args.batch_size:,}, {args.parallel} at a time)...")
+        start = time.perf_counter()
+        results = run_pass(args.batch_size, args.parallel)
+        print(f"   ✓ Refreshed summaries of {refresh_call_summaries():,} calls")
+        total = sum(copied for copied, _, _ in results.values())
+        elapsed = time.perf_counter() - start
+        print(f"   ✓ {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+        while args.sync:
+            time.sleep(args.interval)
+            print(f"\n   Sync pass at {datetime.now():%H:%M:%S}...")
+            run_pass(args.batch_size, args.parallel)
+            refresh_call_summaries()
+
+    except KeyboardInterrupt:
+        print("\n   Stopped; the next run continues from the last checkpoint")
     except Exception as e:
         print(f"\n✗ Migration failed: {e}")
+        print("  Re-run to resume from the last checkpoint")
         return False
 
+    print("\n" + "=" * 60)
+    print("✓ Migration completed successfully!")
+    print("=" * 60)
+    print("\nNext steps:")
+    print("1. Update .env: Set DB_TYPE=postgres")
+    print("2. Restart Flask: python app.py")
+    print("3. Test API: curl http://localhost:8000/api/logs")
+    print("4. Backup: Rename or backup voice_agent.db (optional)")
+    print("\n")
+
+    return True
+
+
 if __name__ == "__main__":
     success = main()
     exit(0 if success else 1)
@@ -5,6 +5,9 @@ Test script to verify end-to-end call logs flow:
 2. Verify API endpoint returns data
 3. Verify CSV download works
 4. Show frontend integration status
+
+Needs the live database and a running server. For capacity testing use
+scripts/load_test.py, which runs offline against stand-ins.
 """
 
 import requests
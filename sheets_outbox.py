@@ -0,0 +1,240 @@
+"""
+Google Sheets sync for /api/submit-query through a durable outbox.
+
+/api/submit-query used to build a Sheets client and make a blocking append
+inside every request. Now the endpoint writes the query and its sheet row
+(``sheets_outbox``) in one transaction and returns. A background thread in
+each worker claims due rows, appends up to ``batch_size`` of them with one
+``values:append`` call, and deletes them once Google has accepted them. A
+failed append leaves the rows in the outbox with exponential backoff
+(``retry_base`` * 2^attempts seconds, capped at ``retry_max``, with
+jitter); after ``max_attempts`` they are marked ``failed`` and kept until
+an admin retries them.
+
+Rows are claimed with a per-pass token and a lease, so several workers can
+drain the same outbox without appending a row twice. A worker that dies
+mid-append leaves its claim to expire. Delivery is at least once: a row is
+sent again if the append succeeds but the delete does not.
+
+The Sheets REST endpoint is called through one session, created on first
+use and kept (google-auth's AuthorizedSession refreshes the token).
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from urllib.parse import quote
+
+import requests
+
+SHEETS_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+DEFAULT_API_URL = "https://sheets.googleapis.com"
+
+
+def service_account_session(credentials_path):
+    """AuthorizedSession for a service-account key file. Needs google-auth (ImportError otherwise)."""
+    from google.oauth2.service_account import Credentials
+    from google.auth.transport.requests import AuthorizedSession
+    return AuthorizedSession(Credentials.from_service_account_file(credentials_path, scopes=SHEETS_SCOPES))
+
+
+class SheetsClient:
+    """``append(rows)`` adds rows below the table in ``range_`` with a single API call.
+    ``make_session`` builds the HTTP session on first use (default: unauthenticated, for a local stand-in)."""
+
+    def __init__(self, sheet_id, range_="Sheet1!A:D", make_session=None, api_url=DEFAULT_API_URL, timeout=30.0):
+        self.sheet_id = sheet_id
+        self.range = range_
+        self.make_session = make_session or requests.Session
+        self.url = (f"{api_url.rstrip('/')}/v4/spreadsheets/{quote(sheet_id, safe='')}"
+                    f"/values/{quote(range_, safe='')}:append")
+        self.timeout = timeout
+        self._session = None
+
+    def append(self, rows):
+        if self._session is None:
+            self._session = self.make_session()
+        response = self._session.post(self.url, params={"valueInputOption": "USER_ENTERED",
+                                                        "insertDataOption": "INSERT_ROWS"},
+                                      json={"values": rows}, timeout=self.timeout)
+        if response.status_code >= 400:
+            raise RuntimeError(f"Sheets append failed: HTTP {response.status_code} {response.text[:200]}")
+        return response.json()
+
+
+class SQLSheetsOutboxBackend:
+    """Rows waiting for the sheet, in the ``sheets_outbox`` table."""
+
+    def __init__(self, get_connection, placeholder="?"):
+        self.get_connection = get_connection
+        self.p = placeholder
+
+    def add(self, cursor, query_id, values, now_ms):
+        """Queue a row with the caller's cursor, so it commits with the query it belongs to."""
+        cursor.execute(f"""
+            INSERT INTO sheets_outbox (query_id, row_values, status, attempts, next_attempt_ms, created_ms)
+            VALUES ({self.p}, {self.p}, 'pending', 0, {self.p}, {self.p})
+        """, (query_id, json.dumps(values, ensure_ascii=False), now_ms, now_ms))
+
+    def claim(self, limit, now_ms, lease_ms):
+        """Claim up to ``limit`` due rows for this pass. Returns (token, [(id, values, attempts)]) in id order."""
+        p = self.p
+        token = uuid.uuid4().hex
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            # The outer conditions are checked again on rows another worker claimed meanwhile
+            c.execute(f"""
+                UPDATE sheets_outbox SET claimed_by = {p}, claimed_until_ms = {p}
+                WHERE id IN (SELECT id FROM sheets_outbox
+                             WHERE status = 'pending' AND next_attempt_ms <= {p}
+                               AND (claimed_until_ms IS NULL OR claimed_until_ms < {p})
+                             ORDER BY id LIMIT {p})
+                  AND status = 'pending' AND (claimed_until_ms IS NULL OR claimed_until_ms < {p})
+            """, (token, now_ms + lease_ms, now_ms, now_ms, limit, now_ms))
+            c.execute(f"SELECT id, row_values, attempts FROM sheets_outbox WHERE claimed_by = {p} ORDER BY id",
+                      (token,))
+            rows = [(row_id, json.loads(values), attempts) for row_id, values, attempts in c.fetchall()]
+            conn.commit()
+        return token, rows
+
+    def delete_claimed(self, token):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"DELETE FROM sheets_outbox WHERE claimed_by = {self.p}", (token,))
+            conn.commit()
+
+    def release(self, token, retries, error):
+        """Put claimed rows back: ``retries`` is [(id, status, attempts, next_attempt_ms)]."""
+        p = self.p
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.executemany(f"""
+                UPDATE sheets_outbox SET status = {p}, attempts = {p}, next_attempt_ms = {p}, last_error = {p},
+                                         claimed_by = NULL, claimed_until_ms = NULL
+                WHERE id = {p} AND claimed_by = {p}
+            """, [(status, attempts, next_ms, error[:500], row_id, token)
+                  for row_id, status, attempts, next_ms in retries])
+            conn.commit()
+
+    def retry_failed(self, now_ms):
+        """Queue every failed row again. Returns how many."""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"""UPDATE sheets_outbox SET status = 'pending', attempts = 0, next_attempt_ms = {self.p}
+                          WHERE status = 'failed'""", (now_ms,))
+            changed = c.rowcount
+            conn.commit()
+        return max(0, changed)
+
+    def counts(self):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT status, COUNT(*), MIN(created_ms) FROM sheets_outbox GROUP BY status")
+            return {status: {"rows": rows, "oldest_ms": oldest} for status, rows, oldest in c.fetchall()}
+
+
+class SheetsOutbox:
+    """Background thread that moves outbox rows to the sheet in batches.
+
+    ``append(rows)`` sends a list of row value lists in one call and raises on failure.
+    """
+
+    def __init__(self, backend, append, batch_size=500, interval=2.0, max_attempts=10, retry_base=2.0,
+                 retry_max=300.0, lease=60.0, enabled=True):
+        self.backend = backend
+        self.append = append
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = lease
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._last_append = 0.0  # monotonic time of the last append attempt
+        self.last_error = None
+        self.counters = {"passes": 0, "appends": 0, "rows_sent": 0, "append_errors": 0, "rows_failed": 0,
+                         "pass_errors": 0}
+
+    def ensure_started(self):
+        # Start lazily, and again after a fork: threads do not survive fork().
+        if not self.enabled or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="sheets-outbox", daemon=True)
+            self._thread.start()
+
+    def alive(self):
+        """False only if the outbox thread was started in this process and has died."""
+        return self._pid != os.getpid() or self._thread is None or self._thread.is_alive()
+
+    def wake(self):
+        """Send soon (after a submission); rows arriving before the next pass share its append."""
+        self.ensure_started()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            # At most one append per interval keeps the batches large and the API quota safe
+            spacing = self._last_append + self.interval - time.monotonic()
+            if spacing > 0:
+                time.sleep(spacing)
+            try:
+                while self.send_batch() == self.batch_size:
+                    pass
+            except Exception as e:
+                with self._lock:
+                    self.counters["pass_errors"] += 1
+                print(f"Sheets outbox error: {e}")
+
+    def backoff(self, attempts):
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def send_batch(self, now=None):
+        """Append one batch of due rows. Returns how many rows were sent."""
+        now = now or time.time()
+        with self._lock:
+            self.counters["passes"] += 1
+        token, rows = self.backend.claim(self.batch_size, int(now * 1000), int(self.lease * 1000))
+        if not rows:
+            return 0
+        self._last_append = time.monotonic()
+        try:
+            self.append([values for _, values, _ in rows])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            retries = []
+            for row_id, _, attempts in rows:
+                attempts += 1
+                status = 'failed' if attempts >= self.max_attempts else 'pending'
+                retries.append((row_id, status, attempts, int((now + self.backoff(attempts)) * 1000)))
+            self.backend.release(token, retries, error)
+            with self._lock:
+                self.counters["append_errors"] += 1
+                self.counters["rows_failed"] += sum(1 for _, status, _, _ in retries if status == 'failed')
+                self.last_error = error
+            print(f"Google Sheets sync error ({len(rows)} rows will be retried): {error}")
+            return 0
+        self.backend.delete_claimed(token)
+        with self._lock:
+            self.counters["appends"] += 1
+            self.counters["rows_sent"] += len(rows)
+            self.last_error = None
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, enabled=self.enabled, batch_size=self.batch_size, interval=self.interval,
+                        last_error=self.last_error)
@@ -0,0 +1,229 @@
+"""
+Streaming Groq replies for voice turns.
+
+A StreamingReply consumes a ``chat.completions.create(stream=True)`` iterator
+on a background thread so the webhook can speak the first complete sentence
+as soon as it arrives. The rest of the text keeps accumulating and is picked
+up by the continuation webhook through a ReplyBuffer keyed by CallSid.
+AsyncStreamingReply does the same for the async serving mode (async_app.py).
+"""
+
+import asyncio
+import re
+import threading
+import time
+
+# End of a sentence: ., ?, ! or the Devanagari danda, followed by whitespace.
+SENTENCE_END = re.compile(r'[.!?।](?=\s)')
+
+
+def find_first_sentence(text, min_chars=20):
+    """Return the first complete sentence of at least ``min_chars`` characters, or None."""
+    for match in SENTENCE_END.finditer(text):
+        end = match.end()
+        if end >= min_chars:
+            return text[:end]
+    return None
+
+
+class StreamingReply:
+    """Background consumer of one streamed completion."""
+
+    def __init__(self, stream, min_sentence_chars=20):
+        self._stream = stream
+        self.min_sentence_chars = min_sentence_chars
+        self._lock = threading.Lock()
+        self._parts = []
+        self._first_sentence = None
+        self._first_ready = threading.Event()
+        self._done = threading.Event()
+        self._finished = threading.Event()
+        self._callback = None
+        self._cancelled = False
+        self.error = None
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="groq-stream", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for chunk in self._stream:
+                if self._cancelled:
+                    break
+                self._add(chunk)
+        except Exception as e:
+            self.error = e
+        finally:
+            if self._cancelled:
+                try:
+                    self._stream.close()
+                except Exception:
+                    pass
+            self._end()
+
+    def _add(self, chunk):
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if not delta:
+            return
+        with self._lock:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self._parts.append(delta)
+            if self._first_sentence is None:
+                sentence = find_first_sentence(''.join(self._parts), self.min_sentence_chars)
+                if sentence:
+                    self._first_sentence = sentence
+                    self._first_ready.set()
+
+    def _mark_done(self):
+        """Flag the stream as ended; returns the completion callback to run, if one is registered."""
+        with self._lock:
+            self._done.set()
+            self._first_ready.set()
+            return self._callback
+
+    def _end(self):
+        callback = self._mark_done()
+        if callback is not None:
+            self._run_callback(callback)
+
+    def _run_callback(self, callback):
+        try:
+            callback(self.text(), self.error)
+        except Exception as e:
+            print(f"Streaming reply completion error: {e}")
+        finally:
+            self._finished.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def text(self):
+        with self._lock:
+            return ''.join(self._parts)
+
+    def wait_first_sentence(self, timeout):
+        """First complete sentence, or None if the stream ended (or timed out) without one."""
+        self._first_ready.wait(timeout)
+        with self._lock:
+            return self._first_sentence
+
+    def wait_done(self, timeout):
+        return self._done.wait(timeout)
+
+    def on_complete(self, callback):
+        """Run ``callback(full_text, error)`` once the stream ends (now, if it already has)."""
+        with self._lock:
+            if not self._done.is_set():
+                self._callback = callback
+                return
+        self._run_callback(callback)
+
+    def wait_finished(self, timeout):
+        """Wait for the completion callback to have run."""
+        return self._finished.wait(timeout)
+
+    def cancel(self):
+        self._cancelled = True
+
+
+class AsyncStreamingReply(StreamingReply):
+    """StreamingReply for an ``AsyncGroq`` stream, consumed by a task on the running event loop.
+
+    The completion callback writes call state, so it runs on ``executor`` rather
+    than on the loop. The ``async_wait_*`` coroutines wait without holding a thread.
+    """
+
+    def __init__(self, stream, executor=None, min_sentence_chars=20):
+        self._loop = asyncio.get_running_loop()
+        self._executor = executor
+        self._first_ready_async = asyncio.Event()
+        self._done_async = asyncio.Event()
+        self._finished_async = asyncio.Event()
+        super().__init__(stream, min_sentence_chars)
+
+    def _start(self):
+        self._task = self._loop.create_task(self._consume())
+
+    async def _consume(self):
+        try:
+            async for chunk in self._stream:
+                if self._cancelled:
+                    break
+                self._add(chunk)
+                if self._first_ready.is_set():
+                    self._first_ready_async.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            if self._cancelled:
+                try:
+                    await self._stream.close()
+                except Exception:
+                    pass
+            self._end()
+
+    def _end(self):
+        callback = self._mark_done()
+        self._first_ready_async.set()
+        self._done_async.set()
+        if callback is not None:
+            self._loop.run_in_executor(self._executor, self._run_callback, callback)
+
+    def _run_callback(self, callback):
+        try:
+            super()._run_callback(callback)
+        finally:
+            try:
+                self._loop.call_soon_threadsafe(self._finished_async.set)
+            except RuntimeError:
+                pass  # loop already closed (shutdown)
+
+    @staticmethod
+    async def _wait(event, timeout):
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return event.is_set()
+
+    async def async_wait_first_sentence(self, timeout):
+        await self._wait(self._first_ready_async, timeout)
+        with self._lock:
+            return self._first_sentence
+
+    async def async_wait_done(self, timeout):
+        return await self._wait(self._done_async, timeout)
+
+    async def async_wait_finished(self, timeout):
+        return await self._wait(self._finished_async, timeout)
+
+
+class ReplyBuffer:
+    """In-flight streaming replies by CallSid, dropped after ``ttl`` seconds."""
+
+    def __init__(self, ttl=120):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._replies = {}
+
+    def put(self, call_sid, reply):
+        now = time.monotonic()
+        with self._lock:
+            for sid in [sid for sid, (_, at) in self._replies.items() if now - at > self.ttl]:
+                self._replies.pop(sid)[0].cancel()
+            self._replies[call_sid] = (reply, now)
+
+    def pop(self, call_sid):
+        with self._lock:
+            entry = self._replies.pop(call_sid, None)
+        return entry[0] if entry else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._replies)
@@ -0,0 +1,103 @@
+"""
+Text normalization for caller speech in English, Hindi and Hinglish.
+
+Twilio's speech recognizer returns the same question in many surface forms:
+"PM-KISAN ki kist?", "pm kisaan kisht", "पीएम किसान किस्त". normalize_tokens()
+folds case, punctuation, common romanization variants and Devanagari
+spellings of scheme names onto one token sequence and drops filler words.
+Question words (kab, kaise, kitna, when, how...) are kept because they change
+what is being asked.
+"""
+
+import re
+import unicodedata
+
+# Spelling folds applied to romanized tokens, in order.
+_ROMAN_FOLDS = [
+    ('aa', 'a'), ('ee', 'i'), ('ii', 'i'), ('oo', 'u'), ('uu', 'u'),
+    ('ph', 'f'), ('z', 'j'),
+]
+
+# Canonical forms for frequent terms (after folding). Values may expand to
+# several tokens, e.g. "pmkisan" -> "pm kisan".
+CANONICAL_TERMS = {
+    'pmkisan': 'pm kisan', 'kishan': 'kisan', 'kisht': 'kist', 'kisth': 'kist',
+    'installment': 'kist', 'instalment': 'kist',
+    'yojna': 'yojana', 'yojnaa': 'yojana', 'scheme': 'yojana', 'schemes': 'yojana',
+    'ayushmann': 'ayushman', 'bharath': 'bharat', 'aayushman': 'ayushman',
+    'avas': 'awas', 'avaas': 'awas', 'aavas': 'awas', 'housing': 'awas',
+    'pmay': 'pm awas yojana', 'pmjay': 'ayushman bharat',
+    'ujvala': 'ujjwala', 'ujjvala': 'ujjwala', 'ujala': 'ujjwala',
+    'adhar': 'aadhaar', 'aadhar': 'aadhaar', 'adhaar': 'aadhaar',
+    'rashan': 'ration', 'eligible': 'patrata', 'eligibility': 'patrata', 'patra': 'patrata',
+    'apply': 'avedan', 'application': 'avedan', 'aavedan': 'avedan',
+    'status': 'sthiti', 'stithi': 'sthiti', 'stiti': 'sthiti',
+    'pradhanmantri': 'pm', 'pradhan': 'pm',
+    'ayegi': 'ayega', 'aegi': 'ayega', 'aega': 'ayega', 'ayengi': 'ayega', 'ayenge': 'ayega',
+}
+
+# Devanagari spellings of the same terms (matched before romanized folding).
+DEVANAGARI_TERMS = {
+    'पीएम': 'pm', 'प्रधानमंत्री': 'pm', 'प्रधान': 'pm', 'किसान': 'kisan', 'किस्त': 'kist',
+    'योजना': 'yojana', 'आयुष्मान': 'ayushman', 'भारत': 'bharat', 'आवास': 'awas',
+    'उज्ज्वला': 'ujjwala', 'आधार': 'aadhaar', 'राशन': 'ration', 'पात्रता': 'patrata',
+    'आवेदन': 'avedan', 'स्थिति': 'sthiti', 'कब': 'kab', 'कैसे': 'kaise', 'कितना': 'kitna',
+    'कितनी': 'kitna', 'क्या': 'kya', 'है': 'hai', 'हैं': 'hai', 'की': 'ki', 'का': 'ka',
+    'के': 'ke', 'में': 'mein', 'मुझे': 'mujhe', 'बताइए': 'bataiye', 'बताओ': 'batao',
+    'आएगी': 'ayega', 'आयेगी': 'ayega', 'आएगा': 'ayega', 'आयेगा': 'ayega', 'बारे': 'bare',
+}
+
+# Filler and function words that do not change the question being asked.
+STOP_WORDS = {
+    # English
+    'a', 'an', 'the', 'is', 'are', 'was', 'be', 'to', 'of', 'for', 'in', 'on', 'about',
+    'me', 'my', 'i', 'please', 'plz', 'tell', 'can', 'you', 'could', 'would', 'want',
+    'know', 'need', 'information', 'info', 'details', 'regarding', 'hello', 'hi', 'sir',
+    'madam', 'mam', 'ok', 'okay', 'and', 'or', 'this', 'that', 'it', 'do', 'does', 'what',
+    # Hinglish (after folding)
+    'kya', 'hai', 'hain', 'ka', 'ki', 'ke', 'ko', 'me', 'mein', 'mai', 'main', 'se', 'aur',
+    'ya', 'mujhe', 'muje', 'mera', 'meri', 'mere', 'hum', 'humein', 'ap', 'aap', 'apka',
+    'apki', 'batao', 'bataiye', 'bataye', 'batayen', 'bata', 'dijiye', 'ji', 'jankari',
+    'janakari', 'chahiye', 'chaiye', 'sakte', 'sakta', 'sakti', 'raha', 'rahi', 'rahe',
+    'tha', 'thi', 'the', 'yeh', 'ye', 'vo', 'voh', 'is', 'us', 'koi', 'kuch', 'bhi', 'to',
+    'toh', 'na', 'namaste', 'namaskar', 'bare', 'baremein',
+}
+
+_DEVANAGARI = re.compile(r'[ऀ-ॿ]')
+
+
+def _strip_punctuation(text):
+    # Unicode-aware: keeps Devanagari vowel signs (categories Mn/Mc), which
+    # \w would treat as punctuation.
+    return ''.join(' ' if unicodedata.category(ch)[0] in 'PSZ' else ch for ch in text)
+
+
+def _fold_roman(token):
+    for old, new in _ROMAN_FOLDS:
+        token = token.replace(old, new)
+    return token
+
+
+def _canonical(token):
+    if _DEVANAGARI.search(token):
+        return DEVANAGARI_TERMS.get(token, token)
+    folded = _fold_roman(token)
+    return CANONICAL_TERMS.get(folded, CANONICAL_TERMS.get(token, folded))
+
+
+def normalize_tokens(text, drop_stop_words=True):
+    """Lowercased, punctuation-free, variant-folded tokens of ``text``."""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKC', text).lower()
+    tokens = []
+    for raw in _strip_punctuation(text).split():
+        for token in _canonical(raw).split():
+            if drop_stop_words and (token in STOP_WORDS or _fold_roman(token) in STOP_WORDS):
+                continue
+            tokens.append(token)
+    return tokens
+
+
+def normalize_text(text, drop_stop_words=True):
+    return ' '.join(normalize_tokens(text, drop_stop_words))
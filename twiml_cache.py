@@ -0,0 +1,62 @@
+"""
+Cached TwiML for the call-flow responses that are the same on every call.
+
+The language menu of /voice, the "Invalid selection" reply of /set-language
+and the /listen prompt depend only on the language and voice, yet building
+them with VoiceResponse/Gather costs an element tree and an XML serialization
+per request. TwimlCache renders each document once per key and serves the
+string. Per-call values are slots: the document is rendered once with a
+marker in each slot's place and split there, so serving it is a join.
+Slot values are inserted as they are and must not need XML escaping
+(URL-quoted strings, for example).
+"""
+
+import threading
+
+
+class TwimlCache:
+    """``render(key, build, **slots)`` returns ``build(**slots)``, building once per key."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._templates = {}
+        self.counters = {"hits": 0, "renders": 0}
+
+    def render(self, key, build, **slots):
+        if not self.enabled:
+            return build(**slots)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._compile(build, slots)
+            with self._lock:
+                self._templates[key] = template
+                self.counters["renders"] += 1
+        else:
+            with self._lock:
+                self.counters["hits"] += 1
+        if len(template) == 1:
+            return template[0]
+        return ''.join(part if i % 2 == 0 else slots[part] for i, part in enumerate(template))
+
+    @staticmethod
+    def _compile(build, slots):
+        """The document as [text, slot name, text, slot name, ..., text]."""
+        markers = {name: f"@@twiml-slot-{name}@@" for name in slots}
+        text = build(**markers)
+        for name, marker in markers.items():
+            if text.count(marker) != 1:
+                raise ValueError(f"TwiML slot {name!r} must appear exactly once in the document")
+        parts = [text]
+        for name in sorted(markers, key=lambda name: text.index(markers[name])):
+            before, _, after = parts.pop().partition(markers[name])
+            parts += [before, name, after]
+        return parts
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, enabled=self.enabled, documents=len(self._templates))
@@ -0,0 +1,175 @@
+"""
+Write-behind logging for call, transcript and fraud events.
+
+Webhooks push rows onto a bounded in-process queue and return immediately.
+A background thread drains the queue and hands batches to a flush function,
+which writes them in one multi-row transaction. A batch is flushed when it
+reaches ``batch_size`` rows or ``flush_interval`` seconds after its first row,
+whichever comes first.
+"""
+
+import os
+import queue
+import threading
+import time
+
+
+class WriteBehindLogger:
+    """Bounded queue plus background writer thread.
+
+    ``flush_fn(events)`` receives a list of ``(kind, row)`` tuples in the
+    order they were submitted and must write them all or raise. Failed
+    batches are retried with backoff; after ``max_retries`` the batch is
+    passed to ``fallback_fn`` (if given) so the caller can salvage rows
+    individually.
+
+    Backpressure: when the queue is full ``submit()`` blocks for at most
+    ``put_timeout`` seconds and then returns False, and the caller is expected
+    to write synchronously instead. Memory is therefore bounded by
+    ``max_queue`` rows.
+    """
+
+    def __init__(self, flush_fn, fallback_fn=None, max_queue=10000, batch_size=200,
+                 flush_interval=0.2, put_timeout=0.05, max_retries=3, enabled=True):
+        self.flush_fn = flush_fn
+        self.fallback_fn = fallback_fn
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopping = False
+        self._pending = 0
+        self._drained = threading.Condition(self._lock)
+        self.counters = {
+            "enqueued": 0,
+            "flushed": 0,
+            "batches": 0,
+            "rejected": 0,
+            "flush_errors": 0,
+            "dropped": 0,
+        }
+
+    def _ensure_started(self):
+        # Start lazily, and again after a fork: threads do not survive fork()
+        # and the parent's queue must not be shared with the child.
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def submit(self, kind, row, timeout=None):
+        """Queue one row, waiting at most ``timeout`` seconds (default ``put_timeout``)
+        for room. Returns False if disabled or the queue stays full."""
+        if not self.enabled or self._stopping:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put((kind, row), timeout=self.put_timeout if timeout is None else timeout)
+        except queue.Full:
+            with self._lock:
+                self.counters["rejected"] += 1
+            return False
+        with self._lock:
+            self.counters["enqueued"] += 1
+            self._pending += 1
+        return True
+
+    def _run(self):
+        q = self._queue
+        while True:
+            try:
+                first = q.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping:
+                    return
+                continue
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            stop_after = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop_after = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            with self._lock:
+                self._pending -= len(batch)
+                if self._pending <= 0:
+                    self._drained.notify_all()
+            if stop_after:
+                return
+
+    def _write(self, batch):
+        delay = 0.1
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.flush_fn(batch)
+                with self._lock:
+                    self.counters["flushed"] += len(batch)
+                    self.counters["batches"] += 1
+                return
+            except Exception as e:
+                with self._lock:
+                    self.counters["flush_errors"] += 1
+                print(f"Write-behind flush error (attempt {attempt + 1}): {e}")
+                if attempt < self.max_retries and not self._stopping:
+                    time.sleep(delay)
+                    delay *= 2
+        if self.fallback_fn is not None:
+            try:
+                self.fallback_fn(batch)
+                return
+            except Exception as e:
+                print(f"Write-behind fallback error: {e}")
+        with self._lock:
+            self.counters["dropped"] += len(batch)
+
+    def alive(self):
+        """False only if the writer thread was started in this process and died unasked."""
+        return (self._pid != os.getpid() or self._thread is None or self._stopping
+                or self._thread.is_alive())
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been written."""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        with self._lock:
+            return self._drained.wait_for(lambda: self._pending <= 0, timeout)
+
+    def stop(self, timeout=10.0):
+        """Drain the queue and stop the writer (registered with atexit)."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+        data["enabled"] = self.enabled
+        data["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        data["max_queue"] = self.max_queue
+        return data